@@ -0,0 +1,104 @@
+"""
+Benchmark de la representación de transacciones en la ingesta: modelo
+Pydantic `Transaction` frente a `CompactTransaction`. Mide el tiempo de
+construcción a partir de filas de Moralis y la memoria retenida por
+transacción.
+
+Uso, desde el directorio padre de backend/:
+    python -m backend.benchmarks.bench_transactions --transactions 100000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+from ..models import Transaction
+from ..services.compact_transaction import CompactTransaction
+from ..utils import parse_block_timestamp
+
+def make_rows(count: int, seed: int = 0) -> List[Dict]:
+    """Filas como las devuelve Moralis, con contrapartes repetidas"""
+    rng = random.Random(seed)
+    addresses = [f"0x{rng.getrandbits(160):040X}" for _ in range(1000)]
+    return [
+        {
+            "hash": f"0x{rng.getrandbits(256):064x}",
+            "from_address": rng.choice(addresses),
+            "to_address": rng.choice(addresses),
+            "value": str(rng.randrange(10 ** 15, 10 ** 21)),
+            "block_timestamp": f"2024-05-{rng.randrange(1, 29):02d}T{rng.randrange(24):02d}:00:00.000Z",
+            "token_address": rng.choice(addresses[:20]),
+            "token_symbol": "TKN",
+            "token_decimals": "18"
+        }
+        for _ in range(count)
+    ]
+
+def build_models(rows: List[Dict]) -> List[Transaction]:
+    return [
+        Transaction(
+            hash=row["hash"],
+            from_address=row["from_address"],
+            to_address=row["to_address"],
+            value=float(row["value"]),
+            timestamp=parse_block_timestamp(row["block_timestamp"]),
+            token_address=row["token_address"],
+            token_symbol=row["token_symbol"],
+            token_decimals=int(row["token_decimals"]),
+            usd_value=1.5
+        )
+        for row in rows
+    ]
+
+def build_compact(rows: List[Dict]) -> List[CompactTransaction]:
+    return [
+        CompactTransaction(
+            hash=row["hash"],
+            from_address=row["from_address"],
+            to_address=row["to_address"],
+            value=int(row["value"]),
+            timestamp=int(parse_block_timestamp(row["block_timestamp"]).timestamp()),
+            token_address=row["token_address"],
+            token_symbol=row["token_symbol"],
+            token_decimals=int(row["token_decimals"]),
+            usd_micros=1_500_000
+        )
+        for row in rows
+    ]
+
+def measure(build: Callable[[List[Dict]], list], rows: List[Dict]) -> Tuple[float, float]:
+    """Segundos de construcción y bytes retenidos por transacción"""
+    gc.collect()
+    start = time.perf_counter()
+    build(rows)
+    seconds = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = build(rows)
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del result
+    return seconds, retained / len(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la representación de transacciones")
+    parser.add_argument("--transactions", type=int, default=100000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.transactions)
+    print(f"{args.transactions} transacciones")
+    results = {}
+    for name, build in (("pydantic", build_models), ("compacta", build_compact)):
+        results[name] = measure(build, rows)
+        seconds, per_tx = results[name]
+        print(f"  {name:9s}: {seconds:6.2f} s  {per_tx:7.0f} bytes/transacción")
+    print(
+        f"  mejora: {results['pydantic'][0] / results['compacta'][0]:.1f}x en tiempo, "
+        f"{results['pydantic'][1] / results['compacta'][1]:.1f}x en memoria"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark del análisis concurrente de wallets: WalletScheduler contra un
+servidor local que imita la latencia de Moralis, con distintos límites de
+concurrencia. Con latencia dominante la aceleración debería ser casi
+lineal hasta el límite.
+
+Uso, desde el directorio padre de backend/:
+    python -m backend.benchmarks.bench_wallet_scheduler --wallets 100 --latency-ms 200
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+from aiohttp import web
+from ..services.http_client import http_client
+from ..services.wallet_scheduler import WalletScheduler
+
+CHAINS = ["eth", "bsc", "polygon"]
+
+def make_app(latency: float, page_size: int) -> web.Application:
+    """Imitación de Moralis: cada página tarda `latency` segundos"""
+    async def history(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        address = request.match_info["address"]
+        return web.json_response({
+            "result": [{"hash": f"{address}-{i}"} for i in range(page_size)],
+            "cursor": None
+        })
+
+    app = web.Application()
+    app.router.add_get("/{chain}/{address}", history)
+    return app
+
+async def run(args) -> Dict[int, float]:
+    runner = web.AppRunner(make_app(args.latency_ms / 1000, 100))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.port)
+    await site.start()
+    await http_client.startup()
+
+    grouped: Dict[str, List[str]] = {chain: [] for chain in CHAINS}
+    for i in range(args.wallets):
+        grouped[CHAINS[i % len(CHAINS)]].append(f"0x{i:040x}")
+
+    async def worker(address: str, blockchain: str):
+        transactions = []
+        for _ in range(args.pages):
+            page = await http_client.request_json(
+                "GET", f"http://127.0.0.1:{args.port}/{blockchain}/{address}"
+            )
+            transactions.extend(page["result"])
+        return len(transactions)
+
+    timings = {}
+    try:
+        for limit in args.limits:
+            scheduler = WalletScheduler(global_limit=limit, per_chain_limit=limit)
+            start = time.perf_counter()
+            results = await scheduler.run(grouped, worker)
+            timings[limit] = time.perf_counter() - start
+            assert all(result is not None for _, _, result in results)
+    finally:
+        await http_client.shutdown()
+        await runner.cleanup()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del planificador de wallets")
+    parser.add_argument("--wallets", type=int, default=60)
+    parser.add_argument("--pages", type=int, default=2, help="Páginas de historial por wallet")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Latencia simulada por página")
+    parser.add_argument("--limits", type=int, nargs="+", default=[1, 2, 5, 10, 20])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    timings = asyncio.run(run(args))
+    baseline = timings[args.limits[0]]
+    ideal = args.wallets * args.pages * args.latency_ms / 1000
+    print(f"{args.wallets} wallets x {args.pages} páginas, {args.latency_ms:.0f} ms por página")
+    print(f"  secuencial teórico: {ideal:.2f} s")
+    for limit, seconds in timings.items():
+        print(f"  concurrencia {limit:3d}: {seconds:7.2f} s  aceleración {baseline / seconds:5.1f}x")
+
+if __name__ == "__main__":
+    main()
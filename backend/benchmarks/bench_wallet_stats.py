@@ -0,0 +1,117 @@
+"""
+Benchmark de las estadísticas de wallets: bucle por transacción sobre
+modelos Pydantic (implementación anterior) frente a las agregaciones
+vectorizadas de wallet_stats.
+
+Uso, desde el directorio padre de backend/:
+    python -m backend.benchmarks.bench_wallet_stats --transactions 50000 --wallets 10
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+import pandas as pd
+from ..services.compact_transaction import CompactTransaction
+from ..services.wallet_stats import compute_wallet_stats, transactions_to_frame
+
+def make_transactions(wallet: str, count: int, seed: int) -> List[CompactTransaction]:
+    """Historial sintético: contrapartes y tokens con distribución sesgada"""
+    rng = random.Random(seed)
+    counterparties = [f"0x{rng.getrandbits(160):040x}" for _ in range(500)]
+    tokens = [None] + [f"0x{rng.getrandbits(160):040x}" for _ in range(50)]
+    start = 1_700_000_000
+    transactions = []
+    for i in range(count):
+        other = counterparties[int(rng.paretovariate(1.2)) % len(counterparties)]
+        sent = rng.random() < 0.5
+        transactions.append(CompactTransaction(
+            hash=f"0x{rng.getrandbits(256):064x}",
+            from_address=wallet if sent else other,
+            to_address=other if sent else wallet,
+            value=rng.randrange(10 ** 15, 10 ** 21),
+            timestamp=start + rng.randrange(30 * 86400),
+            token_address=tokens[int(rng.paretovariate(1.5)) % len(tokens)],
+            token_decimals=18,
+            usd_micros=rng.randrange(10 ** 9)
+        ))
+    return transactions
+
+def loop_stats(address: str, transactions) -> Dict:
+    """Agregación por transacción de la implementación anterior"""
+    stats = {
+        "total_sent_usd": 0,
+        "total_received_usd": 0,
+        "transaction_count": 0,
+        "unique_tokens": set(),
+        "contract_interactions": {},
+        "hourly_activity": {i: 0 for i in range(24)},
+        "first_tx_date": None,
+        "last_tx_date": None
+    }
+    stats["transaction_count"] += len(transactions)
+    for tx in transactions:
+        if tx.from_address.lower() == address.lower():
+            stats["total_sent_usd"] += tx.usd_value
+        else:
+            stats["total_received_usd"] += tx.usd_value
+        if tx.token_address:
+            stats["unique_tokens"].add(tx.token_address)
+        if tx.to_address:
+            stats["contract_interactions"][tx.to_address] = \
+                stats["contract_interactions"].get(tx.to_address, 0) + 1
+        stats["hourly_activity"][tx.timestamp.hour] += 1
+        if not stats["first_tx_date"] or tx.timestamp < stats["first_tx_date"]:
+            stats["first_tx_date"] = tx.timestamp
+        if not stats["last_tx_date"] or tx.timestamp > stats["last_tx_date"]:
+            stats["last_tx_date"] = tx.timestamp
+    stats["most_frequent_contracts"] = sorted(
+        stats["contract_interactions"].items(),
+        key=lambda x: x[1],
+        reverse=True
+    )[:10]
+    return stats
+
+def best_of(repeat: int, function) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de estadísticas de wallets")
+    parser.add_argument("--transactions", type=int, default=50000, help="Transacciones por wallet")
+    parser.add_argument("--wallets", type=int, default=10, help="Wallets del lote")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    wallets = [f"0x{i:040x}" for i in range(1, args.wallets + 1)]
+    histories = {
+        wallet: make_transactions(wallet, args.transactions, seed)
+        for seed, wallet in enumerate(wallets)
+    }
+    # La implementación anterior recibía los modelos Pydantic de la ingesta
+    models = {wallet: [tx.to_model() for tx in txs] for wallet, txs in histories.items()}
+
+    def run_loop():
+        for wallet in wallets:
+            loop_stats(wallet, models[wallet])
+
+    def run_vectorized():
+        frame = pd.concat(
+            [transactions_to_frame(histories[wallet], wallet) for wallet in wallets],
+            ignore_index=True
+        )
+        compute_wallet_stats(frame)
+
+    loop_seconds = best_of(args.repeat, run_loop)
+    vectorized_seconds = best_of(args.repeat, run_vectorized)
+    total = args.transactions * args.wallets
+    print(f"{args.wallets} wallets x {args.transactions} transacciones ({total} en total)")
+    print(f"  bucle por transacción:  {loop_seconds:8.3f} s")
+    print(f"  vectorizado (frame):    {vectorized_seconds:8.3f} s (incluye construir el frame)")
+    print(f"  aceleración:            {loop_seconds / vectorized_seconds:8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -13,30 +13,130 @@ class Settings:
     MORALIS_API_KEY: str = os.getenv("MORALIS_API_KEY", "")
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     
+    # URL base de la API REST de Moralis
+    MORALIS_API_URL: str = os.getenv("MORALIS_API_URL", "https://deep-index.moralis.io/api/v2.2")
+    
+    # Pool de conexiones HTTP compartido
+    HTTP_POOL_SIZE: int = int(os.getenv("HTTP_POOL_SIZE", "100"))
+    HTTP_POOL_SIZE_PER_HOST: int = int(os.getenv("HTTP_POOL_SIZE_PER_HOST", "20"))
+    HTTP_KEEPALIVE_SECONDS: float = 30.0
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", "30"))
+    
+    # Límites de tasa hacia APIs externas: proveedor -> (peticiones/segundo, ráfaga).
+    # Se aplican por proceso: con varios workers hay que repartir la cuota
+    RATE_LIMITS = {
+        "moralis": (float(os.getenv("MORALIS_RATE_LIMIT", "25")), int(os.getenv("MORALIS_RATE_BURST", "25"))),
+        "openai": (float(os.getenv("OPENAI_RATE_LIMIT", "3")), int(os.getenv("OPENAI_RATE_BURST", "3"))),
+        "default": (10.0, 10)
+    }
+    RATE_LIMIT_MIN_FACTOR: float = 0.05  # Tasa mínima tras throttling, relativa a la configurada
+    RATE_LIMIT_RECOVERY_STEP: float = 0.02  # Recuperación por respuesta correcta, relativa a la configurada
+    UPSTREAM_MAX_RETRIES: int = int(os.getenv("UPSTREAM_MAX_RETRIES", "5"))
+    UPSTREAM_RETRY_BASE_DELAY: float = 0.5
+    UPSTREAM_RETRY_MAX_DELAY: float = 30.0
+    
     # Configuración de blockchain
     SUPPORTED_CHAINS = {
         "ethereum": {
             "name": "Ethereum Mainnet",
             "chain_id": 1,
-            "rpc_url": os.getenv("ETH_RPC_URL", "https://eth-mainnet.g.alchemy.com/v2/your-api-key")
+            "rpc_url": os.getenv("ETH_RPC_URL", "https://eth-mainnet.g.alchemy.com/v2/your-api-key"),
+            "wrapped_native_token": "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
         },
         "bsc": {
             "name": "BNB Smart Chain",
             "chain_id": 56,
-            "rpc_url": os.getenv("BSC_RPC_URL", "https://bsc-dataseed.binance.org/")
+            "rpc_url": os.getenv("BSC_RPC_URL", "https://bsc-dataseed.binance.org/"),
+            "wrapped_native_token": "0xbb4cdb9cbd36b01bd1cbaebf2de08d9173bc095c"
         },
         "polygon": {
             "name": "Polygon Mainnet",
             "chain_id": 137,
-            "rpc_url": os.getenv("POLYGON_RPC_URL", "https://polygon-rpc.com")
+            "rpc_url": os.getenv("POLYGON_RPC_URL", "https://polygon-rpc.com"),
+            "wrapped_native_token": "0x0d500b1d8e8ef31e21c99d1db9a6444d3adf1270"
         }
     }
     
     # Configuración de análisis
     MAX_WALLETS_PER_REQUEST: int = 100
-    MAX_TRANSACTIONS_PER_WALLET: int = 1000
+    MAX_TRANSACTIONS_PER_WALLET: int = int(os.getenv("MAX_TRANSACTIONS_PER_WALLET", "1000"))
+    # Valor máximo en USD de una transferencia. Los tokens basura con precios
+    # absurdos se recortan aquí; MAX_TRANSACTIONS_PER_WALLET transferencias
+    # al máximo deben sumar menos de 2**63 micro-dólares (int64)
+    MAX_TRANSFER_USD: int = int(os.getenv("MAX_TRANSFER_USD", "1000000000"))
+    MORALIS_PAGE_SIZE: int = 100  # Máximo de resultados por página en Moralis
+    WALLET_FETCH_TIMEOUT_SECONDS: float = float(os.getenv("WALLET_FETCH_TIMEOUT_SECONDS", "60"))
     ANALYSIS_TIMEFRAME_DAYS: int = 30
     
+    # Configuración de concurrencia (wallets analizadas en paralelo)
+    MAX_CONCURRENT_WALLETS: int = int(os.getenv("MAX_CONCURRENT_WALLETS", "10"))
+    MAX_CONCURRENT_WALLETS_PER_CHAIN: int = int(os.getenv("MAX_CONCURRENT_WALLETS_PER_CHAIN", "5"))
+    
+    # Almacén local de transacciones (vacío = desactivado)
+    TRANSACTION_STORE_PATH: str = os.getenv("TRANSACTION_STORE_PATH", "data/transactions.db")
+    
+    # Caché de precios históricos
+    PRICE_CACHE_BUCKET_SECONDS: int = int(os.getenv("PRICE_CACHE_BUCKET_SECONDS", "3600"))
+    PRICE_CACHE_MAX_ENTRIES: int = int(os.getenv("PRICE_CACHE_MAX_ENTRIES", "50000"))
+    PRICE_CACHE_DB_PATH: str = os.getenv("PRICE_CACHE_DB_PATH", "")  # Vacío = solo en memoria
+    PRICE_BATCH_SIZE: int = 25  # Máximo de tokens por llamada de precios múltiples en Moralis
+    PRICE_RESOLUTION_CONCURRENCY: int = int(os.getenv("PRICE_RESOLUTION_CONCURRENCY", "5"))
+    
+    # Metadatos de tokens
+    TOKEN_METADATA_BATCH_SIZE: int = 10  # Máximo de direcciones por llamada de metadatos en Moralis
+    TOKEN_METADATA_CONCURRENCY: int = int(os.getenv("TOKEN_METADATA_CONCURRENCY", "5"))
+    
+    # Almacén de trabajos de análisis: "memory", "sqlite" o "redis"
+    JOB_STORE_BACKEND: str = os.getenv("JOB_STORE_BACKEND", "memory")
+    JOB_TTL_SECONDS: int = int(os.getenv("JOB_TTL_SECONDS", "86400"))
+    JOB_STORE_PATH: str = os.getenv("JOB_STORE_PATH", "data/jobs.db")
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    JOB_KEY_PREFIX: str = "wallet-analysis:job:"
+    # Ventana en la que una subida con las mismas direcciones reutiliza el análisis existente
+    ANALYSIS_DEDUP_WINDOW_SECONDS: int = int(os.getenv("ANALYSIS_DEDUP_WINDOW_SECONDS", "3600"))
+    
+    # Ejecución de análisis: "inline" (en el proceso de la API) o "worker" (ver worker.py)
+    ANALYSIS_EXECUTION_MODE: str = os.getenv("ANALYSIS_EXECUTION_MODE", "inline")
+    WORKER_PROCESSES: int = int(os.getenv("WORKER_PROCESSES", "2"))
+    WORKER_POLL_INTERVAL_SECONDS: float = float(os.getenv("WORKER_POLL_INTERVAL_SECONDS", "1"))
+    # Un trabajo cuyo worker deja de renovar la concesión vuelve a la cola
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    
+    # Stream de progreso (Server-Sent Events)
+    SSE_POLL_INTERVAL_SECONDS: float = 0.5  # Frecuencia con la que se leen eventos nuevos del almacén
+    SSE_KEEPALIVE_SECONDS: float = 15.0
+    
+    # Representación del grafo: "networkx", "sparse" (matrices SciPy) o "auto"
+    # (sparse a partir de GRAPH_SPARSE_THRESHOLD nodos)
+    GRAPH_BACKEND: str = os.getenv("GRAPH_BACKEND", "auto")
+    GRAPH_SPARSE_THRESHOLD: int = int(os.getenv("GRAPH_SPARSE_THRESHOLD", "50000"))
+    # Grafos por análisis que cada proceso conserva en memoria para actualizarlos
+    # de forma incremental
+    GRAPH_REGISTRY_SIZE: int = int(os.getenv("GRAPH_REGISTRY_SIZE", "16"))
+    
+    # Detección de comunidades (Louvain) en un pool de procesos
+    CLUSTER_WORKERS: int = int(os.getenv("CLUSTER_WORKERS", "2"))
+    CLUSTER_SEED: int = int(os.getenv("CLUSTER_SEED", "42"))
+    
+    # Expansión del grafo a N saltos (parámetro `hops` al subir el CSV)
+    CRAWL_MAX_HOPS: int = int(os.getenv("CRAWL_MAX_HOPS", "3"))
+    CRAWL_MAX_NODES: int = int(os.getenv("CRAWL_MAX_NODES", "200"))  # Wallets expandidas por análisis
+    CRAWL_MAX_API_CALLS: int = int(os.getenv("CRAWL_MAX_API_CALLS", "1000"))
+    CRAWL_CONCURRENCY: int = int(os.getenv("CRAWL_CONCURRENCY", "5"))
+    # Historiales sincronizados hace menos de esto se leen solo del almacén local
+    CRAWL_CACHE_MAX_AGE_SECONDS: int = int(os.getenv("CRAWL_CACHE_MAX_AGE_SECONDS", "86400"))
+    
+    # Similitud de clusters: todos los pares hasta este tamaño, muestreo por encima
+    SIMILARITY_EXACT_MAX_WALLETS: int = int(os.getenv("SIMILARITY_EXACT_MAX_WALLETS", "5000"))
+    SIMILARITY_SAMPLE_PAIRS: int = int(os.getenv("SIMILARITY_SAMPLE_PAIRS", "50000"))
+    
+    # Índice persistente de wallets similares (MinHash + LSH); vacío lo desactiva
+    SIMILARITY_INDEX_PATH: str = os.getenv("SIMILARITY_INDEX_PATH", "data/similarity.db")
+    SIMILARITY_MINHASH_PERMUTATIONS: int = 64
+    SIMILARITY_LSH_BANDS: int = 16  # 4 filas por banda
+    SIMILARITY_MAX_CANDIDATES: int = int(os.getenv("SIMILARITY_MAX_CANDIDATES", "1000"))
+    
     # Configuración de reportes
     REPORT_TEMP_DIR: str = "temp_reports"
     PDF_TEMPLATE_PATH: str = "templates/report_template.html"
@@ -1,7 +1,10 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from routers import wallet
+from .routers import wallet
+from .services.community_detection import shutdown_executor
+from .services.http_client import http_client
+from .services.rate_limiter import rate_limiter
 import uvicorn
 
 app = FastAPI(
@@ -22,6 +25,17 @@ app.add_middleware(
 # Incluir routers
 app.include_router(wallet.router, prefix="/api/v1", tags=["wallet"])
 
+# Ciclo de vida de las conexiones compartidas
+@app.on_event("startup")
+async def startup():
+    await http_client.startup()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await http_client.shutdown()
+    wallet.analysis_service.blockchain_service.close_web3_connections()
+    shutdown_executor()
+
 # Manejador global de errores
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -38,5 +52,10 @@ async def global_exception_handler(request, exc):
 async def health_check():
     return {"status": "ok"}
 
+# Contadores de peticiones, throttling y reintentos hacia APIs externas
+@app.get("/metrics/upstream")
+async def upstream_metrics():
+    return rate_limiter.get_stats()
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
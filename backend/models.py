@@ -51,6 +51,7 @@ class WalletStats(BaseModel):
     last_transaction_date: datetime
     most_frequent_contracts: List[str]
     interaction_hours: Dict[int, int]  # Hora del día -> número de transacciones
+    source_status: Dict[str, str] = {}  # Fuente de historial -> "ok", "error", "timeout", "truncated"
 
 class WalletRelation(BaseModel):
     wallet_a: str
@@ -1,37 +1,68 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
-from fastapi.responses import JSONResponse, FileResponse
-from typing import List, Dict
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Request, Header
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, Response
+from fastapi.encoders import jsonable_encoder
+from typing import Dict, Optional, Union
+import asyncio
+import json
 import logging
 from ..services.csv_service import CSVService
-from ..services.blockchain_service import BlockchainService
-from ..services.openai_service import OpenAIService
-from ..services.graph_service import GraphService
-from ..models import AnalysisReport, WalletStats, AIAnalysis
+from ..services.analysis_service import AnalysisService
+from ..services.job_store import create_job_store, json_default
+from ..services.graph_service import edge_key
+from ..config import settings
 import tempfile
-import os
-from datetime import datetime
+import uuid
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Almacén de resultados de análisis (memoria, SQLite o Redis según configuración)
+job_store = create_job_store()
+
 # Instanciar servicios
 csv_service = CSVService()
-blockchain_service = BlockchainService()
-openai_service = OpenAIService()
-graph_service = GraphService()
+analysis_service = AnalysisService(job_store)
+
+# Con el almacén en memoria los workers no verían los trabajos encolados
+use_workers = settings.ANALYSIS_EXECUTION_MODE == "worker"
+if use_workers and settings.JOB_STORE_BACKEND == "memory":
+    logger.warning("ANALYSIS_EXECUTION_MODE=worker requiere un almacén compartido; se ejecuta en el proceso de la API")
+    use_workers = False
 
-# Variable global para almacenar resultados de análisis en memoria
-analysis_results = {}
+def _is_reusable(job: Optional[Dict]) -> bool:
+    """Un análisis sirve para deduplicar si no ha fallado ni se está cancelando"""
+    return (
+        job is not None
+        and job.get("status") in ("queued", "processing", "completed")
+        and not job.get("cancel_requested")
+    )
 
 @router.post("/upload-csv")
 async def upload_csv(
     file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = None
+    background_tasks: BackgroundTasks = None,
+    priority: int = 0,
+    force: bool = False,
+    hops: int = 0
 ):
     """
     Endpoint para subir archivo CSV con direcciones de wallet.
-    Inicia el análisis en segundo plano.
+    Inicia el análisis en segundo plano, o lo encola para los workers si
+    ANALYSIS_EXECUTION_MODE es "worker" (mayor `priority` se atiende antes).
+    
+    Si el mismo conjunto de direcciones se subió dentro de la ventana
+    ANALYSIS_DEDUP_WINDOW_SECONDS, se retorna el análisis existente en lugar
+    de repetirlo, salvo que se indique `force=true`.
+    
+    Con `hops` > 0 el grafo se expande a las contrapartes de las
+    contrapartes, hasta ese número de saltos (máximo CRAWL_MAX_HOPS).
     """
+    if not 0 <= hops <= settings.CRAWL_MAX_HOPS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"hops debe estar entre 0 y {settings.CRAWL_MAX_HOPS}"
+        )
+    
     try:
         # Validar que sea un archivo CSV
         if not file.filename.endswith('.csv'):
@@ -43,20 +74,73 @@ async def upload_csv(
         # Procesar el CSV
         grouped_addresses = await csv_service.process_csv(file)
         
+        wallets_count = sum(len(addrs) for addrs in grouped_addresses.values())
+        
+        fingerprint = csv_service.fingerprint_addresses(grouped_addresses, hops)
+        
         # Generar ID único para este análisis
-        analysis_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        analysis_id = uuid.uuid4().hex
         
-        # Iniciar análisis en segundo plano
-        background_tasks.add_task(
-            analyze_wallets,
-            grouped_addresses,
-            analysis_id
-        )
+        # Registrar el trabajo antes de lanzarlo para que el estado sea consultable
+        await job_store.create(analysis_id, {
+            "status": "queued",
+            "progress": 0,
+            "message": "Análisis en cola",
+            "priority": priority,
+            "grouped_addresses": grouped_addresses,
+            "hops": hops,
+            "fingerprint": fingerprint
+        })
+        
+        if force:
+            await job_store.set_fingerprint(
+                fingerprint,
+                analysis_id,
+                settings.ANALYSIS_DEDUP_WINDOW_SECONDS
+            )
+        else:
+            # Reutilizar un análisis idéntico reciente que no haya fallado ni
+            # se esté cancelando. La huella se reclama de forma atómica: de
+            # dos subidas idénticas simultáneas solo una lanza el análisis
+            replace = None
+            while True:
+                owner_id = await job_store.claim_fingerprint(
+                    fingerprint,
+                    analysis_id,
+                    settings.ANALYSIS_DEDUP_WINDOW_SECONDS,
+                    replace=replace
+                )
+                if owner_id == analysis_id:
+                    break
+                owner = await job_store.get(owner_id)
+                if _is_reusable(owner):
+                    await job_store.delete(analysis_id)
+                    return {
+                        "message": "Análisis idéntico reciente encontrado",
+                        "analysis_id": owner_id,
+                        "wallets_count": wallets_count,
+                        "deduplicated": True
+                    }
+                # El análisis anterior no sirve: sustituirlo si nadie se adelanta
+                replace = owner_id
+        
+        if use_workers:
+            # Lo recogerá el siguiente worker libre
+            await job_store.enqueue(analysis_id, priority)
+        else:
+            # Iniciar análisis en segundo plano
+            background_tasks.add_task(
+                analysis_service.analyze_wallets,
+                grouped_addresses,
+                analysis_id,
+                hops
+            )
         
         return {
             "message": "Archivo CSV procesado correctamente",
             "analysis_id": analysis_id,
-            "wallets_count": sum(len(addrs) for addrs in grouped_addresses.values())
+            "wallets_count": wallets_count,
+            "deduplicated": False
         }
         
     except Exception as e:
@@ -72,15 +156,18 @@ async def get_analysis_status(analysis_id: str):
     Obtiene el estado actual del análisis.
     """
     try:
-        if analysis_id not in analysis_results:
+        result = await job_store.get(analysis_id)
+        if result is None:
             return {"status": "not_found"}
             
-        result = analysis_results[analysis_id]
         return {
             "status": result.get("status", "processing"),
             "progress": result.get("progress", 0),
             "message": result.get("message", ""),
-            "error": result.get("error", None)
+            "error": result.get("error", None),
+            # Alguna wallet falló o se analizó con historial o precios incompletos
+            "degraded": result.get("degraded", False),
+            "degraded_wallets": result.get("degraded_wallets", 0)
         }
         
     except Exception as e:
@@ -90,27 +177,185 @@ async def get_analysis_status(analysis_id: str):
             detail="Error obteniendo estado del análisis"
         )
 
-@router.get("/analysis/{analysis_id}/report")
-async def get_analysis_report(analysis_id: str):
+@router.get("/analysis/{analysis_id}/events")
+async def stream_analysis_events(analysis_id: str, request: Request):
+    """
+    Stream (Server-Sent Events) con el progreso del análisis: cambios de
+    etapa, progreso y resultados parciales de cada wallet a medida que se
+    generan. Sustituye al sondeo periódico de /status, que se mantiene
+    por compatibilidad.
+    """
+    job = await job_store.get(analysis_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Análisis no encontrado"
+        )
+    
+    terminal_events = ("completed", "error", "cancelled")
+    
+    async def event_stream():
+        # Un cliente que se reconecta continúa desde el último evento recibido
+        last_event_id = request.headers.get("last-event-id")
+        last_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+        
+        # Estado actual para que el cliente no tenga que esperar al próximo evento
+        snapshot = {
+            key: job.get(key)
+            for key in ("status", "stage", "progress", "message", "error")
+        }
+        yield f"event: status\ndata: {json.dumps(snapshot, default=json_default)}\n\n"
+        if job.get("status") in terminal_events and last_id == 0:
+            return
+        
+        idle_seconds = 0.0
+        while not await request.is_disconnected():
+            events = await job_store.get_events(analysis_id, last_id)
+            for event in events:
+                last_id = event["id"]
+                data = json.dumps(event["data"], default=json_default)
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+                if event["type"] in terminal_events:
+                    return
+            
+            if events:
+                idle_seconds = 0.0
+            else:
+                idle_seconds += settings.SSE_POLL_INTERVAL_SECONDS
+                # Comentario periódico para mantener viva la conexión a través de proxies
+                if idle_seconds >= settings.SSE_KEEPALIVE_SECONDS:
+                    idle_seconds = 0.0
+                    yield ": keepalive\n\n"
+                    # El trabajo pudo expirar o desaparecer sin evento final
+                    if await job_store.get(analysis_id) is None:
+                        return
+            
+            await asyncio.sleep(settings.SSE_POLL_INTERVAL_SECONDS)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+@router.post("/analysis/{analysis_id}/cancel")
+async def cancel_analysis(analysis_id: str):
     """
-    Obtiene el reporte completo del análisis.
+    Cancela un análisis en cola o en ejecución.
     """
     try:
-        if analysis_id not in analysis_results:
+        result = await job_store.get(analysis_id)
+        if result is None:
             raise HTTPException(
                 status_code=404,
                 detail="Análisis no encontrado"
             )
-            
-        result = analysis_results[analysis_id]
         
-        if result.get("status") != "completed":
+        if result.get("status") in ("completed", "error", "cancelled"):
             raise HTTPException(
                 status_code=400,
-                detail="El análisis aún no ha terminado"
+                detail="El análisis ya ha terminado"
             )
-            
-        return result.get("report", {})
+        
+        if await job_store.remove_from_queue(analysis_id):
+            # Aún no lo había tomado ningún worker
+            await job_store.update(analysis_id, {
+                "status": "cancelled",
+                "message": "Análisis cancelado",
+                "cancel_requested": True
+            })
+            await job_store.publish_event(analysis_id, "cancelled", {
+                "status": "cancelled",
+                "message": "Análisis cancelado"
+            })
+        else:
+            # El análisis en curso se detiene en su siguiente punto de control
+            await job_store.update(analysis_id, {
+                "message": "Cancelando análisis",
+                "cancel_requested": True
+            })
+        
+        return {"status": "cancelling", "analysis_id": analysis_id}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error cancelando análisis: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error cancelando el análisis"
+        )
+
+def _etag(analysis_id: str, version: Union[int, str]) -> str:
+    return f'"{analysis_id}-{version}"'
+
+def _versioned_response(content: Dict, etag: str, if_none_match: Optional[str]):
+    """
+    Respuesta JSON con ETag. Si el cliente ya tiene esa versión se responde
+    304 sin cuerpo.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jsonable_encoder(content), headers=headers)
+
+@router.get("/analysis/{analysis_id}/report")
+async def get_analysis_report(
+    analysis_id: str,
+    since_version: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Obtiene el reporte del análisis.
+    
+    Mientras el análisis está en curso se retorna el reporte parcial: las
+    estadísticas de cada wallet ya analizada, el grafo en cuanto termina la
+    ingesta y los insights de IA a medida que llegan. Con `since_version`
+    solo se incluyen las secciones añadidas después de esa versión; el
+    ETag permite revalidar con If-None-Match.
+    """
+    try:
+        result = await job_store.get(analysis_id)
+        if result is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Análisis no encontrado"
+            )
+        
+        status = result.get("status")
+        version = result.get("report_version", 0)
+        etag = _etag(analysis_id, version)
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            # Revalidación sin leer los artefactos
+            return _versioned_response({}, etag, if_none_match)
+        
+        report = {}
+        if status == "completed":
+            report = await job_store.get_artifact(analysis_id, "results", "report") or {}
+            # Sin versión previa, un análisis terminado retorna el reporte completo
+            if since_version is None:
+                return _versioned_response(report, etag, if_none_match)
+        
+        since = since_version or 0
+        graph_data = None
+        if result.get("graph_version", 0) > since:
+            graph_data = await job_store.get_artifact(analysis_id, "results", "graph")
+        
+        return _versioned_response({
+            "analysis_id": analysis_id,
+            "status": status,
+            "complete": status == "completed",
+            "version": version,
+            "since_version": since,
+            "wallets_analyzed": await job_store.list_artifacts(analysis_id, "wallets", since),
+            "graph_data": graph_data,
+            "ai_insights": await job_store.list_artifacts(analysis_id, "ai_insights", since),
+            "relationships": report.get("relationships"),
+            "summary": report.get("summary")
+        }, etag, if_none_match)
         
     except HTTPException:
         raise
@@ -122,26 +367,37 @@ async def get_analysis_report(analysis_id: str):
         )
 
 @router.get("/analysis/{analysis_id}/graph")
-async def get_analysis_graph(analysis_id: str):
+async def get_analysis_graph(
+    analysis_id: str,
+    if_none_match: Optional[str] = Header(None)
+):
     """
-    Obtiene el grafo de transacciones del análisis.
+    Obtiene el grafo de transacciones del análisis. Está disponible en
+    cuanto termina la ingesta, sin esperar al análisis con IA.
     """
     try:
-        if analysis_id not in analysis_results:
+        result = await job_store.get(analysis_id)
+        if result is None:
             raise HTTPException(
                 status_code=404,
                 detail="Análisis no encontrado"
             )
-            
-        result = analysis_results[analysis_id]
         
-        if result.get("status") != "completed":
+        graph_version = result.get("graph_version", 0)
+        graph_data = None
+        if graph_version:
+            graph_data = await job_store.get_artifact(analysis_id, "results", "graph")
+        if graph_data is None:
             raise HTTPException(
                 status_code=400,
-                detail="El análisis aún no ha terminado"
+                detail="El grafo aún no está disponible"
             )
-            
-        return result.get("graph_data", {"nodes": [], "edges": []})
+        
+        return _versioned_response(
+            graph_data,
+            _etag(analysis_id, graph_version),
+            if_none_match
+        )
         
     except HTTPException:
         raise
@@ -152,19 +408,157 @@ async def get_analysis_graph(analysis_id: str):
             detail="Error obteniendo grafo del análisis"
         )
 
+@router.get("/analysis/{analysis_id}/graph/edges/{source}/{target}")
+async def get_edge_transactions(
+    analysis_id: str,
+    source: str,
+    target: str,
+    offset: int = 0,
+    limit: int = 100
+):
+    """
+    Obtiene las transacciones de una arista del grafo. El grafo solo incluye
+    los agregados de cada arista; el detalle se pide bajo demanda.
+    """
+    try:
+        result = await job_store.get(analysis_id)
+        if result is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Análisis no encontrado"
+            )
+        
+        if not result.get("graph_version"):
+            raise HTTPException(
+                status_code=400,
+                detail="El grafo aún no está disponible"
+            )
+        
+        # Cada arista es un artefacto propio: se lee solo la pedida
+        transactions = await job_store.get_artifact(
+            analysis_id,
+            "edges",
+            edge_key(source.lower(), target.lower())
+        )
+        if transactions is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Arista no encontrada"
+            )
+        
+        return {
+            "source": source.lower(),
+            "target": target.lower(),
+            "total": len(transactions),
+            "offset": offset,
+            "transactions": transactions[offset:offset + limit]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error obteniendo transacciones de la arista: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error obteniendo transacciones de la arista"
+        )
+
+@router.get("/analysis/{analysis_id}/clusters")
+async def get_analysis_clusters(
+    analysis_id: str,
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Obtiene los clusters de wallets relacionadas detectados en el grafo del
+    análisis. Se calculan una vez por versión del grafo, al terminar su etapa.
+    """
+    try:
+        result = await job_store.get(analysis_id)
+        if result is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Análisis no encontrado"
+            )
+        
+        clusters = None
+        if result.get("clusters_graph_hash") is not None:
+            clusters = await job_store.get_artifact(analysis_id, "results", "clusters")
+        if clusters is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Los clusters aún no están disponibles"
+            )
+        
+        return _versioned_response(
+            {"analysis_id": analysis_id, "clusters": clusters},
+            _etag(analysis_id, result.get("clusters_graph_hash")),
+            if_none_match
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error obteniendo clusters: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error obteniendo clusters del análisis"
+        )
+
+@router.get("/wallets/{address}/similar")
+async def get_similar_wallets(
+    address: str,
+    k: int = 10,
+    blockchain: Optional[str] = None
+):
+    """
+    Busca, entre todas las wallets analizadas, las `k` con un comportamiento
+    más parecido (horario, contratos, tokens y volumen).
+    """
+    try:
+        similarity_index = analysis_service.similarity_index
+        if not similarity_index.enabled:
+            raise HTTPException(
+                status_code=503,
+                detail="Índice de similitud deshabilitado"
+            )
+        
+        results = await similarity_index.find_similar(
+            address,
+            blockchain.lower() if blockchain else None,
+            max(1, min(k, 100))
+        )
+        if results is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Wallet no encontrada en el índice"
+            )
+        
+        return {
+            "address": address.lower(),
+            "similar_wallets": results
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error buscando wallets similares: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error buscando wallets similares"
+        )
+
 @router.get("/analysis/{analysis_id}/download/{format}")
 async def download_report(analysis_id: str, format: str):
     """
     Descarga el reporte en formato PDF o CSV.
     """
     try:
-        if analysis_id not in analysis_results:
+        result = await job_store.get(analysis_id)
+        if result is None:
             raise HTTPException(
                 status_code=404,
                 detail="Análisis no encontrado"
             )
-            
-        result = analysis_results[analysis_id]
         
         if result.get("status") != "completed":
             raise HTTPException(
@@ -177,6 +571,13 @@ async def download_report(analysis_id: str, format: str):
                 status_code=400,
                 detail="Formato no soportado"
             )
+        
+        report = await job_store.get_artifact(analysis_id, "results", "report")
+        if report is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Reporte no encontrado"
+            )
             
         # Crear archivo temporal
         with tempfile.NamedTemporaryFile(
@@ -185,11 +586,11 @@ async def download_report(analysis_id: str, format: str):
         ) as tmp_file:
             if format.lower() == "csv":
                 # Exportar a CSV
-                csv_content = await csv_service.export_results_to_csv(result["report"])
+                csv_content = await csv_service.export_results_to_csv(report)
                 tmp_file.write(csv_content)
             else:
                 # Generar PDF (implementar en una función separada)
-                generate_pdf_report(result["report"], tmp_file.name)
+                generate_pdf_report(report, tmp_file.name)
             
             return FileResponse(
                 tmp_file.name,
@@ -206,135 +607,6 @@ async def download_report(analysis_id: str, format: str):
             detail="Error generando archivo de reporte"
         )
 
-async def analyze_wallets(
-    grouped_addresses: Dict[str, List[str]],
-    analysis_id: str
-):
-    """
-    Función de análisis en segundo plano.
-    """
-    try:
-        # Inicializar resultado
-        analysis_results[analysis_id] = {
-            "status": "processing",
-            "progress": 0,
-            "message": "Iniciando análisis"
-        }
-        
-        # Analizar cada wallet
-        all_wallet_stats = []
-        total_wallets = sum(len(addrs) for addrs in grouped_addresses.values())
-        wallets_processed = 0
-        
-        for blockchain, addresses in grouped_addresses.items():
-            for address in addresses:
-                try:
-                    # Actualizar progreso
-                    wallets_processed += 1
-                    progress = int((wallets_processed / total_wallets) * 100)
-                    analysis_results[analysis_id].update({
-                        "progress": progress,
-                        "message": f"Analizando wallet {address}"
-                    })
-                    
-                    # Obtener datos de la blockchain
-                    wallet_data = await blockchain_service.analyze_wallet_interactions(
-                        address,
-                        blockchain
-                    )
-                    
-                    if wallet_data:
-                        all_wallet_stats.append(WalletStats(**wallet_data))
-                        
-                except Exception as e:
-                    logger.error(f"Error analizando wallet {address}: {str(e)}")
-                    continue
-        
-        # Crear grafo de transacciones
-        analysis_results[analysis_id].update({
-            "message": "Generando grafo de transacciones"
-        })
-        
-        graph_data = graph_service.create_transaction_graph(
-            [tx for stats in all_wallet_stats for tx in stats.transactions],
-            {stats.address: stats.dict() for stats in all_wallet_stats}
-        )
-        
-        # Analizar con GPT
-        analysis_results[analysis_id].update({
-            "message": "Realizando análisis con IA"
-        })
-        
-        ai_insights = []
-        for stats in all_wallet_stats:
-            analysis = await openai_service.analyze_wallet_patterns(stats)
-            ai_insights.append(analysis)
-        
-        # Analizar relaciones
-        relationships = await openai_service.analyze_wallet_relationships(
-            all_wallet_stats,
-            graph_data.dict()
-        )
-        
-        # Crear reporte final
-        report = AnalysisReport(
-            timestamp=datetime.now(),
-            wallets_analyzed=all_wallet_stats,
-            relationships=relationships,
-            graph_data=graph_data,
-            ai_insights=ai_insights,
-            summary=generate_summary(all_wallet_stats, relationships, ai_insights)
-        )
-        
-        # Guardar resultados
-        analysis_results[analysis_id].update({
-            "status": "completed",
-            "progress": 100,
-            "message": "Análisis completado",
-            "report": report.dict(),
-            "graph_data": graph_data.dict()
-        })
-        
-    except Exception as e:
-        logger.error(f"Error en análisis: {str(e)}")
-        analysis_results[analysis_id].update({
-            "status": "error",
-            "error": str(e)
-        })
-
-def generate_summary(
-    wallet_stats: List[WalletStats],
-    relationships: List[Dict],
-    ai_insights: List[AIAnalysis]
-) -> str:
-    """
-    Genera un resumen del análisis.
-    """
-    total_volume = sum(
-        stats.total_sent_usd + stats.total_received_usd
-        for stats in wallet_stats
-    )
-    
-    high_risk_wallets = [
-        insight.wallet_address
-        for insight in ai_insights
-        if insight.risk_score > 0.7
-    ]
-    
-    strong_relationships = [
-        rel for rel in relationships
-        if rel["confidence_score"] > 0.8
-    ]
-    
-    summary = f"""
-    Análisis completado para {len(wallet_stats)} wallets.
-    Volumen total analizado: ${total_volume:,.2f} USD
-    Wallets de alto riesgo identificadas: {len(high_risk_wallets)}
-    Relaciones fuertes detectadas: {len(strong_relationships)}
-    """
-    
-    return summary
-
 def generate_pdf_report(report_data: Dict, output_path: str):
     """
     Genera un reporte PDF.
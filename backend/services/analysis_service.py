@@ -0,0 +1,357 @@
+from typing import List, Dict, Optional
+import logging
+from datetime import datetime
+from ..models import AnalysisReport, WalletStats, AIAnalysis
+from .blockchain_service import BlockchainService
+from .openai_service import OpenAIService
+from .graph_service import GraphRegistry
+from .wallet_scheduler import WalletScheduler
+from .job_store import JobStore
+from .compact_transaction import TransactionSet
+from .crawl_service import CrawlService
+from .similarity_index import SimilarityIndex
+
+logger = logging.getLogger(__name__)
+
+class AnalysisCancelled(Exception):
+    """El usuario canceló el análisis mientras se ejecutaba"""
+
+class PartialReport:
+    """
+    Reporte que se va completando mientras el análisis avanza. Cada sección
+    nueva incrementa `version` y se guarda como artefacto del trabajo
+    marcado con ella, de modo que un cliente puede pedir solo lo añadido
+    desde la última versión que leyó. El trabajo solo guarda las versiones.
+    """
+    def __init__(self, job_store: JobStore, analysis_id: str):
+        self.job_store = job_store
+        self.analysis_id = analysis_id
+        self.version = 0
+        self.graph_version = 0
+
+    async def add_wallet(self, stats: WalletStats) -> Dict:
+        self.version += 1
+        await self.job_store.put_artifacts(
+            self.analysis_id, "wallets", {str(self.version): stats.dict()}, self.version
+        )
+        return self.fields()
+
+    async def set_graph(self, graph_data: Dict, edge_transactions: Dict[str, List[Dict]]) -> Dict:
+        self.version += 1
+        self.graph_version = self.version
+        # Detalle por arista, servido bajo demanda fuera del grafo
+        await self.job_store.put_artifacts(self.analysis_id, "edges", edge_transactions, self.version)
+        await self.job_store.put_artifacts(self.analysis_id, "results", {"graph": graph_data}, self.version)
+        return self.fields()
+
+    async def add_insight(self, insight: AIAnalysis) -> Dict:
+        self.version += 1
+        await self.job_store.put_artifacts(
+            self.analysis_id, "ai_insights", {str(self.version): insight.dict()}, self.version
+        )
+        return self.fields()
+
+    async def set_report(self, report: AnalysisReport) -> Dict:
+        self.version += 1
+        await self.job_store.put_artifacts(self.analysis_id, "results", {"report": report.dict()}, self.version)
+        return self.fields()
+
+    def fields(self) -> Dict:
+        """Campos del trabajo que describen el reporte parcial"""
+        return {
+            "report_version": self.version,
+            "graph_version": self.graph_version
+        }
+
+class AnalysisService:
+    def __init__(
+        self,
+        job_store: JobStore,
+        blockchain_service: Optional[BlockchainService] = None,
+        openai_service: Optional[OpenAIService] = None,
+        graph_registry: Optional[GraphRegistry] = None,
+        wallet_scheduler: Optional[WalletScheduler] = None,
+        similarity_index: Optional[SimilarityIndex] = None,
+        crawl_service: Optional[CrawlService] = None
+    ):
+        self.job_store = job_store
+        self.blockchain_service = blockchain_service or BlockchainService()
+        self.openai_service = openai_service or OpenAIService()
+        # Un grafo por trabajo; los análisis concurrentes no comparten estado
+        self.graph_registry = graph_registry or GraphRegistry()
+        self.wallet_scheduler = wallet_scheduler or WalletScheduler()
+        self.similarity_index = similarity_index or SimilarityIndex()
+        self.crawl_service = crawl_service or CrawlService(self.blockchain_service)
+
+    async def _update_job(
+        self,
+        analysis_id: str,
+        event_type: str,
+        fields: Dict,
+        payload: Optional[Dict] = None
+    ):
+        """
+        Actualiza el trabajo y publica el cambio como evento para los clientes
+        suscritos al stream de progreso.
+        """
+        await self.job_store.update(analysis_id, fields)
+        await self.job_store.publish_event(analysis_id, event_type, dict(fields, **(payload or {})))
+
+    async def _check_cancelled(self, analysis_id: str):
+        """Interrumpe el análisis si se ha solicitado su cancelación"""
+        job = await self.job_store.get(analysis_id)
+        if job is None or job.get("cancel_requested"):
+            raise AnalysisCancelled()
+
+    async def analyze_wallets(
+        self,
+        grouped_addresses: Dict[str, List[str]],
+        analysis_id: str,
+        hops: int = 0
+    ):
+        """
+        Ejecuta el análisis completo de un trabajo y guarda el progreso y el
+        resultado en el almacén de trabajos. Se usa tanto desde el proceso de
+        la API como desde los workers.
+        
+        Con `hops` > 0 el grafo incluye además las contrapartes hasta ese
+        número de saltos (ver CrawlService).
+        """
+        try:
+            # Inicializar resultado
+            await self._update_job(analysis_id, "stage", {
+                "status": "processing",
+                "stage": "ingestion",
+                "progress": 0,
+                "message": "Iniciando análisis"
+            })
+
+            # Analizar las wallets en paralelo con concurrencia acotada
+            all_wallet_stats = []
+            wallet_stats_by_key = {}
+            partial = PartialReport(self.job_store, analysis_id)
+            # Transacciones de todo el lote para la etapa del grafo
+            batch_transactions = TransactionSet()
+            total_wallets = sum(len(addrs) for addrs in grouped_addresses.values())
+            wallets_processed = 0
+            # Wallets que fallaron o cuyo historial/precios quedaron incompletos
+            degraded_wallets = 0
+
+            async def analyze_wallet(address, blockchain):
+                return await self.blockchain_service.analyze_wallet_interactions(
+                    address,
+                    blockchain,
+                    transaction_set=batch_transactions
+                )
+
+            async def on_wallet_analyzed(address, blockchain, wallet_data, error):
+                # Actualizar progreso
+                nonlocal wallets_processed, degraded_wallets
+                wallets_processed += 1
+                progress = int((wallets_processed / total_wallets) * 100)
+                
+                # Publicar las estadísticas en el reporte parcial en cuanto estén listas
+                stats = None
+                if wallet_data:
+                    try:
+                        stats = WalletStats(**wallet_data)
+                        wallet_stats_by_key[(address, blockchain)] = stats
+                    except Exception as e:
+                        logger.error(f"Error analizando wallet {address}: {str(e)}")
+                        error = error or e
+                
+                fields = {
+                    "progress": progress,
+                    "message": f"Wallet {address} analizada ({wallets_processed}/{total_wallets})"
+                }
+                if stats is not None:
+                    fields.update(await partial.add_wallet(stats))
+                if error or stats is None or any(
+                    status in ("error", "timeout") for status in stats.source_status.values()
+                ):
+                    degraded_wallets += 1
+                    fields.update(degraded=True, degraded_wallets=degraded_wallets)
+                await self.job_store.update(analysis_id, fields)
+                await self.job_store.publish_event(analysis_id, "wallet", {
+                    "progress": progress,
+                    "message": fields["message"],
+                    "report_version": partial.version,
+                    "address": address,
+                    "blockchain": blockchain,
+                    "wallet_stats": stats.dict() if stats is not None else None,
+                    "error": str(error) if error else None
+                })
+
+            # No se empiezan wallets nuevas en un análisis cancelado
+            results = await self.wallet_scheduler.run(
+                grouped_addresses,
+                analyze_wallet,
+                on_wallet_analyzed,
+                check_cancelled=lambda: self._check_cancelled(analysis_id)
+            )
+            await self._check_cancelled(analysis_id)
+
+            # Mantener el orden del CSV en el reporte final
+            for address, blockchain, _ in results:
+                stats = wallet_stats_by_key.get((address, blockchain))
+                if stats is not None:
+                    all_wallet_stats.append(stats)
+
+            # Registrar las wallets en el índice de similitud entre análisis
+            await self._index_wallets(all_wallet_stats)
+            
+            # Expandir el grafo a contrapartes de las contrapartes
+            if hops > 0:
+                await self._check_cancelled(analysis_id)
+                await self._update_job(analysis_id, "stage", {
+                    "stage": "expansion",
+                    "message": f"Expandiendo el grafo a {hops} saltos"
+                })
+                crawl = await self.crawl_service.expand(
+                    grouped_addresses,
+                    hops,
+                    batch_transactions,
+                    check_cancelled=lambda: self._check_cancelled(analysis_id)
+                )
+                await self._update_job(analysis_id, "expansion", {"crawl": crawl})
+            
+            # Crear grafo de transacciones
+            await self._update_job(analysis_id, "stage", {
+                "stage": "graph",
+                "message": "Generando grafo de transacciones"
+            })
+
+            # Repetir el análisis de la misma lista de wallets reutiliza su
+            # grafo: solo se añaden las transacciones nuevas y se quitan las
+            # que han salido de la ventana. El grafo es de uso exclusivo de
+            # este trabajo hasta que termina la detección de clusters
+            job = await self.job_store.get(analysis_id) or {}
+            with self.graph_registry.checkout(job.get("fingerprint") or analysis_id) as graph_service:
+                graph_service.sync_transactions(
+                    list(batch_transactions),
+                    {stats.address.lower(): stats.dict() for stats in all_wallet_stats}
+                )
+                graph_data = graph_service.get_graph_data()
+                
+                # El grafo queda disponible sin esperar al análisis con IA
+                await self.job_store.update(
+                    analysis_id,
+                    await partial.set_graph(graph_data.dict(), graph_service.get_edge_transactions())
+                )
+                await self.job_store.publish_event(analysis_id, "graph", {
+                    "report_version": partial.version
+                })
+
+                # Clusters de wallets relacionadas; Louvain corre en el pool de
+                # procesos y se reutiliza si el grafo no ha cambiado
+                await self._check_cancelled(analysis_id)
+                clusters = await graph_service.detect_clusters()
+                clusters_graph_hash = graph_service.graph_hash
+            
+            await self.job_store.put_artifacts(analysis_id, "results", {"clusters": clusters})
+            await self.job_store.update(analysis_id, {
+                "clusters_graph_hash": clusters_graph_hash
+            })
+            await self.job_store.publish_event(analysis_id, "clusters", {
+                "clusters_count": len(clusters)
+            })
+
+            # Analizar con GPT
+            await self._check_cancelled(analysis_id)
+            await self._update_job(analysis_id, "stage", {
+                "stage": "ai",
+                "message": "Realizando análisis con IA"
+            })
+
+            ai_insights = []
+            for stats in all_wallet_stats:
+                await self._check_cancelled(analysis_id)
+                analysis = await self.openai_service.analyze_wallet_patterns(stats)
+                ai_insights.append(analysis)
+                await self.job_store.update(analysis_id, await partial.add_insight(analysis))
+
+            # Analizar relaciones
+            relationships = await self.openai_service.analyze_wallet_relationships(
+                all_wallet_stats,
+                graph_data.dict()
+            )
+
+            # Crear reporte final
+            report = AnalysisReport(
+                timestamp=datetime.now(),
+                wallets_analyzed=all_wallet_stats,
+                relationships=relationships,
+                graph_data=graph_data,
+                ai_insights=ai_insights,
+                summary=generate_summary(all_wallet_stats, relationships, ai_insights)
+            )
+
+            # Guardar resultados
+            await self.job_store.update(analysis_id, await partial.set_report(report))
+            await self._update_job(analysis_id, "completed", {
+                "status": "completed",
+                "stage": "completed",
+                "progress": 100,
+                "message": (
+                    f"Análisis completado con datos incompletos en {degraded_wallets} wallets"
+                    if degraded_wallets else "Análisis completado"
+                )
+            })
+
+        except AnalysisCancelled:
+            logger.info(f"Análisis {analysis_id} cancelado")
+            await self._update_job(analysis_id, "cancelled", {
+                "status": "cancelled",
+                "message": "Análisis cancelado"
+            })
+
+        except Exception as e:
+            logger.error(f"Error en análisis: {str(e)}")
+            await self._update_job(analysis_id, "error", {
+                "status": "error",
+                "error": str(e)
+            })
+
+    async def _index_wallets(self, wallet_stats: List[WalletStats]):
+        """Añade las wallets analizadas al índice de wallets similares"""
+        try:
+            by_blockchain: Dict[str, List[Dict]] = {}
+            for stats in wallet_stats:
+                by_blockchain.setdefault(stats.blockchain, []).append(stats.dict())
+            for blockchain, wallets in by_blockchain.items():
+                await self.similarity_index.add_wallets(blockchain, wallets)
+        except Exception as e:
+            logger.error(f"Error actualizando índice de similitud: {str(e)}")
+
+def generate_summary(
+    wallet_stats: List[WalletStats],
+    relationships: List[Dict],
+    ai_insights: List[AIAnalysis]
+) -> str:
+    """
+    Genera un resumen del análisis.
+    """
+    total_volume = sum(
+        stats.total_sent_usd + stats.total_received_usd
+        for stats in wallet_stats
+    )
+
+    high_risk_wallets = [
+        insight.wallet_address
+        for insight in ai_insights
+        if insight.risk_score > 0.7
+    ]
+
+    strong_relationships = [
+        rel for rel in relationships
+        if rel["confidence_score"] > 0.8
+    ]
+
+    summary = f"""
+    Análisis completado para {len(wallet_stats)} wallets.
+    Volumen total analizado: ${total_volume:,.2f} USD
+    Wallets de alto riesgo identificadas: {len(high_risk_wallets)}
+    Relaciones fuertes detectadas: {len(strong_relationships)}
+    """
+
+    return summary
@@ -1,36 +1,134 @@
-from typing import List, Dict, Optional
+from typing import Any, AsyncIterator, Callable, Iterable, List, Dict, Optional, Set, Tuple
 import logging
 from web3 import Web3
-from moralis import evm_api
 import asyncio
-from datetime import datetime, timedelta
+import requests
+from contextvars import ContextVar
+import pandas as pd
+from requests.adapters import HTTPAdapter
+from datetime import datetime, timedelta, timezone
 from ..config import settings
 from ..models import Transaction, TokenInfo
-import aiohttp
+from ..utils import (
+    POW10,
+    calculate_usd_micros_array,
+    parse_base_units,
+    parse_block_timestamp,
+    scale_price
+)
+from .price_cache import PriceCache, PriceKey, NATIVE_TOKEN_KEY
+from .transaction_store import TransactionStore
+from .compact_transaction import CompactTransaction, TransactionSet
+from .http_client import http_client, classify_http_error
+from .rate_limiter import rate_limiter
+from .wallet_stats import (
+    compute_wallet_stats,
+    empty_transactions_frame,
+    empty_wallet_stats,
+    transactions_to_frame
+)
 import json
 
 logger = logging.getLogger(__name__)
 
+# Contador de llamadas a Moralis. Quien necesite medir su consumo (por
+# ejemplo, el presupuesto de un rastreo) fija aquí una lista [0]; las tareas
+# creadas a partir de ese contexto comparten la misma lista.
+api_call_counter: ContextVar[Optional[List[int]]] = ContextVar("api_call_counter", default=None)
+
 class BlockchainService:
     def __init__(self):
         self.moralis_api_key = settings.MORALIS_API_KEY
         self.web3_connections = {}
+        self.rpc_sessions: Dict[str, requests.Session] = {}
+        self.price_cache = PriceCache()
+        self.transaction_store = TransactionStore()
+        self._pending_prices: Dict[PriceKey, asyncio.Future] = {}
+        # Bloque de inicio de cada bucket de precios por (blockchain, epoch)
+        self.bucket_blocks: Dict[Tuple[str, int], int] = {}
+        # Metadatos de tokens por (blockchain, dirección); None si Moralis no lo conoce
+        self.token_metadata: Dict[Tuple[str, str], Optional[Dict]] = {}
+        self._pending_metadata: Dict[Tuple[str, str], asyncio.Future] = {}
+        # Fuentes de historial consultadas en paralelo para cada wallet
+        self.transaction_sources: Dict[str, Callable] = {
+            "native": self._iter_moralis_transactions,
+            "erc20": self._iter_moralis_token_transfers
+        }
         self.initialize_web3_connections()
 
     def initialize_web3_connections(self):
         """Inicializa conexiones Web3 para cada blockchain soportada"""
         for chain, config in settings.SUPPORTED_CHAINS.items():
             try:
-                self.web3_connections[chain] = Web3(Web3.HTTPProvider(config['rpc_url']))
+                # Sesión propia por RPC con pool keep-alive reutilizado entre llamadas
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.HTTP_POOL_SIZE_PER_HOST
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.rpc_sessions[chain] = session
+                self.web3_connections[chain] = Web3(
+                    Web3.HTTPProvider(config['rpc_url'], session=session)
+                )
                 logger.info(f"Conexión Web3 inicializada para {chain}")
             except Exception as e:
                 logger.error(f"Error inicializando Web3 para {chain}: {str(e)}")
 
+    def close_web3_connections(self):
+        """Cierra los pools de conexiones RPC"""
+        for chain, session in self.rpc_sessions.items():
+            try:
+                session.close()
+            except Exception as e:
+                logger.error(f"Error cerrando conexión Web3 para {chain}: {str(e)}")
+        self.rpc_sessions.clear()
+
+    @staticmethod
+    def _moralis_chain(blockchain: str) -> str:
+        """Identificador de la blockchain en Moralis (chain id en hexadecimal)"""
+        return hex(settings.SUPPORTED_CHAINS[blockchain]["chain_id"])
+
+    async def _moralis_request(
+        self,
+        method: str,
+        path: str,
+        params: Any = None,
+        body: Any = None
+    ) -> Any:
+        """
+        Realiza una llamada a la API REST de Moralis por la sesión HTTP compartida,
+        con límite de tasa y reintentos ante 429/5xx.
+        
+        Raises:
+            Excepción de aiohttp si la llamada falla tras agotar los reintentos
+        """
+        counter = api_call_counter.get()
+        if counter is not None:
+            counter[0] += 1
+        return await rate_limiter.call(
+            "moralis",
+            self.moralis_api_key,
+            lambda: http_client.request_json(
+                method,
+                f"{settings.MORALIS_API_URL}{path}",
+                params=params,
+                json_body=body,
+                headers={
+                    "X-API-Key": self.moralis_api_key,
+                    "accept": "application/json"
+                }
+            ),
+            classify_http_error
+        )
+
     async def get_wallet_transactions(
         self,
         address: str,
         blockchain: str,
-        days: int = 30
+        days: int = 30,
+        source_status: Optional[Dict[str, str]] = None
     ) -> List[Transaction]:
         """
         Obtiene las transacciones de una wallet usando Moralis API.
@@ -39,101 +137,542 @@ class BlockchainService:
             address: Dirección de la wallet
             blockchain: Nombre de la blockchain
             days: Número de días hacia atrás para buscar
+            source_status: Dict opcional donde se registra el estado de cada fuente
             
         Returns:
             Lista de transacciones
+            
+        Raises:
+            El error de la consulta si falla tras los reintentos
         """
-        try:
-            # Configurar parámetros para Moralis
-            params = {
-                "address": address,
-                "chain": blockchain,
-                "from_date": (datetime.now() - timedelta(days=days)).isoformat()
-            }
+        all_transactions = []
+        async for batch in self.iter_wallet_transactions(
+            address, blockchain, days, source_status
+        ):
+            all_transactions.extend(tx.to_model() for tx in batch)
+        return all_transactions
 
-            # Obtener transacciones normales
-            normal_txs = await self._get_moralis_transactions(params)
-            
-            # Obtener transferencias de tokens ERC20
-            erc20_txs = await self._get_moralis_token_transfers(params)
+    async def iter_wallet_transactions(
+        self,
+        address: str,
+        blockchain: str,
+        days: int = 30,
+        source_status: Optional[Dict[str, str]] = None,
+        max_age_seconds: Optional[float] = None
+    ) -> AsyncIterator[List[CompactTransaction]]:
+        """
+        Genera las transacciones de una wallet página a página, a medida que
+        llegan de Moralis, respetando MAX_TRANSACTIONS_PER_WALLET.
+        
+        Con el almacén local activo, solo se descargan las transacciones
+        posteriores a la última sincronización de la wallet; el resto se lee
+        de disco. Con más transacciones que el límite se entregan las más
+        recientes. Si una sincronización anterior quedó truncada por el
+        límite, el tramo que faltó se descarga después, y solo cuando hace
+        falta para completar el límite.
+        
+        Todas las fuentes de `transaction_sources` se consultan en paralelo con
+        un presupuesto de tiempo común (WALLET_FETCH_TIMEOUT_SECONDS). Si se
+        agota, se entregan los resultados parciales y el estado de cada fuente
+        queda registrado en `source_status`.
+        
+        Args:
+            address: Dirección de la wallet
+            blockchain: Nombre de la blockchain
+            days: Número de días hacia atrás para buscar
+            source_status: Dict opcional donde se registra el estado de cada
+                fuente ("ok", "error", "timeout" o "truncated")
+            max_age_seconds: Si el historial almacenado se sincronizó hace
+                menos de este tiempo, se entrega sin consultar Moralis
             
-            # Combinar y procesar transacciones
-            all_transactions = await self._process_transactions(
-                normal_txs + erc20_txs,
-                blockchain
+        Yields:
+            Lotes de transacciones procesadas, en su representación compacta
+        """
+        if source_status is None:
+            source_status = {}
+        
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        
+        if not self.transaction_store.enabled:
+            async for batch in self._iter_remote_transactions(
+                address, blockchain, since, settings.MAX_TRANSACTIONS_PER_WALLET, source_status
+            ):
+                yield batch
+            return
+        
+        cap = settings.MAX_TRANSACTIONS_PER_WALLET
+        store = self.transaction_store
+        sync_state = await store.get_sync_state(blockchain, address)
+        synced = sync_state is not None and sync_state[0] <= since
+        
+        # Historial de esta ventana sincronizado hace poco: se entrega desde
+        # el almacén local sin consultar Moralis
+        if synced and max_age_seconds is not None:
+            synced_at = await store.get_synced_at(blockchain, address)
+            if synced_at and (datetime.now(timezone.utc) - synced_at).total_seconds() <= max_age_seconds:
+                async for batch in store.iter_transactions(blockchain, address, since, limit=cap):
+                    yield batch
+                return
+        
+        # Siempre se pide a Moralis lo posterior a la marca (o toda la ventana
+        # si no está sincronizada). El límite se aplica después de combinar
+        # con lo almacenado, de modo que un almacén con MAX_TRANSACTIONS_PER_WALLET
+        # transacciones no impide recibir las nuevas
+        fetch_from = max(since, sync_state[1]) if synced else since
+        high_water_mark = int(fetch_from.timestamp())
+        # Tramo [since, gap_until] que una sincronización truncada dejó sin descargar
+        gap_until = sync_state[2] if synced and sync_state[2] and sync_state[2] > since else None
+        yielded_keys: Set[str] = set()
+        oldest_seen: Dict[str, int] = {}
+        async for batch in self._iter_remote_into_store(
+            address, blockchain, fetch_from, None, cap, source_status, oldest_seen, yielded_keys
+        ):
+            high_water_mark = max(high_water_mark, max(tx.timestamp for tx in batch))
+            yield batch
+        
+        # Descarga truncada: lo anterior a la transacción más antigua recibida
+        # (de las fuentes truncadas) queda como hueco; engloba al anterior
+        complete_from = self._complete_from(source_status, oldest_seen, datetime.now(timezone.utc))
+        if complete_from is not None:
+            gap_until = complete_from
+        
+        # Completar con lo almacenado, de más reciente a más antiguo, hasta el
+        # límite, sin bajar del hueco: ese tramo del almacén está incompleto
+        remaining = cap - len(yielded_keys)
+        if remaining > 0:
+            async for batch in store.iter_transactions(
+                blockchain, address, max(since, gap_until) if gap_until else since,
+                limit=remaining, exclude=yielded_keys
+            ):
+                yielded_keys.update(tx.key for tx in batch)
+                yield batch
+        
+        # Rellenar el hueco solo si aún faltan transacciones para el límite. El
+        # tramo incluye su extremo, que ya se entregó, así que se descarga
+        # hasta `cap` y se entregan solo las que faltan; todo lo descargado
+        # queda almacenado y cuenta para acotar el hueco
+        remaining = cap - len(yielded_keys)
+        if gap_until is not None and remaining > 0:
+            gap_status: Dict[str, str] = {}
+            gap_oldest: Dict[str, int] = {}
+            async for batch in self._iter_remote_into_store(
+                address, blockchain, since, gap_until, cap, gap_status, gap_oldest, yielded_keys,
+                yield_limit=remaining
+            ):
+                yield batch
+            gap_until = self._complete_from(gap_status, gap_oldest, gap_until)
+            for name, status in gap_status.items():
+                if status != "ok" or name not in source_status:
+                    source_status[name] = status
+        
+        # La marca avanza si todas las fuentes se obtuvieron, completas o
+        # truncadas por el límite; con errores o tiempo agotado se conserva la
+        # anterior y la próxima sincronización vuelve a pedir desde ella
+        if source_status and all(status in ("ok", "truncated") for status in source_status.values()):
+            synced_from = sync_state[0] if synced else since
+            await store.set_sync_state(
+                blockchain,
+                address,
+                synced_from,
+                datetime.fromtimestamp(high_water_mark, tz=timezone.utc),
+                gap_until
             )
+
+    async def _iter_remote_into_store(
+        self,
+        address: str,
+        blockchain: str,
+        from_date: datetime,
+        to_date: Optional[datetime],
+        limit: int,
+        source_status: Dict[str, str],
+        oldest_seen: Dict[str, int],
+        yielded_keys: Set[str],
+        yield_limit: Optional[int] = None
+    ) -> AsyncIterator[List[CompactTransaction]]:
+        """
+        Descarga de Moralis las transacciones de un tramo, las guarda en el
+        almacén y genera, hasta `yield_limit`, las que aún no se han entregado
+        (`yielded_keys`, que se actualiza)
+        """
+        async for batch in self._iter_remote_transactions(
+            address, blockchain, from_date, limit, source_status, to_date, oldest_seen
+        ):
+            await self.transaction_store.add_transactions(blockchain, address, batch)
+            batch = [tx for tx in batch if tx.key not in yielded_keys]
+            if yield_limit is not None:
+                batch = batch[:yield_limit]
+                yield_limit -= len(batch)
+            if batch:
+                yielded_keys.update(tx.key for tx in batch)
+                yield batch
+
+    @staticmethod
+    def _complete_from(
+        source_status: Dict[str, str],
+        oldest_seen: Dict[str, int],
+        to_date: datetime
+    ) -> Optional[datetime]:
+        """
+        Instante desde el que una descarga (hasta `to_date`) es completa, o None
+        si no se truncó ninguna fuente. Moralis entrega de más reciente a más
+        antigua, así que cada fuente truncada está completa desde la
+        transacción más antigua que llegó a entregar.
+        """
+        truncated = [name for name, status in source_status.items() if status == "truncated"]
+        if not truncated:
+            return None
+        limit = int(to_date.timestamp())
+        return datetime.fromtimestamp(
+            max(oldest_seen.get(name, limit) for name in truncated),
+            tz=timezone.utc
+        )
+
+    async def _iter_remote_transactions(
+        self,
+        address: str,
+        blockchain: str,
+        from_date: datetime,
+        limit: int,
+        source_status: Dict[str, str],
+        to_date: Optional[datetime] = None,
+        oldest_seen: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[List[CompactTransaction]]:
+        """
+        Descarga de Moralis, en paralelo, las transacciones de una wallet desde
+        una fecha (y hasta `to_date`, si se indica). En `oldest_seen` se anota
+        el timestamp de la transacción más antigua entregada por cada fuente.
+        """
+        if limit <= 0:
+            return
+        
+        # Configurar parámetros para Moralis
+        params = {
+            "address": address,
+            "chain": self._moralis_chain(blockchain),
+            "from_date": from_date.isoformat(),
+            "limit": settings.MORALIS_PAGE_SIZE
+        }
+        if to_date is not None:
+            params["to_date"] = to_date.isoformat()
+        remaining = limit
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.WALLET_FETCH_TIMEOUT_SECONDS
+        # Cola acotada: las fuentes se frenan si el consumidor va más lento
+        queue = asyncio.Queue(maxsize=2 * len(self.transaction_sources))
+        
+        async def pump(name: str, source: Callable):
+            try:
+                async for page in source(dict(params)):
+                    await queue.put((name, page))
+                source_status[name] = "ok"
+            except Exception as e:
+                logger.error(f"Error obteniendo {name} de {address}: {str(e)}")
+                source_status[name] = "error"
+            # Marca de fin de la fuente
+            await queue.put((name, None))
+        
+        tasks = {
+            name: asyncio.create_task(pump(name, source))
+            for name, source in self.transaction_sources.items()
+        }
+        finished = set()
+        
+        try:
+            while len(finished) < len(tasks):
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    raise asyncio.TimeoutError()
+                name, page = await asyncio.wait_for(queue.get(), timeout)
+                
+                if page is None:
+                    finished.add(name)
+                    continue
+                
+                if len(page) >= remaining:
+                    page = page[:remaining]
+                    source_status[name] = "truncated"
+                remaining -= len(page)
+                
+                batch = await self._process_transactions(page, blockchain, source_status)
+                if oldest_seen is not None and batch:
+                    oldest = min(tx.timestamp for tx in batch)
+                    oldest_seen[name] = min(oldest_seen.get(name, oldest), oldest)
+                yield batch
+                
+                if remaining <= 0:
+                    logger.warning(
+                        f"Wallet {address} alcanzó el límite de "
+                        f"{settings.MAX_TRANSACTIONS_PER_WALLET} transacciones"
+                    )
+                    # Las fuentes cuya marca de fin ya está en la cola están
+                    # completas; las que siguen descargando o tienen páginas
+                    # sin consumir quedan truncadas
+                    unconsumed = set()
+                    while not queue.empty():
+                        other, pending_page = queue.get_nowait()
+                        if pending_page is None:
+                            finished.add(other)
+                        else:
+                            unconsumed.add(other)
+                    for other in tasks:
+                        if other not in finished or other in unconsumed:
+                            source_status[other] = "truncated"
+                    return
+                    
+        except asyncio.TimeoutError:
+            logger.warning(f"Tiempo agotado obteniendo el historial de {address}")
+            for name, task in tasks.items():
+                if not task.done():
+                    source_status[name] = "timeout"
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+    async def _iter_moralis_pages(
+        self,
+        path: str,
+        params: Dict
+    ) -> AsyncIterator[List[Dict]]:
+        """Recorre todas las páginas de un endpoint de Moralis siguiendo el cursor"""
+        cursor = None
+        while True:
+            page_params = dict(params, cursor=cursor) if cursor else params
+            result = await self._moralis_request("GET", path, params=page_params)
+            page = result.get("result", [])
+            if page:
+                yield page
             
-            return all_transactions
-            
-        except Exception as e:
-            logger.error(f"Error obteniendo transacciones: {str(e)}")
-            return []
+            cursor = result.get("cursor")
+            if not cursor or not page:
+                break
 
-    async def _get_moralis_transactions(self, params: Dict) -> List[Dict]:
+    async def _iter_moralis_transactions(self, params: Dict) -> AsyncIterator[List[Dict]]:
         """Obtiene transacciones normales usando Moralis API"""
-        try:
-            result = await evm_api.transaction.get_wallet_transactions(
-                api_key=self.moralis_api_key,
-                params=params
-            )
-            return result.get("result", [])
-        except Exception as e:
-            logger.error(f"Error en Moralis API (transactions): {str(e)}")
-            return []
+        address = params.pop("address")
+        async for page in self._iter_moralis_pages(f"/{address}", params):
+            yield page
 
-    async def _get_moralis_token_transfers(self, params: Dict) -> List[Dict]:
+    async def _iter_moralis_token_transfers(self, params: Dict) -> AsyncIterator[List[Dict]]:
         """Obtiene transferencias de tokens usando Moralis API"""
-        try:
-            result = await evm_api.token.get_wallet_token_transfers(
-                api_key=self.moralis_api_key,
-                params=params
-            )
-            return result.get("result", [])
-        except Exception as e:
-            logger.error(f"Error en Moralis API (token transfers): {str(e)}")
-            return []
+        address = params.pop("address")
+        async for page in self._iter_moralis_pages(f"/{address}/erc20/transfers", params):
+            for tx in page:
+                # Las transferencias ERC20 usan nombres de campo distintos
+                tx.setdefault('hash', tx.get('transaction_hash'))
+                tx.setdefault('token_address', tx.get('address'))
+            yield page
 
     async def _process_transactions(
         self,
         transactions: List[Dict],
-        blockchain: str
-    ) -> List[Transaction]:
-        """Procesa y normaliza las transacciones"""
-        processed_txs = []
+        blockchain: str,
+        source_status: Optional[Dict[str, str]] = None
+    ) -> List[CompactTransaction]:
+        """
+        Procesa y normaliza las transacciones en dos fases: primero resuelve en
+        lote los precios de las claves (token, bucket) distintas y después
+        construye las transacciones compactas sin más llamadas a la API.
         
+        Si algún precio no se pudo obtener, sus transacciones quedan con
+        valor 0 en USD y `source_status["prices"]` pasa a "error".
+        """
+        # Fase 1: recolectar claves de precio distintas
+        price_keys = set()
         for tx in transactions:
             try:
-                # Obtener precio histórico para el token
-                token_price = await self._get_historical_token_price(
-                    tx.get('token_address'),
+                price_keys.add(self.price_cache.make_key(
                     blockchain,
-                    tx.get('block_timestamp')
-                )
-                
-                # Crear objeto Transaction
-                processed_tx = Transaction(
-                    hash=tx['hash'],
-                    from_address=tx['from_address'],
-                    to_address=tx['to_address'],
-                    value=float(tx['value']),
-                    timestamp=datetime.fromisoformat(tx['block_timestamp']),
-                    token_address=tx.get('token_address'),
-                    token_symbol=tx.get('token_symbol'),
-                    token_decimals=int(tx.get('token_decimals', 18)),
-                    usd_value=self._calculate_usd_value(
-                        float(tx['value']),
-                        token_price,
-                        int(tx.get('token_decimals', 18))
-                    )
-                )
-                
-                processed_txs.append(processed_tx)
-                
+                    tx.get('token_address'),
+                    parse_block_timestamp(tx['block_timestamp'])
+                ))
+            except Exception as e:
+                logger.error(f"Error procesando transacción {tx.get('hash')}: {str(e)}")
+        
+        prices = await self._resolve_token_prices(price_keys, blockchain)
+        if source_status is not None:
+            if len(prices) < len(price_keys):
+                logger.warning(f"{len(price_keys) - len(prices)} precios sin resolver en {blockchain}")
+                source_status["prices"] = "error"
+            else:
+                source_status.setdefault("prices", "ok")
+        # Precios como enteros escalados, una vez por clave y no por transacción
+        scaled_prices = {key: scale_price(price) for key, price in prices.items()}
+        
+        # Fase 2: normalizar los campos de cada transacción
+        rows = []
+        amounts = []
+        row_prices = []
+        row_decimals = []
+        for tx in transactions:
+            try:
+                timestamp = parse_block_timestamp(tx['block_timestamp'])
+                amount = parse_base_units(tx['value'])
+                decimals = int(tx.get('token_decimals') or 18)
+                if not 0 <= decimals < len(POW10):
+                    raise ValueError(f"decimales fuera de rango: {decimals}")
+                price_key = self.price_cache.make_key(blockchain, tx.get('token_address'), timestamp)
+                rows.append((tx['hash'], tx['from_address'], tx['to_address'], int(timestamp.timestamp()), tx))
             except Exception as e:
                 logger.error(f"Error procesando transacción {tx.get('hash')}: {str(e)}")
                 continue
+            amounts.append(amount)
+            row_prices.append(scaled_prices.get(price_key, 0))
+            row_decimals.append(decimals)
+        
+        # Fase 3: valores en USD de toda la página en una sola operación
+        # vectorizada y construcción de las transacciones compactas
+        usd_micros = calculate_usd_micros_array(amounts, row_prices, row_decimals)
+        return [
+            CompactTransaction(
+                hash=tx_hash,
+                from_address=from_address,
+                to_address=to_address,
+                value=amount,
+                timestamp=timestamp,
+                token_address=tx.get('token_address'),
+                token_symbol=tx.get('token_symbol'),
+                token_decimals=decimals,
+                usd_micros=int(micros)
+            )
+            for (tx_hash, from_address, to_address, timestamp, tx), amount, decimals, micros
+            in zip(rows, amounts, row_decimals, usd_micros)
+        ]
+
+    async def _resolve_token_prices(
+        self,
+        price_keys: Iterable[PriceKey],
+        blockchain: str
+    ) -> Dict[PriceKey, float]:
+        """
+        Resuelve los precios de un conjunto de claves (token, bucket).
+        
+        Las claves en caché no generan llamadas; las que ya está resolviendo otra
+        wallet se esperan en lugar de repetirse; el resto se consulta en lotes
+        concurrentes contra el endpoint de precios múltiples de Moralis.
+        
+        Cada precio se consulta en el bloque de inicio de su bucket, igual que
+        en `_get_historical_token_price`, para que el valor cacheado no
+        dependa de qué transacción del bucket llegó primero.
+        
+        Args:
+            price_keys: Claves de precio
+            blockchain: Nombre de la blockchain
+            
+        Returns:
+            Dict con el precio en USD de cada clave resuelta
+        """
+        price_keys = list(price_keys)
+        # Una sola lectura de la caché (memoria y, si hace falta, disco)
+        prices = await self.price_cache.get_many(price_keys)
+        pending = {}
+        owned = []
+        
+        for key in price_keys:
+            if key in prices:
+                continue
+            elif key in self._pending_prices:
+                pending[key] = self._pending_prices[key]
+            else:
+                future = asyncio.get_running_loop().create_future()
+                self._pending_prices[key] = future
+                pending[key] = future
+                owned.append(key)
+        
+        if owned:
+            resolved = {}
+            try:
+                semaphore = asyncio.Semaphore(settings.PRICE_RESOLUTION_CONCURRENCY)
+                
+                # Un bloque por bucket distinto, compartido por todos sus tokens
+                async def resolve_block(bucket):
+                    async with semaphore:
+                        return bucket, await self._get_block_for_date(
+                            blockchain,
+                            datetime.fromtimestamp(bucket, tz=timezone.utc)
+                        )
+                
+                blocks = {}
+                for result in await asyncio.gather(
+                    *[resolve_block(bucket) for bucket in {key[2] for key in owned}],
+                    return_exceptions=True
+                ):
+                    if isinstance(result, Exception):
+                        logger.error(f"Error obteniendo el bloque de un bucket de precios: {str(result)}")
+                        continue
+                    bucket, block = result
+                    blocks[bucket] = block
+                
+                batchable = [key for key in owned if key[2] in blocks]
+                chunks = [
+                    batchable[i:i + settings.PRICE_BATCH_SIZE]
+                    for i in range(0, len(batchable), settings.PRICE_BATCH_SIZE)
+                ]
+                
+                async def resolve_chunk(chunk):
+                    async with semaphore:
+                        return await self._fetch_token_prices_batch(
+                            [(key, blocks[key[2]]) for key in chunk],
+                            blockchain
+                        )
+                
+                results = await asyncio.gather(
+                    *[resolve_chunk(chunk) for chunk in chunks],
+                    return_exceptions=True
+                )
                 
-        return processed_txs
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.error(f"Error obteniendo precios históricos: {str(result)}")
+                        continue
+                    resolved.update(result)
+            finally:
+                for key in owned:
+                    future = self._pending_prices.pop(key)
+                    if not future.done():
+                        future.set_result(resolved.get(key))
+            
+            # Los precios pasan a memoria sin esperas tras liberar a quienes
+            # los esperaban; en disco se escriben en una sola transacción
+            await self.price_cache.set_many(resolved)
+        
+        for key, future in pending.items():
+            price = await future
+            if price is not None:
+                prices[key] = price
+        
+        return prices
+
+    async def _fetch_token_prices_batch(
+        self,
+        entries: List[Tuple[PriceKey, int]],
+        blockchain: str
+    ) -> Dict[PriceKey, float]:
+        """Consulta en una sola llamada los precios de varios tokens en bloques concretos"""
+        wrapped_native = settings.SUPPORTED_CHAINS[blockchain]["wrapped_native_token"]
+        tokens = [
+            {
+                # La moneda nativa se valora a través de su token envuelto (WETH, WBNB, ...)
+                "token_address": wrapped_native if key[1] == NATIVE_TOKEN_KEY else key[1],
+                "to_block": block_number
+            }
+            for key, block_number in entries
+        ]
+        
+        result = await self._moralis_request(
+            "POST",
+            "/erc20/prices",
+            params={"chain": self._moralis_chain(blockchain)},
+            body={"tokens": tokens}
+        )
+        
+        # Moralis devuelve los precios en el mismo orden de la petición. Un
+        # token sin precio conocido vale 0; no es un fallo de la consulta
+        return {
+            key: float((price or {}).get("usdPrice") or 0)
+            for (key, _), price in zip(entries, result)
+        }
 
     async def _get_historical_token_price(
         self,
@@ -141,48 +680,64 @@ class BlockchainService:
         blockchain: str,
         timestamp: str
     ) -> float:
-        """Obtiene el precio histórico de un token"""
-        try:
-            if not token_address:
-                # Para transacciones de moneda nativa (ETH, BNB, etc.)
-                params = {
-                    "chain": blockchain,
-                    "timestamp": timestamp
-                }
-                result = await evm_api.token.get_native_price(
-                    api_key=self.moralis_api_key,
-                    params=params
-                )
-                return float(result.get("usdPrice", 0))
-            else:
-                # Para tokens ERC20
-                params = {
-                    "chain": blockchain,
-                    "address": token_address,
-                    "timestamp": timestamp
-                }
-                result = await evm_api.token.get_token_price(
-                    api_key=self.moralis_api_key,
-                    params=params
-                )
-                return float(result.get("usdPrice", 0))
-                
-        except Exception as e:
-            logger.error(f"Error obteniendo precio histórico: {str(e)}")
-            return 0
+        """
+        Obtiene el precio histórico de un token, usando la caché de precios.
+        
+        Raises:
+            El error de la consulta si falla tras los reintentos; un precio
+            desconocido no se confunde con un precio 0
+        """
+        cache_key = self.price_cache.make_key(
+            blockchain,
+            token_address,
+            parse_block_timestamp(timestamp)
+        )
+        cached_price = await self.price_cache.get(cache_key)
+        if cached_price is not None:
+            return cached_price
+        
+        # Se consulta el precio al inicio del bucket para que el valor
+        # cacheado no dependa de qué transacción lo pidió primero
+        price = await self._fetch_historical_token_price(
+            token_address,
+            blockchain,
+            self.price_cache.bucket_start(cache_key).isoformat()
+        )
+        await self.price_cache.set(cache_key, price)
+        return price
 
-    def _calculate_usd_value(
+    async def _fetch_historical_token_price(
         self,
-        amount: float,
-        price: float,
-        decimals: int
+        token_address: Optional[str],
+        blockchain: str,
+        timestamp: str
     ) -> float:
-        """Calcula el valor en USD de una cantidad de tokens"""
-        try:
-            return (amount / (10 ** decimals)) * price
-        except Exception as e:
-            logger.error(f"Error calculando valor USD: {str(e)}")
-            return 0
+        """Consulta el precio histórico de un token en Moralis"""
+        # El endpoint de precios trabaja por bloque: se busca el bloque de la fecha
+        block = await self._get_block_for_date(blockchain, parse_block_timestamp(timestamp))
+        
+        # La moneda nativa (ETH, BNB, etc.) se valora a través de su token envuelto
+        if not token_address:
+            token_address = settings.SUPPORTED_CHAINS[blockchain]["wrapped_native_token"]
+        
+        result = await self._moralis_request(
+            "GET",
+            f"/erc20/{token_address}/price",
+            params={"chain": self._moralis_chain(blockchain), "to_block": block}
+        )
+        return float(result.get("usdPrice") or 0)
+
+    async def _get_block_for_date(self, blockchain: str, date: datetime) -> int:
+        """Número del bloque vigente en una fecha, cacheado por fecha exacta"""
+        key = (blockchain, int(date.timestamp()))
+        if key not in self.bucket_blocks:
+            result = await self._moralis_request(
+                "GET",
+                "/dateToBlock",
+                params={"chain": self._moralis_chain(blockchain), "date": date.isoformat()}
+            )
+            self.bucket_blocks[key] = int(result["block"])
+        return self.bucket_blocks[key]
 
     async def get_token_info(
         self,
@@ -190,38 +745,120 @@ class BlockchainService:
         blockchain: str
     ) -> Optional[TokenInfo]:
         """Obtiene información detallada de un token"""
-        try:
-            params = {
-                "chain": blockchain,
-                "address": token_address
-            }
-            
-            result = await evm_api.token.get_token_metadata(
-                api_key=self.moralis_api_key,
-                params=params
-            )
+        tokens_info = await self.get_tokens_info([token_address], blockchain)
+        return tokens_info.get(token_address.lower())
+
+    async def get_tokens_info(
+        self,
+        token_addresses: Iterable[str],
+        blockchain: str
+    ) -> Dict[str, TokenInfo]:
+        """
+        Obtiene la información de varios tokens usando la caché de metadatos.
+        
+        Los metadatos de un token no cambian, así que se guardan para todo el
+        proceso: cada token se consulta como mucho una vez, aunque lo pidan
+        varias wallets a la vez. Los que faltan se piden en lotes concurrentes
+        al endpoint de metadatos múltiples de Moralis.
+        
+        Args:
+            token_addresses: Direcciones de los tokens
+            blockchain: Nombre de la blockchain
             
-            if result:
-                return TokenInfo(
-                    address=token_address,
-                    symbol=result['symbol'],
-                    name=result['name'],
-                    decimals=int(result['decimals']),
-                    total_value_usd=0,  # Se actualiza después
-                    transaction_count=0  # Se actualiza después
+        Returns:
+            Dict con dirección del token (en minúsculas) -> TokenInfo
+        """
+        metadata = {}
+        pending = {}
+        owned = []
+        
+        for token_address in {addr.lower() for addr in token_addresses}:
+            key = (blockchain, token_address)
+            if key in self.token_metadata:
+                metadata[token_address] = self.token_metadata[key]
+            elif key in self._pending_metadata:
+                pending[token_address] = self._pending_metadata[key]
+            else:
+                future = asyncio.get_running_loop().create_future()
+                self._pending_metadata[key] = future
+                pending[token_address] = future
+                owned.append(token_address)
+        
+        if owned:
+            resolved = {}
+            try:
+                chunks = [
+                    owned[i:i + settings.TOKEN_METADATA_BATCH_SIZE]
+                    for i in range(0, len(owned), settings.TOKEN_METADATA_BATCH_SIZE)
+                ]
+                semaphore = asyncio.Semaphore(settings.TOKEN_METADATA_CONCURRENCY)
+                
+                async def resolve_chunk(chunk):
+                    async with semaphore:
+                        result = await self._fetch_tokens_metadata(chunk, blockchain)
+                        # Los tokens desconocidos también se cachean para no repetir la consulta
+                        return {addr: result.get(addr) for addr in chunk}
+                
+                results = await asyncio.gather(
+                    *[resolve_chunk(chunk) for chunk in chunks],
+                    return_exceptions=True
                 )
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error obteniendo info del token: {str(e)}")
-            return None
+                
+                for result in results:
+                    if isinstance(result, Exception):
+                        logger.error(f"Error obteniendo info del token: {str(result)}")
+                        continue
+                    resolved.update(result)
+                
+                for token_address, token_metadata in resolved.items():
+                    self.token_metadata[(blockchain, token_address)] = token_metadata
+            finally:
+                for token_address in owned:
+                    future = self._pending_metadata.pop((blockchain, token_address))
+                    if not future.done():
+                        future.set_result(resolved.get(token_address))
+        
+        for token_address, future in pending.items():
+            metadata[token_address] = await future
+        
+        return {
+            token_address: TokenInfo(
+                address=token_address,
+                symbol=token_metadata['symbol'],
+                name=token_metadata['name'],
+                decimals=int(token_metadata['decimals']),
+                total_value_usd=0,  # Se actualiza después
+                transaction_count=0  # Se actualiza después
+            )
+            for token_address, token_metadata in metadata.items()
+            if token_metadata
+        }
+
+    async def _fetch_tokens_metadata(
+        self,
+        token_addresses: List[str],
+        blockchain: str
+    ) -> Dict[str, Dict]:
+        """Consulta en una sola llamada los metadatos de varios tokens"""
+        params = [("chain", self._moralis_chain(blockchain))] + [
+            (f"addresses[{i}]", token_address)
+            for i, token_address in enumerate(token_addresses)
+        ]
+        
+        result = await self._moralis_request("GET", "/erc20/metadata", params=params)
+        
+        return {
+            token['address'].lower(): token
+            for token in result or []
+            if token and token.get('address')
+        }
 
     async def analyze_wallet_interactions(
         self,
         address: str,
         blockchain: str,
-        days: int = 30
+        days: int = 30,
+        transaction_set: Optional[TransactionSet] = None
     ) -> Dict:
         """
         Analiza las interacciones de una wallet para detectar patrones.
@@ -230,59 +867,39 @@ class BlockchainService:
             address: Dirección de la wallet
             blockchain: Nombre de la blockchain
             days: Número de días hacia atrás para analizar
+            transaction_set: Conjunto opcional, compartido por todo el
+                análisis, donde se conservan las transacciones obtenidas
             
         Returns:
             Dict con estadísticas y patrones de interacción
+            
+        Raises:
+            El error que impidió analizar la wallet; los fallos parciales de
+            una fuente quedan en `source_status`
         """
         try:
-            # Obtener transacciones
-            transactions = await self.get_wallet_transactions(address, blockchain, days)
+            # Acumular el historial en formato columnar a medida que llega
+            source_status = {}
+            frames = []
+            async for transactions in self.iter_wallet_transactions(
+                address, blockchain, days, source_status
+            ):
+                frames.append(transactions_to_frame(transactions, address))
+                if transaction_set is not None:
+                    transaction_set.add(blockchain, transactions)
             
-            # Inicializar estadísticas
-            stats = {
-                "total_sent_usd": 0,
-                "total_received_usd": 0,
-                "transaction_count": len(transactions),
-                "unique_tokens": set(),
-                "contract_interactions": {},
-                "hourly_activity": {i: 0 for i in range(24)},
-                "first_tx_date": None,
-                "last_tx_date": None
-            }
-            
-            # Analizar transacciones
-            for tx in transactions:
-                # Actualizar montos
-                if tx.from_address.lower() == address.lower():
-                    stats["total_sent_usd"] += tx.usd_value
-                else:
-                    stats["total_received_usd"] += tx.usd_value
-                
-                # Registrar tokens únicos
-                if tx.token_address:
-                    stats["unique_tokens"].add(tx.token_address)
-                
-                # Registrar interacciones con contratos
-                if tx.to_address:
-                    stats["contract_interactions"][tx.to_address] = \
-                        stats["contract_interactions"].get(tx.to_address, 0) + 1
-                
-                # Actualizar actividad por hora
-                hour = tx.timestamp.hour
-                stats["hourly_activity"][hour] += 1
-                
-                # Actualizar fechas
-                if not stats["first_tx_date"] or tx.timestamp < stats["first_tx_date"]:
-                    stats["first_tx_date"] = tx.timestamp
-                if not stats["last_tx_date"] or tx.timestamp > stats["last_tx_date"]:
-                    stats["last_tx_date"] = tx.timestamp
+            # Estadísticas calculadas de forma vectorizada sobre todo el historial
+            frame = pd.concat(frames, ignore_index=True) if frames else empty_transactions_frame()
+            stats = compute_wallet_stats(frame).get(address.lower()) or empty_wallet_stats()
             
-            # Procesar tokens únicos
-            unique_tokens_info = []
-            for token_addr in stats["unique_tokens"]:
-                token_info = await self.get_token_info(token_addr, blockchain)
-                if token_info:
-                    unique_tokens_info.append(token_info)
+            # Completar los tokens con sus metadatos y el volumen de la wallet
+            token_totals = stats["token_totals"]
+            tokens_info = await self.get_tokens_info(token_totals.keys(), blockchain)
+            unique_tokens_info = [
+                token_info.copy(update=token_totals[token_address])
+                for token_address, token_info in tokens_info.items()
+                if token_address in token_totals
+            ]
             
             # Preparar resultado final
             return {
@@ -292,16 +909,13 @@ class BlockchainService:
                 "total_received_usd": stats["total_received_usd"],
                 "transaction_count": stats["transaction_count"],
                 "unique_tokens": unique_tokens_info,
-                "most_frequent_contracts": sorted(
-                    stats["contract_interactions"].items(),
-                    key=lambda x: x[1],
-                    reverse=True
-                )[:10],
-                "hourly_activity": stats["hourly_activity"],
-                "first_transaction_date": stats["first_tx_date"],
-                "last_transaction_date": stats["last_tx_date"]
+                "most_frequent_contracts": stats["most_frequent_contracts"],
+                "interaction_hours": stats["interaction_hours"],
+                "first_transaction_date": stats["first_transaction_date"],
+                "last_transaction_date": stats["last_transaction_date"],
+                "source_status": source_status
             }
             
         except Exception as e:
             logger.error(f"Error analizando interacciones: {str(e)}")
-            return {}
\ No newline at end of file
+            raise
\ No newline at end of file
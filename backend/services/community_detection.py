@@ -0,0 +1,90 @@
+from typing import List, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import logging
+import networkx as nx
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Componente conexa lista para enviar a otro proceso: direcciones ordenadas
+# y aristas no dirigidas como pares de índices en esa lista
+Component = Tuple[List[str], List[Tuple[int, int]]]
+
+# Nodos por tarea enviada al pool; las componentes pequeñas se agrupan para
+# no pagar el coste de un envío entre procesos por cada una
+BATCH_NODES = 5000
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+def get_executor() -> ProcessPoolExecutor:
+    """Pool de procesos compartido para la detección de comunidades"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.CLUSTER_WORKERS)
+    return _executor
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+def louvain_components(components: Sequence[Component], seed: int) -> List[List[List[str]]]:
+    """
+    Ejecuta Louvain sobre cada componente. Se ejecuta en los procesos del
+    pool, así que solo recibe y devuelve datos serializables.
+
+    Returns:
+        Por cada componente, sus comunidades como listas ordenadas de direcciones
+    """
+    results = []
+    for nodes, edges in components:
+        graph = nx.Graph()
+        # Mismo orden de inserción en cada ejecución: con la semilla fija, el
+        # resultado de Louvain es reproducible
+        graph.add_nodes_from(range(len(nodes)))
+        graph.add_edges_from(edges)
+        communities = nx.community.louvain_communities(graph, seed=seed)
+        results.append(sorted(
+            sorted(nodes[i] for i in community) for community in communities
+        ))
+    return results
+
+def _batches(components: List[Component]) -> List[List[Component]]:
+    batches: List[List[Component]] = []
+    current: List[Component] = []
+    size = 0
+    for component in components:
+        current.append(component)
+        size += len(component[0])
+        if size >= BATCH_NODES:
+            batches.append(current)
+            current, size = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+async def detect_communities(components: List[Component], seed: int) -> List[List[str]]:
+    """
+    Detecta las comunidades de varias componentes conexas en paralelo en el
+    pool de procesos, sin bloquear el event loop.
+
+    Returns:
+        Comunidades de todas las componentes, en el orden de las componentes
+    """
+    if not components:
+        return []
+
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(executor, louvain_components, batch, seed)
+        for batch in _batches(components)
+    ))
+    return [
+        community
+        for batch in results
+        for communities in batch
+        for community in communities
+    ]
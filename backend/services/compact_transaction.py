@@ -0,0 +1,139 @@
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from datetime import datetime, timezone
+import sys
+from ..models import Transaction
+from ..utils import USD_MICROS
+
+class CompactTransaction:
+    """
+    Representación interna y compacta de una transferencia.
+
+    Se usa entre BlockchainService, el almacén de transacciones y
+    GraphService en lugar del modelo Pydantic `Transaction`, que valida
+    cada campo al construirse y guarda un `datetime` por fila. Aquí el
+    timestamp es un entero (segundos epoch UTC), `value` es el monto exacto
+    en unidades base del token, el valor en USD se guarda como entero de
+    micro-dólares y las direcciones se
+    normalizan a minúsculas y se internan, de modo que las que se repiten
+    en miles de transferencias comparten el mismo objeto str. La conversión
+    al modelo Pydantic se hace solo al exponer datos en la API (`to_model`).
+    """
+    __slots__ = (
+        "hash",
+        "from_address",
+        "to_address",
+        "value",
+        "timestamp",
+        "token_address",
+        "token_symbol",
+        "token_decimals",
+        "usd_micros"
+    )
+
+    def __init__(
+        self,
+        hash: str,
+        from_address: str,
+        to_address: str,
+        value: int,
+        timestamp: int,
+        token_address: Optional[str] = None,
+        token_symbol: Optional[str] = None,
+        token_decimals: Optional[int] = None,
+        usd_micros: int = 0
+    ):
+        self.hash = hash
+        self.from_address = intern_address(from_address)
+        self.to_address = intern_address(to_address)
+        self.value = value
+        self.timestamp = timestamp
+        self.token_address = intern_address(token_address) if token_address else None
+        self.token_symbol = sys.intern(token_symbol) if token_symbol else token_symbol
+        self.token_decimals = token_decimals
+        self.usd_micros = usd_micros
+
+    @property
+    def key(self) -> str:
+        """Identifica una transferencia; un mismo hash puede contener varias"""
+        return f"{self.hash}:{self.token_address or ''}:{self.from_address}:{self.to_address}:{self.value}"
+
+    @property
+    def usd_value(self) -> float:
+        return self.usd_micros / USD_MICROS
+
+    @property
+    def block_datetime(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp, tz=timezone.utc)
+
+    def to_model(self) -> Transaction:
+        """Convierte a modelo Pydantic para las respuestas de la API"""
+        return Transaction(
+            hash=self.hash,
+            from_address=self.from_address,
+            to_address=self.to_address,
+            value=float(self.value),
+            timestamp=self.block_datetime,
+            token_address=self.token_address,
+            token_symbol=self.token_symbol,
+            token_decimals=self.token_decimals,
+            usd_value=self.usd_value
+        )
+
+    @classmethod
+    def from_model(cls, tx: Transaction) -> "CompactTransaction":
+        return cls(
+            hash=tx.hash,
+            from_address=tx.from_address,
+            to_address=tx.to_address,
+            value=int(tx.value),
+            timestamp=int(tx.timestamp.timestamp()),
+            token_address=tx.token_address,
+            token_symbol=tx.token_symbol,
+            token_decimals=tx.token_decimals,
+            usd_micros=round((tx.usd_value or 0) * USD_MICROS)
+        )
+
+    def __repr__(self) -> str:
+        return f"CompactTransaction(hash={self.hash!r}, from={self.from_address!r}, to={self.to_address!r})"
+
+class TransactionSet:
+    """
+    Transacciones de todas las wallets de un análisis, sin duplicados.
+
+    Cuando dos wallets analizadas comparten transferencias (una envía a la
+    otra), ambas historias las incluyen; aquí se guarda una sola instancia
+    por transferencia, que es la que recibe la etapa del grafo sin volver a
+    consultar la API.
+    """
+    def __init__(self):
+        self._transactions: Dict[Tuple[str, str], CompactTransaction] = {}
+
+    def add(self, blockchain: str, transactions: Iterable[CompactTransaction]) -> int:
+        """
+        Añade un lote de transacciones de una blockchain.
+
+        Returns:
+            Número de transacciones que no estaban ya en el conjunto
+        """
+        added = 0
+        for tx in transactions:
+            key = (blockchain, tx.key)
+            if key not in self._transactions:
+                self._transactions[key] = tx
+                added += 1
+        return added
+
+    def items(self) -> Iterator[Tuple[str, CompactTransaction]]:
+        """Pares (blockchain, transacción)"""
+        for (blockchain, _), tx in self._transactions.items():
+            yield blockchain, tx
+
+    def __len__(self) -> int:
+        return len(self._transactions)
+
+    def __iter__(self) -> Iterator[CompactTransaction]:
+        return iter(self._transactions.values())
+
+def intern_address(address: Optional[str]) -> str:
+    """Normaliza una dirección a minúsculas y la interna"""
+    return sys.intern(address.lower()) if address else ""
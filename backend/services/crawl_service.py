@@ -0,0 +1,172 @@
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+from ..config import settings
+from .blockchain_service import BlockchainService, api_call_counter
+from .compact_transaction import CompactTransaction, TransactionSet
+
+logger = logging.getLogger(__name__)
+
+# (blockchain, dirección)
+WalletKey = Tuple[str, str]
+
+# Direcciones que no se expanden: acuñaciones/quemas y transacciones sin destino
+IGNORED_ADDRESSES = {"", "0x0000000000000000000000000000000000000000"}
+
+class CrawlService:
+    """
+    Expansión del grafo a N saltos: contrapartes de las contrapartes de las
+    wallets subidas.
+
+    La frontera es un heap ordenado por el volumen (micro-dólares y número de
+    transacciones) que cada candidata intercambia con las wallets ya
+    visitadas, así que con el presupuesto agotado se han recorrido las
+    relaciones de mayor peso. Cada wallet se visita una sola vez y varias se
+    descargan en paralelo. Los historiales salen del almacén local de
+    BlockchainService; los sincronizados hace menos de
+    CRAWL_CACHE_MAX_AGE_SECONDS no consultan Moralis, de modo que volver a
+    expandir una zona ya rastreada apenas consume llamadas.
+    """
+    def __init__(
+        self,
+        blockchain_service: BlockchainService,
+        max_nodes: Optional[int] = None,
+        max_api_calls: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ):
+        self.blockchain_service = blockchain_service
+        self.max_nodes = settings.CRAWL_MAX_NODES if max_nodes is None else max_nodes
+        self.max_api_calls = settings.CRAWL_MAX_API_CALLS if max_api_calls is None else max_api_calls
+        self.concurrency = concurrency or settings.CRAWL_CONCURRENCY
+
+    async def expand(
+        self,
+        grouped_addresses: Dict[str, List[str]],
+        hops: int,
+        transaction_set: TransactionSet,
+        days: int = 30,
+        check_cancelled: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> Dict:
+        """
+        Rastrea hasta `hops` saltos desde las wallets subidas y añade las
+        transacciones obtenidas a `transaction_set`.
+
+        Los límites de nodos y de llamadas se comprueban antes de lanzar cada
+        wallet; las descargas en curso terminan aunque los superen.
+
+        Args:
+            grouped_addresses: Wallets de partida agrupadas por blockchain
+            hops: Número de saltos (1 = contrapartes directas)
+            transaction_set: Transacciones del análisis; debe contener ya las
+                de las wallets de partida
+            days: Número de días hacia atrás para buscar
+            check_cancelled: Corrutina opcional que interrumpe el rastreo
+                lanzando una excepción
+
+        Returns:
+            Dict con el resultado del rastreo (wallets expandidas, llamadas a
+            la API, transacciones añadidas y si se agotó el presupuesto)
+        """
+        visited: Set[WalletKey] = {
+            (blockchain, address.lower())
+            for blockchain, addresses in grouped_addresses.items()
+            for address in addresses
+        }
+        # Volumen acumulado con las wallets visitadas: [micro-dólares, transacciones]
+        scores: Dict[WalletKey, List[int]] = {}
+        # Menor número de saltos con el que se ha alcanzado cada candidata
+        depths: Dict[WalletKey, int] = {}
+        frontier: List[Tuple[int, int, int, WalletKey, int]] = []
+        sequence = itertools.count()
+
+        def score(blockchain: str, tx: CompactTransaction, hop: int):
+            # Contraparte no visitada de una transacción de una wallet visitada
+            for own, other in ((tx.from_address, tx.to_address), (tx.to_address, tx.from_address)):
+                key = (blockchain, other)
+                if (blockchain, own) not in visited or key in visited or other in IGNORED_ADDRESSES:
+                    continue
+                current = scores.setdefault(key, [0, 0])
+                current[0] += tx.usd_micros
+                current[1] += 1
+                depths[key] = min(depths.get(key, hop), hop)
+                # Las entradas con prioridad antigua quedan en el heap y se
+                # descartan al salir, porque la wallet ya estará visitada
+                heapq.heappush(frontier, (-current[0], -current[1], next(sequence), key, depths[key]))
+
+        for blockchain, tx in transaction_set.items():
+            score(blockchain, tx, 1)
+
+        calls = [0]
+        token = api_call_counter.set(calls)
+        expanded = 0
+        transactions_added = 0
+        pending: Dict[asyncio.Task, Tuple[WalletKey, int]] = {}
+
+        try:
+            while frontier or pending:
+                if check_cancelled:
+                    await check_cancelled()
+
+                while (
+                    frontier
+                    and len(pending) < self.concurrency
+                    and expanded < self.max_nodes
+                    and calls[0] < self.max_api_calls
+                ):
+                    _, _, _, key, hop = heapq.heappop(frontier)
+                    if key in visited:
+                        continue
+                    visited.add(key)
+                    expanded += 1
+                    task = asyncio.create_task(self._fetch_history(key, days))
+                    pending[task] = (key, hop)
+
+                if not pending:
+                    break
+
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    (blockchain, _), hop = pending.pop(task)
+                    transactions = task.result()
+                    transactions_added += transaction_set.add(blockchain, transactions)
+                    if hop < hops:
+                        for tx in transactions:
+                            score(blockchain, tx, hop + 1)
+        finally:
+            for task in pending:
+                task.cancel()
+            api_call_counter.reset(token)
+
+        frontier_remaining = len({key for *_, key, _ in frontier if key not in visited})
+        logger.info(
+            f"Rastreo a {hops} saltos: {expanded} wallets, {calls[0]} llamadas, "
+            f"{transactions_added} transacciones nuevas"
+        )
+        return {
+            "hops": hops,
+            "wallets_expanded": expanded,
+            "api_calls": calls[0],
+            "transactions_added": transactions_added,
+            "frontier_remaining": frontier_remaining,
+            "budget_exhausted": frontier_remaining > 0
+        }
+
+    async def _fetch_history(self, key: WalletKey, days: int) -> List[CompactTransaction]:
+        """Historial completo de una wallet de la frontera"""
+        blockchain, address = key
+        try:
+            transactions = []
+            async for batch in self.blockchain_service.iter_wallet_transactions(
+                address,
+                blockchain,
+                days,
+                max_age_seconds=settings.CRAWL_CACHE_MAX_AGE_SECONDS
+            ):
+                transactions.extend(batch)
+            return transactions
+
+        except Exception as e:
+            logger.error(f"Error rastreando wallet {address}: {str(e)}")
+            return []
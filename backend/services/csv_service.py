@@ -1,5 +1,6 @@
 import pandas as pd
 from typing import Dict, List, Tuple
+import hashlib
 import logging
 from ..utils import validate_csv_file, group_wallets_by_blockchain
 from ..models import WalletAddress
@@ -91,6 +92,27 @@ class CSVService:
         except ValueError as e:
             raise ValueError(f"Dirección inválida ({address}): {str(e)}")
 
+    def fingerprint_addresses(self, grouped_addresses: Dict[str, List[str]], hops: int = 0) -> str:
+        """
+        Calcula una huella del conjunto de direcciones, independiente del orden
+        y de duplicados, para reconocer subidas idénticas.
+        
+        Args:
+            grouped_addresses: Direcciones agrupadas por blockchain
+            hops: Saltos de expansión del grafo; forman parte de la huella
+            
+        Returns:
+            Hash SHA-256 en hexadecimal
+        """
+        entries = sorted({
+            f"{chain.lower()}:{address.lower()}"
+            for chain, addresses in grouped_addresses.items()
+            for address in addresses
+        })
+        if hops:
+            entries.append(f"hops:{hops}")
+        return hashlib.sha256("\n".join(entries).encode("utf-8")).hexdigest()
+
     def get_csv_summary(self, grouped_addresses: Dict[str, List[str]]) -> Dict:
         """
         Genera un resumen del contenido del CSV procesado.
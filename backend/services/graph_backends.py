@@ -0,0 +1,224 @@
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import logging
+import networkx as nx
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+class GraphBackend:
+    """
+    Estructura del grafo de transacciones. GraphService guarda solo los
+    agregados por arista que el backend no cubre (fechas, tokens, número de
+    transacciones); los nodos, la topología y las métricas por nodo (grado,
+    centralidad y volumen enviado y recibido) salen del backend.
+
+    Las aristas se construyen con su volumen en micro-dólares (`usd_micros`),
+    que no se usa como peso en la detección de comunidades.
+    """
+    name = "base"
+
+    def build(self, nodes: List[str], edges: Dict[Tuple[str, str], int]):
+        """Construye el grafo desde cero"""
+        raise NotImplementedError
+
+    def add_edges(self, nodes: List[str], edges: Dict[Tuple[str, str], int]):
+        """
+        Añade nodos nuevos y suma `usd_micros` a las aristas indicadas,
+        creándolas si no existen.
+        """
+        raise NotImplementedError
+
+    def nodes(self) -> List[str]:
+        raise NotImplementedError
+
+    def edges(self) -> Iterator[Tuple[str, str]]:
+        raise NotImplementedError
+
+    def number_of_nodes(self) -> int:
+        raise NotImplementedError
+
+    def has_node(self, node: str) -> bool:
+        raise NotImplementedError
+
+    def degrees(self) -> Dict[str, int]:
+        """Grado total (entrada + salida) de cada nodo"""
+        raise NotImplementedError
+
+    def degree_centrality(self) -> Dict[str, float]:
+        raise NotImplementedError
+
+    def node_totals(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Micro-dólares enviados y recibidos por cada nodo"""
+        raise NotImplementedError
+
+    def connected_components(self) -> List[Set[str]]:
+        """Componentes débilmente conexas"""
+        raise NotImplementedError
+
+class NetworkXBackend(GraphBackend):
+    """DiGraph de NetworkX: cómodo y suficiente para grafos pequeños"""
+    name = "networkx"
+
+    def __init__(self):
+        self.graph = nx.DiGraph()
+
+    def build(self, nodes: List[str], edges: Dict[Tuple[str, str], int]):
+        self.graph.clear()
+        self.add_edges(nodes, edges)
+
+    def add_edges(self, nodes: List[str], edges: Dict[Tuple[str, str], int]):
+        self.graph.add_nodes_from(nodes)
+        for (source, target), micros in edges.items():
+            data = self.graph.get_edge_data(source, target)
+            if data is None:
+                self.graph.add_edge(source, target, usd_micros=micros)
+            else:
+                data["usd_micros"] += micros
+
+    def nodes(self) -> List[str]:
+        return list(self.graph.nodes())
+
+    def edges(self) -> Iterator[Tuple[str, str]]:
+        return iter(self.graph.edges())
+
+    def number_of_nodes(self) -> int:
+        return self.graph.number_of_nodes()
+
+    def has_node(self, node: str) -> bool:
+        return self.graph.has_node(node)
+
+    def degrees(self) -> Dict[str, int]:
+        return dict(self.graph.degree())
+
+    def degree_centrality(self) -> Dict[str, float]:
+        return nx.degree_centrality(self.graph)
+
+    def node_totals(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        sent = dict(self.graph.out_degree(weight="usd_micros"))
+        received = dict(self.graph.in_degree(weight="usd_micros"))
+        return sent, received
+
+    def connected_components(self) -> List[Set[str]]:
+        return [set(component) for component in nx.weakly_connected_components(self.graph)]
+
+class SparseBackend(GraphBackend):
+    """
+    Matriz de adyacencia CSR de SciPy con las direcciones mapeadas a índices
+    enteros. Grados, totales y componentes se calculan con operaciones sobre
+    arrays, sin un objeto Python por arista.
+
+    Los totales enviados y recibidos se acumulan por nodo en arrays de enteros
+    Python (dtype object): sumados en int64 desbordarían sin aviso en wallets
+    con mucho volumen, y deben coincidir con los de NetworkXBackend.
+    """
+    name = "sparse"
+
+    def __init__(self):
+        self.addresses: List[str] = []
+        self.index: Dict[str, int] = {}
+        self._pattern = sparse.csr_matrix((0, 0), dtype=np.int8)
+        self._sent = np.zeros(0, dtype=object)
+        self._received = np.zeros(0, dtype=object)
+
+    def build(self, nodes: List[str], edges: Dict[Tuple[str, str], int]):
+        self.addresses = []
+        self.index = {}
+        self._pattern = sparse.csr_matrix((0, 0), dtype=np.int8)
+        self._sent = np.zeros(0, dtype=object)
+        self._received = np.zeros(0, dtype=object)
+        self.add_edges(nodes, edges)
+
+    def add_edges(self, nodes: List[str], edges: Dict[Tuple[str, str], int]):
+        for address in nodes:
+            if address not in self.index:
+                self.index[address] = len(self.addresses)
+                self.addresses.append(address)
+        size = len(self.addresses)
+
+        rows = np.fromiter((self.index[source] for source, _ in edges), dtype=np.int64, count=len(edges))
+        cols = np.fromiter((self.index[target] for _, target in edges), dtype=np.int64, count=len(edges))
+        weights = np.array(list(edges.values()), dtype=object)
+
+        # Totales exactos: np.add.at suma enteros Python sin desbordamiento
+        grown = np.zeros(size - len(self._sent), dtype=object)
+        self._sent = np.concatenate([self._sent, grown])
+        self._received = np.concatenate([self._received, grown])
+        np.add.at(self._sent, rows, weights)
+        np.add.at(self._received, cols, weights)
+
+        # La actualización del patrón es una suma de matrices dispersas: vectorizada, O(aristas)
+        delta_pattern = sparse.csr_matrix(
+            (np.ones(len(edges), dtype=np.int8), (rows, cols)),
+            shape=(size, size)
+        )
+        self._pattern.resize((size, size))
+        # El patrón de la matriz (no los pesos) define las aristas
+        self._pattern = (self._pattern + delta_pattern).tocsr()
+        self._pattern.data[:] = 1
+
+    def nodes(self) -> List[str]:
+        return list(self.addresses)
+
+    def edges(self) -> Iterator[Tuple[str, str]]:
+        coo = self._pattern.tocoo()
+        for row, col in zip(coo.row, coo.col):
+            yield self.addresses[row], self.addresses[col]
+
+    def number_of_nodes(self) -> int:
+        return len(self.addresses)
+
+    def has_node(self, node: str) -> bool:
+        return node in self.index
+
+    def _degree_array(self) -> np.ndarray:
+        out_degree = np.diff(self._pattern.indptr)
+        in_degree = np.bincount(self._pattern.indices, minlength=len(self.addresses))
+        return out_degree + in_degree
+
+    def degrees(self) -> Dict[str, int]:
+        return dict(zip(self.addresses, self._degree_array().tolist()))
+
+    def degree_centrality(self) -> Dict[str, float]:
+        size = len(self.addresses)
+        if size <= 1:
+            return {address: 1.0 for address in self.addresses}
+        centrality = self._degree_array() / (size - 1)
+        return dict(zip(self.addresses, centrality.tolist()))
+
+    def node_totals(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        return (
+            dict(zip(self.addresses, self._sent.tolist())),
+            dict(zip(self.addresses, self._received.tolist()))
+        )
+
+    def connected_components(self) -> List[Set[str]]:
+        count, labels = connected_components(self._pattern, directed=True, connection="weak")
+        order = np.argsort(labels, kind="stable")
+        boundaries = np.searchsorted(labels[order], np.arange(count + 1))
+        return [
+            {self.addresses[i] for i in order[boundaries[c]:boundaries[c + 1]]}
+            for c in range(count)
+        ]
+
+GRAPH_BACKENDS = {
+    NetworkXBackend.name: NetworkXBackend,
+    SparseBackend.name: SparseBackend
+}
+
+def create_graph_backend(node_count: int, backend: Optional[str] = None) -> GraphBackend:
+    """
+    Crea el backend configurado en GRAPH_BACKEND. Con "auto" se usa NetworkX
+    para grafos pequeños y matrices dispersas desde GRAPH_SPARSE_THRESHOLD nodos.
+    """
+    backend = (backend or settings.GRAPH_BACKEND).lower()
+    if backend == "auto":
+        backend = SparseBackend.name if node_count >= settings.GRAPH_SPARSE_THRESHOLD else NetworkXBackend.name
+
+    if backend not in GRAPH_BACKENDS:
+        logger.warning(f"GRAPH_BACKEND desconocido: {backend}; se usa networkx")
+        backend = NetworkXBackend.name
+
+    return GRAPH_BACKENDS[backend]()
@@ -1,21 +1,65 @@
-from typing import List, Dict, Set
-import networkx as nx
+from typing import Iterable, Iterator, List, Dict, Optional, Set, Tuple
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import asyncio
 import json
 import logging
-from ..models import Transaction, GraphNode, GraphEdge, GraphData
-from ..utils import format_wallet_address, calculate_similarity_score
+from ..models import GraphNode, GraphEdge, GraphData
+from .compact_transaction import CompactTransaction
+from .graph_backends import GraphBackend, create_graph_backend
+from ..config import settings
+from .community_detection import Component, detect_communities
+from .similarity import WalletFeatures, mean_pairwise_similarity, stable_hash
+from ..utils import format_wallet_address, usd_from_micros
 
 logger = logging.getLogger(__name__)
 
 class GraphService:
+    """
+    Grafo de transacciones de un análisis. Cada trabajo usa su propia
+    instancia (ver GraphRegistry) y el grafo se actualiza de forma
+    incremental con sync_transactions: solo se tocan las aristas afectadas
+    por las transacciones añadidas o quitadas.
+
+    Los nodos y sus métricas (grado, centralidad y volumen enviado y
+    recibido) viven en el backend y se leen de él al exportar; aquí solo se
+    guardan los agregados por arista que el backend no cubre.
+    """
     def __init__(self):
-        self.graph = nx.DiGraph()
-        self.node_properties = {}
+        self.graph: GraphBackend = create_graph_backend(0)
+        # Agregados por arista; el detalle de cada transacción va aparte
         self.edge_properties = {}
+        self.edge_transactions: Dict[Tuple[str, str], List[CompactTransaction]] = {}
+        self.wallet_stats: Dict[str, Dict] = {}
+        # Clave de cada transacción incluida y la arista a la que pertenece
+        self._transaction_keys: Dict[str, Tuple[str, str]] = {}
+        # Aumenta con cada cambio del grafo
+        self.version = 0
+        # Hash del contenido (transacciones y wallets analizadas), independiente
+        # del orden en que se añadieron; identifica los clusters cacheados
+        self._content_hash = 0
+        self._clusters_cache: Optional[Tuple[str, List[Dict]]] = None
+
+    def reset(self):
+        """Vacía el grafo"""
+        self.graph = create_graph_backend(0)
+        self.edge_properties.clear()
+        self.edge_transactions.clear()
+        self.wallet_stats = {}
+        self._transaction_keys.clear()
+        self._content_hash = 0
+        self._clusters_cache = None
+        self.version += 1
+
+    @property
+    def graph_hash(self) -> str:
+        """Hash de la versión actual del grafo"""
+        return f"{self._content_hash:016x}"
 
     def create_transaction_graph(
         self,
-        transactions: List[Transaction],
+        transactions: List[CompactTransaction],
         wallet_stats: Dict
     ) -> GraphData:
         """
@@ -29,126 +73,195 @@ class GraphService:
             GraphData con nodos y aristas del grafo
         """
         try:
-            # Reiniciar el grafo
-            self.graph.clear()
-            self.node_properties.clear()
-            self.edge_properties.clear()
-            
-            # Procesar transacciones para crear el grafo
-            self._process_transactions(transactions, wallet_stats)
-            
-            # Calcular métricas adicionales
-            self._calculate_node_metrics()
-            self._calculate_edge_weights()
-            
-            # Convertir el grafo a formato GraphData
-            return self._convert_to_graph_data()
+            self.reset()
+            self.add_transactions(transactions, wallet_stats)
+            return self.get_graph_data()
             
         except Exception as e:
             logger.error(f"Error creando grafo de transacciones: {str(e)}")
             return GraphData(nodes=[], edges=[])
 
-    def _process_transactions(
+    def add_transactions(
         self,
-        transactions: List[Transaction],
-        wallet_stats: Dict
-    ):
-        """Procesa las transacciones para crear nodos y aristas"""
-        analyzed_addresses = set(wallet_stats.keys())
+        transactions: List[CompactTransaction],
+        wallet_stats: Optional[Dict] = None
+    ) -> int:
+        """
+        Añade transacciones al grafo existente. Las ya incluidas se ignoran,
+        así que volver a pasar un historial con unas pocas transacciones
+        nuevas cuesta en proporción a estas.
+        
+        Args:
+            transactions: Transacciones a añadir
+            wallet_stats: Estadísticas de wallets analizadas (nuevas o actualizadas)
+            
+        Returns:
+            Número de transacciones añadidas
+        """
+        if wallet_stats:
+            for address in wallet_stats:
+                if address not in self.wallet_stats:
+                    self._content_hash ^= stable_hash(f"wallet:{address}", digest_size=8)
+            self.wallet_stats.update(wallet_stats)
+        
+        new_nodes: Dict[str, None] = {}
+        edge_deltas: Dict[Tuple[str, str], int] = {}
+        added = 0
         
         for tx in transactions:
-            from_addr = tx.from_address.lower()
-            to_addr = tx.to_address.lower()
+            key = tx.key
+            if key in self._transaction_keys:
+                continue
+            self._content_hash ^= stable_hash(f"tx:{key}", digest_size=8)
+            added += 1
             
-            # Añadir nodos si no existen
-            if from_addr not in self.graph:
-                self._add_node(from_addr, analyzed_addresses)
-            if to_addr not in self.graph:
-                self._add_node(to_addr, analyzed_addresses)
+            # Las direcciones ya vienen normalizadas e internadas
+            from_addr = tx.from_address
+            to_addr = tx.to_address
             
-            # Añadir o actualizar arista
-            if self.graph.has_edge(from_addr, to_addr):
-                self.edge_properties[(from_addr, to_addr)]["transactions"].append({
-                    "hash": tx.hash,
-                    "value": tx.usd_value,
-                    "timestamp": tx.timestamp.isoformat(),
-                    "token": tx.token_symbol
-                })
-            else:
-                self.graph.add_edge(from_addr, to_addr)
-                self.edge_properties[(from_addr, to_addr)] = {
-                    "transactions": [{
-                        "hash": tx.hash,
-                        "value": tx.usd_value,
-                        "timestamp": tx.timestamp.isoformat(),
-                        "token": tx.token_symbol
-                    }],
-                    "total_value": 0,
-                    "transaction_count": 0
+            # Nodos que el backend aún no tiene, en orden de aparición
+            for address in (from_addr, to_addr):
+                if address not in new_nodes and not self.graph.has_node(address):
+                    new_nodes[address] = None
+            
+            # Añadir o actualizar la arista y sus agregados
+            edge = (from_addr, to_addr)
+            self._transaction_keys[key] = edge
+            props = self.edge_properties.get(edge)
+            if props is None:
+                props = self.edge_properties[edge] = {
+                    "transaction_count": 0,
+                    "total_micros": 0,
+                    "first_timestamp": tx.timestamp,
+                    "last_timestamp": tx.timestamp,
+                    "tokens": set()
                 }
+                self.edge_transactions[edge] = []
+            
+            props["transaction_count"] += 1
+            props["total_micros"] += tx.usd_micros
+            if tx.timestamp < props["first_timestamp"]:
+                props["first_timestamp"] = tx.timestamp
+            if tx.timestamp > props["last_timestamp"]:
+                props["last_timestamp"] = tx.timestamp
+            if tx.token_symbol:
+                props["tokens"].add(tx.token_symbol)
+            self.edge_transactions[edge].append(tx)
+            edge_deltas[edge] = edge_deltas.get(edge, 0) + tx.usd_micros
+        
+        if not edge_deltas:
+            if wallet_stats:
+                self.version += 1
+            return 0
+        
+        self._update_structure(list(new_nodes), edge_deltas)
+        self.version += 1
+        return added
 
-    def _add_node(self, address: str, analyzed_addresses: Set[str]):
-        """Añade un nodo al grafo con sus propiedades iniciales"""
-        self.graph.add_node(address)
-        self.node_properties[address] = {
-            "address": address,
-            "label": format_wallet_address(address),
-            "is_analyzed": address in analyzed_addresses,
-            "total_sent": 0,
-            "total_received": 0,
-            "transaction_count": 0,
-            "degree_centrality": 0
-        }
+    def sync_transactions(
+        self,
+        transactions: List[CompactTransaction],
+        wallet_stats: Optional[Dict] = None
+    ) -> Tuple[int, int]:
+        """
+        Deja en el grafo exactamente las transacciones indicadas: quita las
+        que ya no están (las que han salido de la ventana del análisis) y
+        añade las nuevas. Al repetir un análisis al día siguiente, el coste
+        es proporcional a las transacciones de ese día y a las que caducan.
+        
+        Args:
+            transactions: Transacciones actuales del análisis
+            wallet_stats: Estadísticas de wallets analizadas (nuevas o actualizadas)
+            
+        Returns:
+            Número de transacciones añadidas y quitadas
+        """
+        current = {tx.key for tx in transactions}
+        removed = self.remove_transactions(
+            [key for key in self._transaction_keys if key not in current]
+        )
+        added = self.add_transactions(transactions, wallet_stats)
+        return added, removed
 
-    def _calculate_node_metrics(self):
-        """Calcula métricas adicionales para los nodos"""
-        try:
-            # Calcular grado de centralidad
-            centrality = nx.degree_centrality(self.graph)
+    def remove_transactions(self, keys: Iterable[str]) -> int:
+        """
+        Quita transacciones del grafo. Solo se recalculan los agregados de
+        las aristas afectadas; si alguna se queda sin transacciones, el
+        backend se reconstruye con las aristas restantes para eliminarla
+        junto con los nodos que quedan aislados.
+        
+        Args:
+            keys: Claves (CompactTransaction.key) de las transacciones a quitar
             
-            for node in self.graph.nodes():
-                # Actualizar centralidad
-                self.node_properties[node]["degree_centrality"] = centrality[node]
-                
-                # Calcular totales de transacciones
-                total_sent = sum(
-                    sum(tx["value"] for tx in self.edge_properties[(node, succ)]["transactions"])
-                    for succ in self.graph.successors(node)
-                )
-                
-                total_received = sum(
-                    sum(tx["value"] for tx in self.edge_properties[(pred, node)]["transactions"])
-                    for pred in self.graph.predecessors(node)
-                )
-                
-                self.node_properties[node].update({
-                    "total_sent": total_sent,
-                    "total_received": total_received,
-                    "transaction_count": self.graph.in_degree(node) + self.graph.out_degree(node)
-                })
-                
-        except Exception as e:
-            logger.error(f"Error calculando métricas de nodos: {str(e)}")
+        Returns:
+            Número de transacciones quitadas
+        """
+        removed: Dict[Tuple[str, str], Set[str]] = {}
+        for key in keys:
+            edge = self._transaction_keys.pop(key, None)
+            if edge is None:
+                continue
+            self._content_hash ^= stable_hash(f"tx:{key}", digest_size=8)
+            removed.setdefault(edge, set()).add(key)
+        
+        if not removed:
+            return 0
+        
+        edge_deltas: Dict[Tuple[str, str], int] = {}
+        edges_removed = False
+        for edge, edge_keys in removed.items():
+            props = self.edge_properties[edge]
+            transactions = [tx for tx in self.edge_transactions[edge] if tx.key not in edge_keys]
+            if not transactions:
+                del self.edge_properties[edge]
+                del self.edge_transactions[edge]
+                edges_removed = True
+                continue
+            
+            total_micros = sum(tx.usd_micros for tx in transactions)
+            edge_deltas[edge] = total_micros - props["total_micros"]
+            props.update({
+                "transaction_count": len(transactions),
+                "total_micros": total_micros,
+                "first_timestamp": min(tx.timestamp for tx in transactions),
+                "last_timestamp": max(tx.timestamp for tx in transactions),
+                "tokens": {tx.token_symbol for tx in transactions if tx.token_symbol}
+            })
+            self.edge_transactions[edge] = transactions
+        
+        if edges_removed:
+            self._rebuild_structure()
+        else:
+            self.graph.add_edges([], edge_deltas)
+        self.version += 1
+        return sum(len(edge_keys) for edge_keys in removed.values())
 
-    def _calculate_edge_weights(self):
-        """Calcula pesos y métricas adicionales para las aristas"""
-        try:
-            for edge in self.graph.edges():
-                from_addr, to_addr = edge
-                transactions = self.edge_properties[edge]["transactions"]
-                
-                # Calcular totales
-                total_value = sum(tx["value"] for tx in transactions)
-                transaction_count = len(transactions)
-                
-                self.edge_properties[edge].update({
-                    "total_value": total_value,
-                    "transaction_count": transaction_count,
-                    "weight": total_value * transaction_count  # Peso combinado
-                })
-                
-        except Exception as e:
-            logger.error(f"Error calculando pesos de aristas: {str(e)}")
+    def _rebuild_structure(self):
+        """Reconstruye el backend a partir de las aristas, sin los nodos aislados"""
+        endpoints = {address for edge in self.edge_properties for address in edge}
+        nodes = [node for node in self.graph.nodes() if node in endpoints]
+        self.graph = create_graph_backend(len(nodes))
+        self.graph.build(
+            nodes,
+            {edge: props["total_micros"] for edge, props in self.edge_properties.items()}
+        )
+
+    def _update_structure(self, new_nodes: List[str], edge_deltas: Dict[Tuple[str, str], int]):
+        """Lleva los cambios al backend, cambiando de backend si el grafo ha crecido"""
+        backend = create_graph_backend(self.graph.number_of_nodes() + len(new_nodes))
+        if backend.name != self.graph.name:
+            # Con GRAPH_BACKEND=auto el grafo pasa a matrices dispersas al crecer
+            backend.build(
+                self.graph.nodes() + new_nodes,
+                {edge: props["total_micros"] for edge, props in self.edge_properties.items()}
+            )
+            self.graph = backend
+        else:
+            self.graph.add_edges(new_nodes, edge_deltas)
+
+    def get_graph_data(self) -> GraphData:
+        """Grafo actual en formato GraphData"""
+        return self._convert_to_graph_data()
 
     def _convert_to_graph_data(self) -> GraphData:
         """Convierte el grafo interno a formato GraphData"""
@@ -157,8 +270,7 @@ class GraphService:
             edges = []
             
             # Convertir nodos
-            for node in self.graph.nodes():
-                props = self.node_properties[node]
+            for node, props in self._node_properties().items():
                 nodes.append(GraphNode(
                     id=node,
                     label=props["label"],
@@ -171,11 +283,18 @@ class GraphService:
             for edge in self.graph.edges():
                 from_addr, to_addr = edge
                 props = self.edge_properties[edge]
+                total_value = usd_from_micros(props["total_micros"])
                 edges.append(GraphEdge(
                     source=from_addr,
                     target=to_addr,
-                    weight=props["weight"],
-                    properties=props
+                    weight=total_value * props["transaction_count"],  # Peso combinado
+                    properties={
+                        "transaction_count": props["transaction_count"],
+                        "total_value": total_value,
+                        "first_timestamp": _isoformat(props["first_timestamp"]),
+                        "last_timestamp": _isoformat(props["last_timestamp"]),
+                        "tokens": sorted(props["tokens"])
+                    }
                 ))
             
             return GraphData(nodes=nodes, edges=edges)
@@ -184,72 +303,167 @@ class GraphService:
             logger.error(f"Error convirtiendo a GraphData: {str(e)}")
             return GraphData(nodes=[], edges=[])
 
-    def detect_clusters(self) -> List[Dict]:
+    def _node_properties(self) -> Dict[str, Dict]:
+        """
+        Propiedades de cada nodo a partir de las métricas del backend. El
+        número de transacciones de un nodo es su grado: las aristas (pares de
+        wallets) en las que participa.
+        """
+        degrees = self.graph.degrees()
+        centrality = self.graph.degree_centrality()
+        sent, received = self.graph.node_totals()
+        return {
+            node: {
+                "address": node,
+                "label": format_wallet_address(node),
+                "is_analyzed": node in self.wallet_stats,
+                "total_sent": usd_from_micros(sent[node]),
+                "total_received": usd_from_micros(received[node]),
+                "transaction_count": degrees[node],
+                "degree_centrality": centrality[node]
+            }
+            for node in self.graph.nodes()
+        }
+
+    def get_edge_transactions(self) -> Dict[str, List[Dict]]:
+        """
+        Detalle de las transacciones de cada arista, fuera de GraphData para
+        no inflar el grafo que se envía al cliente. Se consulta bajo demanda.
+        
+        Returns:
+            Dict de "origen->destino" a la lista de transacciones de la arista
+        """
+        return {
+            edge_key(from_addr, to_addr): [
+                {
+                    "hash": tx.hash,
+                    "value": tx.usd_value,
+                    "timestamp": tx.block_datetime.isoformat(),
+                    "token": tx.token_symbol
+                }
+                for tx in transactions
+            ]
+            for (from_addr, to_addr), transactions in self.edge_transactions.items()
+        }
+
+    async def detect_clusters(self) -> List[Dict]:
         """
         Detecta clusters de wallets que podrían estar relacionadas.
         
+        Louvain se ejecuta por componente conexa en un pool de procesos, con
+        semilla fija (CLUSTER_SEED) para que el resultado sea reproducible.
+        El resultado se cachea con el hash del grafo: mientras no cambie, las
+        llamadas repetidas no recalculan nada.
+        
         Returns:
             Lista de clusters con sus propiedades
         """
-        try:
-            # Convertir a grafo no dirigido para análisis de comunidades
-            undirected = self.graph.to_undirected()
+        graph_hash = self.graph_hash
+        if self._clusters_cache is not None and self._clusters_cache[0] == graph_hash:
+            return self._clusters_cache[1]
             
+        try:
             # Detectar comunidades usando el algoritmo de Louvain
-            communities = nx.community.louvain_communities(undirected)
+            communities = await detect_communities(self._components(), settings.CLUSTER_SEED)
+            
+            # Solo considerar grupos de 2 o más wallets
+            communities = [community for community in communities if len(community) > 1]
+            node_properties = self._node_properties()
+            internal_transactions = self._count_internal_transactions(communities)
             
             # Analizar cada comunidad
             clusters = []
-            for i, community in enumerate(communities):
-                if len(community) > 1:  # Solo considerar grupos de 2 o más wallets
-                    # Calcular propiedades del cluster
-                    cluster_info = {
-                        "id": i,
-                        "wallets": list(community),
-                        "size": len(community),
-                        "total_volume": sum(
-                            self.node_properties[node]["total_sent"] +
-                            self.node_properties[node]["total_received"]
-                            for node in community
-                        ),
-                        "internal_transactions": self._count_internal_transactions(community),
-                        "similarity_score": self._calculate_cluster_similarity(community)
-                    }
-                    clusters.append(cluster_info)
+            for community, internal in zip(communities, internal_transactions):
+                # Calcular propiedades del cluster
+                cluster_info = {
+                    "wallets": community,
+                    "size": len(community),
+                    "total_volume": sum(
+                        node_properties[node]["total_sent"] +
+                        node_properties[node]["total_received"]
+                        for node in community
+                    ),
+                    "internal_transactions": internal,
+                    "similarity_score": await self._calculate_cluster_similarity(community, node_properties)
+                }
+                clusters.append(cluster_info)
+            
+            clusters.sort(key=lambda x: x["similarity_score"], reverse=True)
+            for i, cluster in enumerate(clusters):
+                cluster["id"] = i
             
-            return sorted(clusters, key=lambda x: x["similarity_score"], reverse=True)
+            # Si el grafo ha cambiado mientras tanto, el resultado no se cachea
+            if graph_hash == self.graph_hash:
+                self._clusters_cache = (graph_hash, clusters)
+            return clusters
             
         except Exception as e:
             logger.error(f"Error detectando clusters: {str(e)}")
             return []
 
-    def _count_internal_transactions(self, community: Set[str]) -> int:
-        """Cuenta el número de transacciones entre miembros de la comunidad"""
-        count = 0
-        for from_addr in community:
-            for to_addr in community:
-                if self.graph.has_edge(from_addr, to_addr):
-                    count += len(self.edge_properties[(from_addr, to_addr)]["transactions"])
-        return count
+    def _components(self) -> List[Component]:
+        """
+        Componentes conexas de dos o más nodos, con las aristas como pares de
+        índices, en un orden estable para que la detección sea reproducible.
+        """
+        components = sorted(
+            sorted(component)
+            for component in self.graph.connected_components()
+            if len(component) > 1
+        )
+        location = {}
+        for c, nodes in enumerate(components):
+            for i, node in enumerate(nodes):
+                location[node] = (c, i)
+        
+        edges: List[List[Tuple[int, int]]] = [[] for _ in components]
+        for from_addr, to_addr in self.graph.edges():
+            c, i = location[from_addr]
+            edges[c].append((i, location[to_addr][1]))
+        
+        return [(nodes, sorted(component_edges)) for nodes, component_edges in zip(components, edges)]
+
+    def _count_internal_transactions(self, communities: List[List[str]]) -> List[int]:
+        """
+        Cuenta el número de transacciones entre miembros de cada comunidad,
+        con una sola pasada por las aristas
+        """
+        membership = {
+            node: c
+            for c, community in enumerate(communities)
+            for node in community
+        }
+        counts = [0] * len(communities)
+        for (from_addr, to_addr), props in self.edge_properties.items():
+            c = membership.get(from_addr)
+            if c is not None and membership.get(to_addr) == c:
+                counts[c] += props["transaction_count"]
+        return counts
 
-    def _calculate_cluster_similarity(self, community: Set[str]) -> float:
-        """Calcula un score de similitud para los miembros del cluster"""
+    async def _calculate_cluster_similarity(
+        self,
+        community: List[str],
+        node_properties: Dict[str, Dict]
+    ) -> float:
+        """
+        Calcula un score de similitud para los miembros del cluster: la media
+        de calculate_similarity_score sobre todos los pares, con operaciones
+        matriciales (y por muestreo en comunidades muy grandes). El cálculo se
+        hace en un hilo para no bloquear el event loop.
+        """
         if len(community) < 2:
             return 0.0
             
         try:
-            # Calcular similitud promedio entre todos los pares
-            similarities = []
-            for addr1 in community:
-                for addr2 in community:
-                    if addr1 < addr2:  # Evitar duplicados
-                        score = calculate_similarity_score(
-                            self.node_properties[addr1],
-                            self.node_properties[addr2]
-                        )
-                        similarities.append(score)
-            
-            return sum(similarities) / len(similarities) if similarities else 0.0
+            # Las wallets analizadas tienen perfil completo; el resto solo
+            # las propiedades del nodo
+            profiles = [
+                self.wallet_stats.get(address) or node_properties[address]
+                for address in sorted(community)
+            ]
+            features = WalletFeatures.from_profiles(profiles)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, mean_pairwise_similarity, features)
             
         except Exception as e:
             logger.error(f"Error calculando similitud de cluster: {str(e)}")
@@ -270,4 +484,43 @@ class GraphService:
             })
         except Exception as e:
             logger.error(f"Error exportando grafo a JSON: {str(e)}")
-            return json.dumps({"nodes": [], "edges": []})
\ No newline at end of file
+            return json.dumps({"nodes": [], "edges": []})
+
+class GraphRegistry:
+    """
+    Grafos por clave (la huella del conjunto de wallets del análisis), para
+    que repetir el análisis de la misma lista de wallets reutilice su grafo
+    y solo procese las transacciones que han cambiado. Se conservan los
+    GRAPH_REGISTRY_SIZE grafos usados más recientemente.
+    
+    Es una caché local de cada proceso: un trabajo que se ejecuta en otro
+    worker no encuentra el grafo y lo construye desde cero, con el mismo
+    resultado.
+    """
+    def __init__(self, max_graphs: Optional[int] = None):
+        self.max_graphs = settings.GRAPH_REGISTRY_SIZE if max_graphs is None else max_graphs
+        self._graphs: "OrderedDict[str, GraphService]" = OrderedDict()
+
+    @contextmanager
+    def checkout(self, key: str) -> Iterator[GraphService]:
+        """
+        Entrega el grafo de la clave (o uno nuevo) para uso exclusivo de un
+        trabajo. Mientras está en uso sale del registro, así que otro trabajo
+        con la misma clave (p. ej. un análisis forzado lanzado a la vez)
+        recibe un grafo propio en lugar de modificar el mismo. Al terminar, el
+        grafo vuelve al registro; si el trabajo falla se descarta, porque
+        podría haber quedado a medio actualizar.
+        """
+        graph_service = self._graphs.pop(key, None) or GraphService()
+        yield graph_service
+        
+        self._graphs[key] = graph_service
+        while len(self._graphs) > self.max_graphs:
+            self._graphs.popitem(last=False)
+
+def edge_key(source: str, target: str) -> str:
+    """Clave de una arista en el detalle de transacciones"""
+    return f"{source}->{target}"
+
+def _isoformat(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
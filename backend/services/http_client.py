@@ -0,0 +1,88 @@
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+import aiohttp
+from ..config import settings
+from .rate_limiter import RetryableError, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+class HTTPClient:
+    """
+    Cliente HTTP compartido por toda la aplicación.
+    
+    Mantiene una única sesión aiohttp con un pool de conexiones keep-alive
+    por host, de modo que las llamadas a Moralis, precios y OpenAI reutilizan
+    conexiones TLS en lugar de abrir una nueva por petición.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def startup(self):
+        """Crea la sesión compartida (se llama en el arranque de FastAPI)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=settings.HTTP_POOL_SIZE,
+                limit_per_host=settings.HTTP_POOL_SIZE_PER_HOST,
+                keepalive_timeout=settings.HTTP_KEEPALIVE_SECONDS,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=settings.HTTP_TIMEOUT_SECONDS)
+            )
+            logger.info("Sesión HTTP compartida inicializada")
+
+    async def shutdown(self):
+        """Cierra la sesión compartida (se llama al apagar FastAPI)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Sesión HTTP compartida cerrada")
+        self._session = None
+
+    async def ensure_session(self) -> aiohttp.ClientSession:
+        """Retorna la sesión compartida, creándola si se usa fuera de FastAPI"""
+        if self._session is None or self._session.closed:
+            await self.startup()
+        return self._session
+
+    async def request_json(
+        self,
+        method: str,
+        url: str,
+        params: Any = None,
+        json_body: Any = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Any:
+        """
+        Realiza una petición y retorna el cuerpo JSON.
+        
+        Raises:
+            aiohttp.ClientResponseError: Si la respuesta no es 2xx
+        """
+        session = await self.ensure_session()
+        async with session.request(
+            method,
+            url,
+            params=params,
+            json=json_body,
+            headers=headers
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
+
+def classify_http_error(error: Exception) -> Optional[RetryableError]:
+    """Decide si un error de aiohttp es transitorio (429, 5xx, red o timeout)"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        if error.status == 429:
+            retry_after = parse_retry_after(error.headers.get("Retry-After") if error.headers else None)
+            return RetryableError(str(error), retry_after=retry_after, throttled=True)
+        if error.status >= 500:
+            return RetryableError(str(error))
+        return None
+    if isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+        return RetryableError(str(error))
+    return None
+
+http_client = HTTPClient()
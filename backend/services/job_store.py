@@ -0,0 +1,871 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pydantic import BaseModel
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+def json_default(value: Any) -> Any:
+    """Serializa tipos no nativos de JSON (fechas y modelos de los reportes)"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, set):
+        return list(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+def _dumps(data: Dict) -> str:
+    return json.dumps(data, default=json_default)
+
+class JobStore:
+    """
+    Interfaz común de los almacenes de trabajos de análisis.
+    
+    Cada trabajo es un dict pequeño con su estado (`status`, `progress`,
+    `message`, versiones...). Los resultados voluminosos (estadísticas por
+    wallet, grafo, transacciones de cada arista, reporte) se guardan aparte
+    como artefactos del trabajo, agrupados por tipo y con una clave y una
+    versión cada uno, para que actualizar el progreso no reescriba todo el
+    reporte. Los trabajos y sus artefactos expiran tras JOB_TTL_SECONDS
+    desde la última actualización del trabajo.
+    
+    El almacén incluye además la cola de trabajos pendientes que consumen
+    los workers (ver worker.py). Un worker que toma un trabajo recibe una
+    concesión (lease) de JOB_LEASE_SECONDS que renueva mientras lo procesa;
+    si muere sin liberarla, el trabajo vuelve a la cola al expirar, hasta
+    JOB_MAX_ATTEMPTS intentos.
+    """
+
+    def __init__(self, ttl_seconds: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds or settings.JOB_TTL_SECONDS
+        self.lease_seconds = settings.JOB_LEASE_SECONDS
+        self.max_attempts = settings.JOB_MAX_ATTEMPTS
+
+    async def _fail_abandoned(self, job_ids: List[str]):
+        """Marca como fallidos los trabajos que agotaron sus intentos"""
+        for job_id in job_ids:
+            logger.error(f"Trabajo {job_id} abandonado tras {self.max_attempts} intentos")
+            fields = {
+                "status": "error",
+                "message": "El análisis se interrumpió repetidamente",
+                "error": "worker_lost"
+            }
+            await self.update(job_id, fields)
+            await self.publish_event(job_id, "error", fields)
+
+    async def create(self, job_id: str, data: Dict):
+        raise NotImplementedError
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def update(self, job_id: str, fields: Dict):
+        """Actualiza campos de un trabajo existente"""
+        raise NotImplementedError
+
+    async def delete(self, job_id: str):
+        raise NotImplementedError
+
+    async def put_artifacts(self, job_id: str, kind: str, items: Dict[str, Any], version: int = 0):
+        """Guarda (o sustituye) artefactos de un tipo, por clave, con su versión"""
+        raise NotImplementedError
+
+    async def get_artifact(self, job_id: str, kind: str, key: str) -> Optional[Any]:
+        """Retorna un artefacto por tipo y clave, o None si no existe"""
+        raise NotImplementedError
+
+    async def list_artifacts(self, job_id: str, kind: str, since_version: int = 0) -> List[Any]:
+        """Artefactos de un tipo con versión mayor que `since_version`, por orden de versión"""
+        raise NotImplementedError
+
+    async def enqueue(self, job_id: str, priority: int = 0):
+        """Encola un trabajo para los workers (mayor prioridad primero, FIFO a igual prioridad)"""
+        raise NotImplementedError
+
+    async def dequeue(self, lease_seconds: Optional[int] = None) -> Optional[str]:
+        """
+        Toma de la cola el siguiente trabajo a ejecutar con una concesión de
+        `lease_seconds`, o retorna None si está vacía. Antes devuelve a la
+        cola los trabajos con la concesión expirada.
+        """
+        raise NotImplementedError
+
+    async def renew_lease(self, job_id: str, lease_seconds: Optional[int] = None) -> bool:
+        """Prolonga la concesión de un trabajo; False si ya no la tiene este worker"""
+        raise NotImplementedError
+
+    async def release(self, job_id: str):
+        """Libera la concesión de un trabajo terminado (con o sin éxito)"""
+        raise NotImplementedError
+
+    async def remove_from_queue(self, job_id: str) -> bool:
+        """Quita un trabajo de la cola; retorna True si aún no lo había tomado un worker"""
+        raise NotImplementedError
+
+    async def set_fingerprint(self, fingerprint: str, job_id: str, ttl_seconds: int):
+        """Asocia la huella de un conjunto de direcciones a un trabajo durante ttl_seconds"""
+        raise NotImplementedError
+
+    async def claim_fingerprint(
+        self,
+        fingerprint: str,
+        job_id: str,
+        ttl_seconds: int,
+        replace: Optional[str] = None
+    ) -> str:
+        """
+        Asocia la huella a `job_id` de forma atómica solo si no tiene un
+        trabajo vigente o si su trabajo es `replace`. Con dos subidas
+        idénticas simultáneas, solo una se queda la huella.
+
+        Returns:
+            El trabajo asociado a la huella tras la operación
+        """
+        raise NotImplementedError
+
+    async def get_fingerprint(self, fingerprint: str) -> Optional[str]:
+        """Retorna el trabajo asociado a una huella si sigue vigente"""
+        raise NotImplementedError
+
+    async def publish_event(self, job_id: str, event_type: str, data: Dict):
+        """Añade un evento al historial del trabajo (progreso, etapas, resultados parciales)"""
+        raise NotImplementedError
+
+    async def get_events(self, job_id: str, after_id: int = 0) -> List[Dict]:
+        """
+        Retorna los eventos del trabajo posteriores a `after_id`, cada uno con
+        `id` (creciente), `type` y `data`.
+        """
+        raise NotImplementedError
+
+class InMemoryJobStore(JobStore):
+    """Almacén en memoria del proceso, con expulsión por TTL"""
+
+    def __init__(self, ttl_seconds: Optional[int] = None):
+        super().__init__(ttl_seconds)
+        self._jobs: Dict[str, Dict] = {}
+        self._expires_at: Dict[str, float] = {}
+        self._queue = []
+        self._queued = set()
+        self._priorities: Dict[str, int] = {}
+        # job_id -> instante de expiración de la concesión
+        self._leases: Dict[str, float] = {}
+        self._attempts: Dict[str, int] = {}
+        self._sequence = itertools.count()
+        self._fingerprints: Dict[str, tuple] = {}
+        self._events: Dict[str, List[Dict]] = {}
+        # job_id -> tipo -> clave -> (versión, datos)
+        self._artifacts: Dict[str, Dict[str, Dict[str, Tuple[int, Any]]]] = {}
+
+    def _discard(self, job_id: str):
+        """Elimina el trabajo junto con sus eventos y artefactos"""
+        self._jobs.pop(job_id, None)
+        self._expires_at.pop(job_id, None)
+        self._events.pop(job_id, None)
+        self._artifacts.pop(job_id, None)
+
+    def _evict_expired(self):
+        now = time.time()
+        for job_id in [job_id for job_id, expires in self._expires_at.items() if expires <= now]:
+            self._discard(job_id)
+
+    async def create(self, job_id: str, data: Dict):
+        self._evict_expired()
+        self._jobs[job_id] = dict(data)
+        self._expires_at[job_id] = time.time() + self.ttl_seconds
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        if self._expires_at.get(job_id, 0) <= time.time():
+            self._discard(job_id)
+            return None
+        return dict(self._jobs[job_id])
+
+    async def update(self, job_id: str, fields: Dict):
+        if job_id not in self._jobs:
+            return
+        self._jobs[job_id].update(fields)
+        self._expires_at[job_id] = time.time() + self.ttl_seconds
+
+    async def delete(self, job_id: str):
+        self._discard(job_id)
+
+    async def put_artifacts(self, job_id: str, kind: str, items: Dict[str, Any], version: int = 0):
+        artifacts = self._artifacts.setdefault(job_id, {}).setdefault(kind, {})
+        for key, data in items.items():
+            artifacts[key] = (version, data)
+
+    async def get_artifact(self, job_id: str, kind: str, key: str) -> Optional[Any]:
+        entry = self._artifacts.get(job_id, {}).get(kind, {}).get(key)
+        return entry[1] if entry else None
+
+    async def list_artifacts(self, job_id: str, kind: str, since_version: int = 0) -> List[Any]:
+        entries = self._artifacts.get(job_id, {}).get(kind, {}).values()
+        return [data for version, data in sorted(entries, key=lambda entry: entry[0]) if version > since_version]
+
+    async def enqueue(self, job_id: str, priority: int = 0):
+        heapq.heappush(self._queue, (-priority, next(self._sequence), job_id))
+        self._queued.add(job_id)
+        self._priorities[job_id] = priority
+
+    async def dequeue(self, lease_seconds: Optional[int] = None) -> Optional[str]:
+        now = time.time()
+        abandoned = []
+        for job_id in [job_id for job_id, expires in self._leases.items() if expires <= now]:
+            del self._leases[job_id]
+            if self._attempts.get(job_id, 0) >= self.max_attempts:
+                self._attempts.pop(job_id, None)
+                self._priorities.pop(job_id, None)
+                abandoned.append(job_id)
+            else:
+                await self.enqueue(job_id, self._priorities.get(job_id, 0))
+        await self._fail_abandoned(abandoned)
+        
+        while self._queue:
+            _, _, job_id = heapq.heappop(self._queue)
+            if job_id in self._queued:
+                self._queued.discard(job_id)
+                self._leases[job_id] = now + (lease_seconds or self.lease_seconds)
+                self._attempts[job_id] = self._attempts.get(job_id, 0) + 1
+                return job_id
+        return None
+
+    async def renew_lease(self, job_id: str, lease_seconds: Optional[int] = None) -> bool:
+        if job_id not in self._leases:
+            return False
+        self._leases[job_id] = time.time() + (lease_seconds or self.lease_seconds)
+        return True
+
+    async def release(self, job_id: str):
+        self._leases.pop(job_id, None)
+        self._attempts.pop(job_id, None)
+        self._priorities.pop(job_id, None)
+
+    async def remove_from_queue(self, job_id: str) -> bool:
+        # Se descarta de forma perezosa al llegar a la cabeza de la cola
+        if job_id in self._queued:
+            self._queued.discard(job_id)
+            self._attempts.pop(job_id, None)
+            self._priorities.pop(job_id, None)
+            return True
+        return False
+
+    async def set_fingerprint(self, fingerprint: str, job_id: str, ttl_seconds: int):
+        now = time.time()
+        for key in [key for key, (_, expires) in self._fingerprints.items() if expires <= now]:
+            del self._fingerprints[key]
+        self._fingerprints[fingerprint] = (job_id, now + ttl_seconds)
+
+    async def claim_fingerprint(
+        self,
+        fingerprint: str,
+        job_id: str,
+        ttl_seconds: int,
+        replace: Optional[str] = None
+    ) -> str:
+        # Sin puntos de espera: atómico dentro del event loop
+        owner = await self.get_fingerprint(fingerprint)
+        if owner is None or owner == replace:
+            await self.set_fingerprint(fingerprint, job_id, ttl_seconds)
+            return job_id
+        return owner
+
+    async def get_fingerprint(self, fingerprint: str) -> Optional[str]:
+        entry = self._fingerprints.get(fingerprint)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    async def publish_event(self, job_id: str, event_type: str, data: Dict):
+        events = self._events.setdefault(job_id, [])
+        events.append({"id": len(events) + 1, "type": event_type, "data": data})
+
+    async def get_events(self, job_id: str, after_id: int = 0) -> List[Dict]:
+        return self._events.get(job_id, [])[after_id:]
+
+class SQLiteJobStore(JobStore):
+    """
+    Almacén en un fichero SQLite, compartible entre procesos de la misma máquina.
+    
+    Las consultas son síncronas, así que se ejecutan en un hilo (una a la vez
+    sobre la conexión compartida) para no bloquear el event loop.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl_seconds: Optional[int] = None):
+        super().__init__(ttl_seconds)
+        self.db_path = db_path or settings.JOB_STORE_PATH
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS analysis_jobs (
+                job_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )"""
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS analysis_queue (
+                job_id TEXT PRIMARY KEY,
+                priority INTEGER NOT NULL,
+                enqueued_at REAL NOT NULL
+            )"""
+        )
+        # Trabajos tomados por un worker; expires_at es NULL cuando el
+        # trabajo ha vuelto a la cola y solo se conserva su número de intentos
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS analysis_leases (
+                job_id TEXT PRIMARY KEY,
+                priority INTEGER NOT NULL,
+                expires_at REAL,
+                attempts INTEGER NOT NULL
+            )"""
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS analysis_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                event_type TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_events_job ON analysis_events (job_id, id)"
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS analysis_artifacts (
+                job_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (job_id, kind, key)
+            )"""
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_artifacts_version ON analysis_artifacts (job_id, kind, version)"
+        )
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS analysis_fingerprints (
+                fingerprint TEXT PRIMARY KEY,
+                job_id TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )"""
+        )
+        self._db.commit()
+
+    async def _run(self, function: Callable, *args) -> Any:
+        """Ejecuta una operación síncrona sobre la base en un hilo"""
+        return await asyncio.to_thread(self._locked, function, *args)
+
+    def _locked(self, function: Callable, *args) -> Any:
+        with self._lock:
+            return function(*args)
+
+    async def create(self, job_id: str, data: Dict):
+        await self._run(self._create, job_id, data)
+
+    def _create(self, job_id: str, data: Dict):
+        for table in ("analysis_events", "analysis_artifacts"):
+            self._db.execute(
+                f"DELETE FROM {table} WHERE job_id IN "
+                "(SELECT job_id FROM analysis_jobs WHERE expires_at <= ?)",
+                (time.time(),)
+            )
+        self._db.execute("DELETE FROM analysis_jobs WHERE expires_at <= ?", (time.time(),))
+        self._db.execute(
+            "INSERT OR REPLACE INTO analysis_jobs (job_id, data, expires_at) VALUES (?, ?, ?)",
+            (job_id, _dumps(data), time.time() + self.ttl_seconds)
+        )
+        self._db.commit()
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        return await self._run(self._get, job_id)
+
+    def _get(self, job_id: str) -> Optional[Dict]:
+        row = self._db.execute(
+            "SELECT data FROM analysis_jobs WHERE job_id = ? AND expires_at > ?",
+            (job_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def update(self, job_id: str, fields: Dict):
+        await self._run(self._update, job_id, fields)
+
+    def _update(self, job_id: str, fields: Dict):
+        # La transacción inmediata evita perder campos con escritores concurrentes
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            row = self._db.execute(
+                "SELECT data FROM analysis_jobs WHERE job_id = ?",
+                (job_id,)
+            ).fetchone()
+            if row is None:
+                return
+            data = json.loads(row[0])
+            data.update(fields)
+            self._db.execute(
+                "UPDATE analysis_jobs SET data = ?, expires_at = ? WHERE job_id = ?",
+                (_dumps(data), time.time() + self.ttl_seconds, job_id)
+            )
+
+    async def delete(self, job_id: str):
+        await self._run(self._delete, job_id)
+
+    def _delete(self, job_id: str):
+        self._db.execute("DELETE FROM analysis_jobs WHERE job_id = ?", (job_id,))
+        self._db.execute("DELETE FROM analysis_leases WHERE job_id = ?", (job_id,))
+        self._db.execute("DELETE FROM analysis_artifacts WHERE job_id = ?", (job_id,))
+        self._db.execute("DELETE FROM analysis_events WHERE job_id = ?", (job_id,))
+        self._db.commit()
+
+    async def put_artifacts(self, job_id: str, kind: str, items: Dict[str, Any], version: int = 0):
+        await self._run(self._put_artifacts, job_id, kind, items, version)
+
+    def _put_artifacts(self, job_id: str, kind: str, items: Dict[str, Any], version: int):
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO analysis_artifacts (job_id, kind, key, version, data) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, kind, key, version, _dumps(data)) for key, data in items.items()]
+            )
+
+    async def get_artifact(self, job_id: str, kind: str, key: str) -> Optional[Any]:
+        return await self._run(self._get_artifact, job_id, kind, key)
+
+    def _get_artifact(self, job_id: str, kind: str, key: str) -> Optional[Any]:
+        row = self._db.execute(
+            "SELECT data FROM analysis_artifacts WHERE job_id = ? AND kind = ? AND key = ?",
+            (job_id, kind, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def list_artifacts(self, job_id: str, kind: str, since_version: int = 0) -> List[Any]:
+        return await self._run(self._list_artifacts, job_id, kind, since_version)
+
+    def _list_artifacts(self, job_id: str, kind: str, since_version: int) -> List[Any]:
+        rows = self._db.execute(
+            "SELECT data FROM analysis_artifacts WHERE job_id = ? AND kind = ? AND version > ? "
+            "ORDER BY version, rowid",
+            (job_id, kind, since_version)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    async def enqueue(self, job_id: str, priority: int = 0):
+        await self._run(self._enqueue, job_id, priority)
+
+    def _enqueue(self, job_id: str, priority: int):
+        self._db.execute(
+            "INSERT OR REPLACE INTO analysis_queue (job_id, priority, enqueued_at) VALUES (?, ?, ?)",
+            (job_id, priority, time.time())
+        )
+        self._db.commit()
+
+    async def dequeue(self, lease_seconds: Optional[int] = None) -> Optional[str]:
+        job_id, abandoned = await self._run(self._dequeue, lease_seconds or self.lease_seconds)
+        await self._fail_abandoned(abandoned)
+        return job_id
+
+    def _dequeue(self, lease_seconds: int) -> Tuple[Optional[str], List[str]]:
+        now = time.time()
+        # La transacción inmediata garantiza que cada trabajo lo toma un solo worker
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            
+            # Devolver a la cola los trabajos cuyo worker dejó de renovar la concesión
+            expired = self._db.execute(
+                "SELECT job_id, priority, attempts FROM analysis_leases WHERE expires_at <= ?",
+                (now,)
+            ).fetchall()
+            abandoned = []
+            for job_id, priority, attempts in expired:
+                if attempts >= self.max_attempts:
+                    self._db.execute("DELETE FROM analysis_leases WHERE job_id = ?", (job_id,))
+                    abandoned.append(job_id)
+                else:
+                    self._db.execute(
+                        "UPDATE analysis_leases SET expires_at = NULL WHERE job_id = ?",
+                        (job_id,)
+                    )
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO analysis_queue (job_id, priority, enqueued_at) VALUES (?, ?, ?)",
+                        (job_id, priority, now)
+                    )
+            
+            row = self._db.execute(
+                "SELECT job_id, priority FROM analysis_queue ORDER BY priority DESC, enqueued_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None, abandoned
+            job_id, priority = row
+            self._db.execute("DELETE FROM analysis_queue WHERE job_id = ?", (job_id,))
+            self._db.execute(
+                """INSERT INTO analysis_leases (job_id, priority, expires_at, attempts)
+                   VALUES (?, ?, ?, 1)
+                   ON CONFLICT (job_id) DO UPDATE SET
+                       expires_at = excluded.expires_at,
+                       attempts = analysis_leases.attempts + 1""",
+                (job_id, priority, now + lease_seconds)
+            )
+            return job_id, abandoned
+
+    async def renew_lease(self, job_id: str, lease_seconds: Optional[int] = None) -> bool:
+        return await self._run(self._renew_lease, job_id, lease_seconds or self.lease_seconds)
+
+    def _renew_lease(self, job_id: str, lease_seconds: int) -> bool:
+        cursor = self._db.execute(
+            "UPDATE analysis_leases SET expires_at = ? WHERE job_id = ? AND expires_at IS NOT NULL",
+            (time.time() + lease_seconds, job_id)
+        )
+        self._db.commit()
+        return cursor.rowcount > 0
+
+    async def release(self, job_id: str):
+        await self._run(self._release, job_id)
+
+    def _release(self, job_id: str):
+        self._db.execute("DELETE FROM analysis_leases WHERE job_id = ?", (job_id,))
+        self._db.commit()
+
+    async def remove_from_queue(self, job_id: str) -> bool:
+        return await self._run(self._remove_from_queue, job_id)
+
+    def _remove_from_queue(self, job_id: str) -> bool:
+        cursor = self._db.execute("DELETE FROM analysis_queue WHERE job_id = ?", (job_id,))
+        if cursor.rowcount > 0:
+            self._db.execute("DELETE FROM analysis_leases WHERE job_id = ?", (job_id,))
+        self._db.commit()
+        return cursor.rowcount > 0
+
+    async def set_fingerprint(self, fingerprint: str, job_id: str, ttl_seconds: int):
+        await self._run(self._set_fingerprint, fingerprint, job_id, ttl_seconds)
+
+    def _set_fingerprint(self, fingerprint: str, job_id: str, ttl_seconds: int):
+        self._db.execute("DELETE FROM analysis_fingerprints WHERE expires_at <= ?", (time.time(),))
+        self._db.execute(
+            "INSERT OR REPLACE INTO analysis_fingerprints (fingerprint, job_id, expires_at) VALUES (?, ?, ?)",
+            (fingerprint, job_id, time.time() + ttl_seconds)
+        )
+        self._db.commit()
+
+    async def claim_fingerprint(
+        self,
+        fingerprint: str,
+        job_id: str,
+        ttl_seconds: int,
+        replace: Optional[str] = None
+    ) -> str:
+        return await self._run(self._claim_fingerprint, fingerprint, job_id, ttl_seconds, replace)
+
+    def _claim_fingerprint(
+        self,
+        fingerprint: str,
+        job_id: str,
+        ttl_seconds: int,
+        replace: Optional[str]
+    ) -> str:
+        # La transacción inmediata bloquea a otros procesos entre la lectura y la escritura
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            owner = self._get_fingerprint(fingerprint)
+            if owner is not None and owner != replace:
+                return owner
+            self._db.execute(
+                "INSERT OR REPLACE INTO analysis_fingerprints (fingerprint, job_id, expires_at) VALUES (?, ?, ?)",
+                (fingerprint, job_id, time.time() + ttl_seconds)
+            )
+            return job_id
+
+    async def get_fingerprint(self, fingerprint: str) -> Optional[str]:
+        return await self._run(self._get_fingerprint, fingerprint)
+
+    def _get_fingerprint(self, fingerprint: str) -> Optional[str]:
+        row = self._db.execute(
+            "SELECT job_id FROM analysis_fingerprints WHERE fingerprint = ? AND expires_at > ?",
+            (fingerprint, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    async def publish_event(self, job_id: str, event_type: str, data: Dict):
+        await self._run(self._publish_event, job_id, event_type, data)
+
+    def _publish_event(self, job_id: str, event_type: str, data: Dict):
+        self._db.execute(
+            "INSERT INTO analysis_events (job_id, event_type, data, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, event_type, _dumps(data), time.time())
+        )
+        self._db.commit()
+
+    async def get_events(self, job_id: str, after_id: int = 0) -> List[Dict]:
+        return await self._run(self._get_events, job_id, after_id)
+
+    def _get_events(self, job_id: str, after_id: int) -> List[Dict]:
+        rows = self._db.execute(
+            "SELECT id, event_type, data FROM analysis_events WHERE job_id = ? AND id > ? ORDER BY id",
+            (job_id, after_id)
+        ).fetchall()
+        return [{"id": row[0], "type": row[1], "data": json.loads(row[2])} for row in rows]
+
+# Escribe los campos (pares en ARGV[2..]) solo si el trabajo existe y
+# renueva su TTL (ARGV[1]), en una sola operación atómica
+UPDATE_IF_EXISTS_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+# Devuelve a la cola (KEYS[1]) los trabajos con la concesión (KEYS[2])
+# expirada, o los descarta si agotaron sus intentos (KEYS[4]), y toma el
+# siguiente con una concesión nueva. ARGV: instante actual, duración de la
+# concesión e intentos máximos. Retorna {trabajo o "", trabajos abandonados}.
+DEQUEUE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+local abandoned = {}
+for _, job in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], job)
+    local attempts = tonumber(redis.call('HGET', KEYS[4], job) or '0')
+    if attempts >= tonumber(ARGV[3]) then
+        redis.call('HDEL', KEYS[3], job)
+        redis.call('HDEL', KEYS[4], job)
+        table.insert(abandoned, job)
+    else
+        local score = redis.call('HGET', KEYS[3], job) or ARGV[1]
+        redis.call('ZADD', KEYS[1], score, job)
+    end
+end
+local popped = redis.call('ZPOPMIN', KEYS[1])
+local job = ''
+if popped[1] then
+    job = popped[1]
+    redis.call('ZADD', KEYS[2], tonumber(ARGV[1]) + tonumber(ARGV[2]), job)
+    redis.call('HINCRBY', KEYS[4], job, 1)
+end
+return {job, abandoned}
+"""
+
+# Asocia la huella (KEYS[1]) al trabajo ARGV[1] si no tiene dueño o si su
+# dueño es ARGV[2], con expiración ARGV[3]. Retorna el dueño resultante.
+CLAIM_FINGERPRINT_SCRIPT = """
+local owner = redis.call('GET', KEYS[1])
+if owner and owner ~= ARGV[2] then return owner end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return ARGV[1]
+"""
+
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+class RedisJobStore(JobStore):
+    """
+    Almacén en Redis (o cualquier servidor compatible), compartible entre
+    workers y máquinas. Acepta un cliente ya creado para poder usar un
+    sustituto local.
+    
+    Cada trabajo es un hash con un campo (JSON) por clave del dict, de modo
+    que las actualizaciones escriben solo sus campos de forma atómica y no
+    pisan los que escribe a la vez otro proceso (p. ej. `cancel_requested`).
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        ttl_seconds: Optional[int] = None,
+        client: Any = None
+    ):
+        super().__init__(ttl_seconds)
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url or settings.REDIS_URL)
+        self._redis = client
+        self.prefix = settings.JOB_KEY_PREFIX
+        self._update_script = self._redis.register_script(UPDATE_IF_EXISTS_SCRIPT)
+        self._dequeue_script = self._redis.register_script(DEQUEUE_SCRIPT)
+        self._claim_script = self._redis.register_script(CLAIM_FINGERPRINT_SCRIPT)
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.prefix}{job_id}"
+
+    @property
+    def _queue_key(self) -> str:
+        return f"{self.prefix}queue"
+
+    @property
+    def _lease_keys(self) -> List[str]:
+        """Concesiones (zset por expiración), puntuación original en la cola e intentos"""
+        return [f"{self.prefix}leases", f"{self.prefix}queue_scores", f"{self.prefix}attempts"]
+
+    @staticmethod
+    def _encode_fields(fields: Dict) -> Dict[str, str]:
+        return {key: _dumps(value) for key, value in fields.items()}
+
+    async def create(self, job_id: str, data: Dict):
+        key = self._key(job_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping=self._encode_fields(data))
+            pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        raw = await self._redis.hgetall(self._key(job_id))
+        if not raw:
+            return None
+        return {
+            (field.decode() if isinstance(field, bytes) else field): json.loads(value)
+            for field, value in raw.items()
+        }
+
+    async def update(self, job_id: str, fields: Dict):
+        if not fields:
+            return
+        args = [self.ttl_seconds]
+        for field, value in self._encode_fields(fields).items():
+            args.extend((field, value))
+        await self._update_script(keys=[self._key(job_id)], args=args)
+
+    async def delete(self, job_id: str):
+        kinds = await self._redis.smembers(self._artifact_kinds_key(job_id))
+        await self._redis.delete(
+            self._key(job_id),
+            self._events_key(job_id),
+            self._artifact_kinds_key(job_id),
+            *(self._artifacts_key(job_id, _decode(kind)) for kind in kinds)
+        )
+
+    def _events_key(self, job_id: str) -> str:
+        return f"{self.prefix}{job_id}:events"
+
+    def _artifacts_key(self, job_id: str, kind: str) -> str:
+        return f"{self.prefix}{job_id}:artifacts:{kind}"
+
+    def _artifact_kinds_key(self, job_id: str) -> str:
+        return f"{self.prefix}{job_id}:artifact_kinds"
+
+    async def put_artifacts(self, job_id: str, kind: str, items: Dict[str, Any], version: int = 0):
+        # Un hash por tipo; cada campo guarda la versión junto a los datos
+        if not items:
+            return
+        key = self._artifacts_key(job_id, kind)
+        kinds_key = self._artifact_kinds_key(job_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={
+                item_key: _dumps({"version": version, "data": data})
+                for item_key, data in items.items()
+            })
+            pipe.expire(key, self.ttl_seconds)
+            pipe.sadd(kinds_key, kind)
+            pipe.expire(kinds_key, self.ttl_seconds)
+            await pipe.execute()
+
+    async def get_artifact(self, job_id: str, kind: str, key: str) -> Optional[Any]:
+        raw = await self._redis.hget(self._artifacts_key(job_id, kind), key)
+        return json.loads(raw)["data"] if raw is not None else None
+
+    async def list_artifacts(self, job_id: str, kind: str, since_version: int = 0) -> List[Any]:
+        raw = await self._redis.hgetall(self._artifacts_key(job_id, kind))
+        entries = sorted(
+            (json.loads(value) for value in raw.values()),
+            key=lambda entry: entry["version"]
+        )
+        return [entry["data"] for entry in entries if entry["version"] > since_version]
+
+    async def enqueue(self, job_id: str, priority: int = 0):
+        # Puntuación menor = antes: la prioridad domina y el instante desempata
+        score = -priority * 1e10 + time.time()
+        leases, scores, _ = self._lease_keys
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(self._queue_key, {job_id: score})
+            pipe.hset(scores, job_id, score)
+            await pipe.execute()
+
+    async def dequeue(self, lease_seconds: Optional[int] = None) -> Optional[str]:
+        job_id, abandoned = await self._dequeue_script(
+            keys=[self._queue_key] + self._lease_keys,
+            args=[time.time(), lease_seconds or self.lease_seconds, self.max_attempts]
+        )
+        await self._fail_abandoned([_decode(item) for item in abandoned])
+        return _decode(job_id) or None
+
+    async def renew_lease(self, job_id: str, lease_seconds: Optional[int] = None) -> bool:
+        leases, _, _ = self._lease_keys
+        expires_at = time.time() + (lease_seconds or self.lease_seconds)
+        # XX: solo si la concesión sigue existiendo; CH: cuenta las actualizadas
+        return bool(await self._redis.zadd(leases, {job_id: expires_at}, xx=True, ch=True))
+
+    async def release(self, job_id: str):
+        leases, scores, attempts = self._lease_keys
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(leases, job_id)
+            pipe.hdel(scores, job_id)
+            pipe.hdel(attempts, job_id)
+            await pipe.execute()
+
+    async def remove_from_queue(self, job_id: str) -> bool:
+        removed = bool(await self._redis.zrem(self._queue_key, job_id))
+        if removed:
+            _, scores, attempts = self._lease_keys
+            await self._redis.hdel(scores, job_id)
+            await self._redis.hdel(attempts, job_id)
+        return removed
+
+    async def set_fingerprint(self, fingerprint: str, job_id: str, ttl_seconds: int):
+        await self._redis.set(f"{self.prefix}fingerprint:{fingerprint}", job_id, ex=ttl_seconds)
+
+    async def claim_fingerprint(
+        self,
+        fingerprint: str,
+        job_id: str,
+        ttl_seconds: int,
+        replace: Optional[str] = None
+    ) -> str:
+        owner = await self._claim_script(
+            keys=[f"{self.prefix}fingerprint:{fingerprint}"],
+            args=[job_id, replace or "", ttl_seconds]
+        )
+        return _decode(owner)
+
+    async def get_fingerprint(self, fingerprint: str) -> Optional[str]:
+        job_id = await self._redis.get(f"{self.prefix}fingerprint:{fingerprint}")
+        if job_id is None:
+            return None
+        return _decode(job_id)
+
+    async def publish_event(self, job_id: str, event_type: str, data: Dict):
+        key = self._events_key(job_id)
+        await self._redis.rpush(key, _dumps({"type": event_type, "data": data}))
+        await self._redis.expire(key, self.ttl_seconds)
+
+    async def get_events(self, job_id: str, after_id: int = 0) -> List[Dict]:
+        # El id de cada evento es su posición (1-based) en la lista
+        raw_events = await self._redis.lrange(self._events_key(job_id), after_id, -1)
+        events = []
+        for offset, raw in enumerate(raw_events):
+            event = json.loads(raw)
+            events.append({"id": after_id + offset + 1, "type": event["type"], "data": event["data"]})
+        return events
+
+def create_job_store(backend: Optional[str] = None) -> JobStore:
+    """Crea el almacén de trabajos configurado en JOB_STORE_BACKEND"""
+    backend = (backend or settings.JOB_STORE_BACKEND).lower()
+    if backend == "memory":
+        return InMemoryJobStore()
+    if backend == "sqlite":
+        return SQLiteJobStore()
+    if backend == "redis":
+        return RedisJobStore()
+    raise ValueError(f"Backend de trabajos no soportado: {backend}")
@@ -1,9 +1,11 @@
 import openai
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
 from ..config import settings
 from ..models import AIAnalysis, WalletStats
+from .http_client import http_client
+from .rate_limiter import rate_limiter, RetryableError, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +17,45 @@ class OpenAIService:
         self.max_tokens = settings.MAX_TOKENS
         self.temperature = settings.TEMPERATURE
 
+    async def _chat_completion(self, messages: List[Dict]):
+        """
+        Llama a la API de chat de OpenAI reutilizando la sesión HTTP compartida,
+        con límite de tasa y reintentos ante errores transitorios.
+        """
+        openai.aiosession.set(await http_client.ensure_session())
+        return await rate_limiter.call(
+            "openai",
+            self.api_key,
+            lambda: openai.ChatCompletion.acreate(
+                model=self.model,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature
+            ),
+            self._classify_openai_error
+        )
+
+    @staticmethod
+    def _classify_openai_error(error: Exception) -> Optional[RetryableError]:
+        """Decide si un error de OpenAI es transitorio"""
+        if isinstance(error, openai.error.RateLimitError):
+            headers = getattr(error, "headers", None) or {}
+            return RetryableError(
+                str(error),
+                retry_after=parse_retry_after(headers.get("Retry-After")),
+                throttled=True
+            )
+        if isinstance(error, (
+            openai.error.APIConnectionError,
+            openai.error.ServiceUnavailableError,
+            openai.error.Timeout,
+            openai.error.TryAgain
+        )):
+            return RetryableError(str(error))
+        if isinstance(error, openai.error.APIError) and (error.http_status or 0) >= 500:
+            return RetryableError(str(error))
+        return None
+
     async def analyze_wallet_patterns(
         self,
         wallet_stats: WalletStats,
@@ -35,15 +76,10 @@ class OpenAIService:
             prompt = self._create_analysis_prompt(wallet_stats, known_patterns)
             
             # Realizar la llamada a GPT-4
-            response = await openai.ChatCompletion.acreate(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt()},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=self.max_tokens,
-                temperature=self.temperature
-            )
+            response = await self._chat_completion([
+                {"role": "system", "content": self._get_system_prompt()},
+                {"role": "user", "content": prompt}
+            ])
             
             # Procesar y estructurar la respuesta
             analysis = self._process_gpt_response(
@@ -84,15 +120,10 @@ class OpenAIService:
             prompt = self._create_relationship_prompt(wallets_data, transaction_graph)
             
             # Realizar la llamada a GPT-4
-            response = await openai.ChatCompletion.acreate(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._get_relationship_system_prompt()},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=self.max_tokens,
-                temperature=self.temperature
-            )
+            response = await self._chat_completion([
+                {"role": "system", "content": self._get_relationship_system_prompt()},
+                {"role": "user", "content": prompt}
+            ])
             
             # Procesar y estructurar la respuesta
             relationships = self._process_relationship_response(
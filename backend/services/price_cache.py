@@ -0,0 +1,169 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime, timezone
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Clave de caché: (blockchain, dirección del token o "native", inicio del bucket en epoch)
+PriceKey = Tuple[str, str, int]
+
+NATIVE_TOKEN_KEY = "native"
+
+class PriceCache:
+    """
+    Precios históricos por (token, bucket) en una caché LRU en memoria con,
+    opcionalmente, un nivel persistente en SQLite compartible entre procesos.
+
+    Las lecturas y escrituras en disco se hacen por lotes (una por
+    resolución de precios) en un hilo, serializadas con un lock sobre la
+    conexión compartida, para no bloquear el event loop.
+    """
+    def __init__(
+        self,
+        bucket_seconds: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        db_path: Optional[str] = None
+    ):
+        self.bucket_seconds = bucket_seconds or settings.PRICE_CACHE_BUCKET_SECONDS
+        self.max_entries = max_entries or settings.PRICE_CACHE_MAX_ENTRIES
+        self.db_path = settings.PRICE_CACHE_DB_PATH if db_path is None else db_path
+        self._entries: "OrderedDict[PriceKey, float]" = OrderedDict()
+        self._db = None
+        self._lock = threading.Lock()
+        
+        if self.db_path:
+            self._initialize_db()
+
+    def _initialize_db(self):
+        """Abre (o crea) la base SQLite que persiste los precios entre reinicios"""
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Los workers comparten el fichero: WAL y espera ante bloqueos
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS token_prices (
+                    blockchain TEXT NOT NULL,
+                    token TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    usd_price REAL NOT NULL,
+                    PRIMARY KEY (blockchain, token, bucket)
+                )"""
+            )
+            self._db.commit()
+            logger.info(f"Caché de precios persistente en {self.db_path}")
+        except Exception as e:
+            logger.error(f"Error inicializando caché de precios en disco: {str(e)}")
+            self._db = None
+
+    def make_key(
+        self,
+        blockchain: str,
+        token_address: Optional[str],
+        timestamp: datetime
+    ) -> PriceKey:
+        """Construye la clave de caché agrupando el timestamp en su bucket"""
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        epoch = int(timestamp.timestamp())
+        bucket = epoch - (epoch % self.bucket_seconds)
+        token = token_address.lower() if token_address else NATIVE_TOKEN_KEY
+        return (blockchain, token, bucket)
+
+    @staticmethod
+    def bucket_start(key: PriceKey) -> datetime:
+        """Retorna el inicio del bucket de una clave como datetime UTC"""
+        return datetime.fromtimestamp(key[2], tz=timezone.utc)
+
+    async def _run(self, function: Callable, *args) -> Any:
+        """Ejecuta una operación síncrona sobre la base en un hilo"""
+        return await asyncio.to_thread(self._locked, function, *args)
+
+    def _locked(self, function: Callable, *args) -> Any:
+        with self._lock:
+            return function(*args)
+
+    async def get(self, key: PriceKey) -> Optional[float]:
+        """Retorna el precio cacheado o None si no existe"""
+        return (await self.get_many([key])).get(key)
+
+    async def get_many(self, keys: Iterable[PriceKey]) -> Dict[PriceKey, float]:
+        """
+        Retorna los precios cacheados de varias claves; las que no están en
+        memoria se buscan en disco con una sola operación
+        """
+        prices = {}
+        missing = []
+        for key in keys:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                prices[key] = self._entries[key]
+            else:
+                missing.append(key)
+        
+        if missing and self._db is not None:
+            try:
+                stored = await self._run(self._load, missing)
+            except Exception as e:
+                logger.error(f"Error leyendo caché de precios: {str(e)}")
+                stored = {}
+            for key, price in stored.items():
+                self._remember(key, price)
+            prices.update(stored)
+        
+        return prices
+
+    def _load(self, keys: List[PriceKey]) -> Dict[PriceKey, float]:
+        prices = {}
+        for key in keys:
+            row = self._db.execute(
+                "SELECT usd_price FROM token_prices WHERE blockchain = ? AND token = ? AND bucket = ?",
+                key
+            ).fetchone()
+            if row is not None:
+                prices[key] = row[0]
+        return prices
+
+    async def set(self, key: PriceKey, price: float):
+        """Guarda un precio en memoria y, si está configurado, en disco"""
+        await self.set_many({key: price})
+
+    async def set_many(self, prices: Dict[PriceKey, float]):
+        """
+        Guarda varios precios en memoria y, si está configurado, en disco con
+        una sola transacción. La memoria se actualiza antes de la primera
+        espera, así que el precio es visible de inmediato para el event loop.
+        """
+        for key, price in prices.items():
+            self._remember(key, price)
+        
+        if prices and self._db is not None:
+            try:
+                await self._run(self._store, list(prices.items()))
+            except Exception as e:
+                logger.error(f"Error guardando precios en caché: {str(e)}")
+
+    def _store(self, items: List[Tuple[PriceKey, float]]):
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO token_prices (blockchain, token, bucket, usd_price) VALUES (?, ?, ?, ?)",
+                [(*key, price) for key, price in items]
+            )
+
+    def _remember(self, key: PriceKey, price: float):
+        """Inserta en la caché en memoria aplicando expulsión LRU"""
+        self._entries[key] = price
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
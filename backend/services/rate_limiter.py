@@ -0,0 +1,182 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+class RetryableError(Exception):
+    """Error transitorio de una API externa que merece reintento"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None, throttled: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.throttled = throttled
+
+class TokenBucket:
+    """
+    Token bucket con tasa adaptativa.
+    
+    Ante un 429 la tasa se reduce a la mitad y el bucket se pausa durante el
+    Retry-After indicado; cada respuesta correcta la recupera de forma aditiva
+    hasta la tasa configurada (AIMD).
+    
+    El bucket vive en la memoria del proceso: la API y cada worker tienen el
+    suyo, así que con N procesos la tasa agregada puede llegar a N veces la
+    configurada. En ese despliegue hay que repartir la cuota en
+    MORALIS_RATE_LIMIT / OPENAI_RATE_LIMIT (ver README); el AIMD frena a
+    todos en cuanto el proveedor responde 429.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.max_rate = rate
+        self.min_rate = rate * settings.RATE_LIMIT_MIN_FACTOR
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self):
+        """Espera hasta disponer de un token"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def throttle(self, retry_after: Optional[float] = None):
+        """Reduce la tasa tras un 429 y pausa el bucket si hay Retry-After"""
+        now = time.monotonic()
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        self.updated = now
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+
+    def record_success(self):
+        """Recupera gradualmente la tasa tras una respuesta correcta"""
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * settings.RATE_LIMIT_RECOVERY_STEP)
+
+class RateLimiter:
+    def __init__(self):
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"requests": 0, "throttled": 0, "retries": 0, "failures": 0}
+        )
+
+    @staticmethod
+    def _bucket_key(provider: str, api_key: str) -> str:
+        """Un bucket por proveedor y clave de API, sin exponer la clave"""
+        fingerprint = hashlib.sha256(api_key.encode()).hexdigest()[:8] if api_key else "default"
+        return f"{provider}:{fingerprint}"
+
+    def _get_bucket(self, key: str, provider: str) -> TokenBucket:
+        if key not in self.buckets:
+            rate, burst = settings.RATE_LIMITS.get(provider, settings.RATE_LIMITS["default"])
+            self.buckets[key] = TokenBucket(rate, burst)
+        return self.buckets[key]
+
+    async def call(
+        self,
+        provider: str,
+        api_key: str,
+        request: Callable[[], Awaitable[Any]],
+        classify_error: Callable[[Exception], Optional[RetryableError]]
+    ) -> Any:
+        """
+        Ejecuta una petición respetando el límite de tasa y reintentando los
+        errores transitorios con backoff exponencial con jitter.
+        
+        Args:
+            provider: Nombre del proveedor ("moralis", "openai", ...)
+            api_key: Clave de API usada en la petición
+            request: Fábrica de la corrutina a ejecutar (se invoca en cada intento)
+            classify_error: Convierte una excepción en RetryableError, o None si
+                no debe reintentarse
+            
+        Raises:
+            La última excepción si se agotan los reintentos
+        """
+        key = self._bucket_key(provider, api_key)
+        bucket = self._get_bucket(key, provider)
+        stats = self.stats[key]
+        
+        for attempt in range(settings.UPSTREAM_MAX_RETRIES + 1):
+            await bucket.acquire()
+            stats["requests"] += 1
+            try:
+                result = await request()
+                bucket.record_success()
+                return result
+            except Exception as e:
+                retryable = classify_error(e)
+                if retryable is None or attempt == settings.UPSTREAM_MAX_RETRIES:
+                    stats["failures"] += 1
+                    raise
+                
+                if retryable.throttled:
+                    stats["throttled"] += 1
+                    bucket.throttle(retryable.retry_after)
+                
+                stats["retries"] += 1
+                delay = min(
+                    settings.UPSTREAM_RETRY_MAX_DELAY,
+                    settings.UPSTREAM_RETRY_BASE_DELAY * (2 ** attempt)
+                )
+                delay = random.uniform(delay / 2, delay)
+                logger.warning(
+                    f"Reintentando {provider} en {delay:.2f}s "
+                    f"(intento {attempt + 1}/{settings.UPSTREAM_MAX_RETRIES}): {str(e)}"
+                )
+                await asyncio.sleep(delay)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Contadores por proveedor/clave y tasa actual de cada bucket"""
+        return {
+            key: dict(self.stats[key], current_rate=round(bucket.rate, 3))
+            for key, bucket in self.buckets.items()
+        }
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Interpreta la cabecera Retry-After, expresada en segundos o como fecha
+    HTTP (p. ej. 'Wed, 21 Oct 2015 07:28:00 GMT'), y retorna los segundos
+    de espera.
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+rate_limiter = RateLimiter()
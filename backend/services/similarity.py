@@ -0,0 +1,207 @@
+from typing import Dict, Iterable, List, Optional
+from functools import lru_cache
+import hashlib
+import logging
+import numpy as np
+from scipy import sparse
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Pesos de cada componente, los mismos que utils.calculate_similarity_score
+SIMILARITY_WEIGHTS = {
+    "time_pattern": 0.3,
+    "contract_overlap": 0.3,
+    "value_pattern": 0.2,
+    "token_overlap": 0.2
+}
+
+# Filas por bloque en el cálculo exacto; acota la memoria a bloque x n
+BLOCK_SIZE = 256
+
+class WalletFeatures:
+    """
+    Vectores de características de un conjunto de wallets, construidos una
+    sola vez para comparar todos los pares con operaciones matriciales:
+    histograma de 24 horas, contratos y tokens como vectores indicadores
+    dispersos y volumen enviado.
+    """
+    def __init__(
+        self,
+        hours: np.ndarray,
+        values: np.ndarray,
+        contracts: sparse.csr_matrix,
+        tokens: sparse.csr_matrix
+    ):
+        self.hours = hours
+        self.values = values
+        self.contracts = contracts
+        self.tokens = tokens
+        self.contract_sizes = np.asarray(contracts.sum(axis=1)).ravel()
+        self.token_sizes = np.asarray(tokens.sum(axis=1)).ravel()
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @classmethod
+    def from_profiles(cls, profiles: List[Dict]) -> "WalletFeatures":
+        """
+        Construye las características a partir de dicts con las claves que usa
+        calculate_similarity_score (interaction_hours, most_frequent_contracts,
+        total_sent_usd, unique_tokens).
+        """
+        hours = np.zeros((len(profiles), 24), dtype=np.float64)
+        for i, profile in enumerate(profiles):
+            for hour, count in (profile.get("interaction_hours") or {}).items():
+                hours[i, int(hour)] = count
+
+        values = np.fromiter(
+            (profile.get("total_sent_usd") or 0.0 for profile in profiles),
+            dtype=np.float64,
+            count=len(profiles)
+        )
+        contracts = indicator_matrix(
+            profile.get("most_frequent_contracts") or [] for profile in profiles
+        )
+        tokens = indicator_matrix(
+            (token["address"] for token in profile.get("unique_tokens") or [])
+            for profile in profiles
+        )
+        return cls(hours, values, contracts, tokens)
+
+def indicator_matrix(sets: Iterable[Iterable[str]]) -> sparse.csr_matrix:
+    """Matriz dispersa wallets x elementos con un 1 por pertenencia"""
+    vocabulary: Dict[str, int] = {}
+    indptr = [0]
+    indices: List[int] = []
+    for items in sets:
+        row = {vocabulary.setdefault(item, len(vocabulary)) for item in items}
+        indices.extend(row)
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.float64)
+    return sparse.csr_matrix(
+        (data, np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+        shape=(len(indptr) - 1, len(vocabulary))
+    )
+
+def _ratio(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """min/max elemento a elemento, 0 donde alguno de los dos es 0"""
+    both = (a > 0) & (b > 0)
+    high = np.maximum(a, b)
+    return np.divide(np.minimum(a, b), high, out=np.zeros(np.broadcast(a, b).shape), where=both)
+
+def _jaccard(intersection: np.ndarray, sizes_a: np.ndarray, sizes_b: np.ndarray) -> np.ndarray:
+    union = sizes_a + sizes_b - intersection
+    valid = (sizes_a > 0) & (sizes_b > 0) & (union > 0)
+    return np.divide(intersection, union, out=np.zeros(union.shape), where=valid)
+
+def _combine(time, contract, value, token) -> np.ndarray:
+    score = (
+        time * SIMILARITY_WEIGHTS["time_pattern"]
+        + contract * SIMILARITY_WEIGHTS["contract_overlap"]
+        + value * SIMILARITY_WEIGHTS["value_pattern"]
+        + token * SIMILARITY_WEIGHTS["token_overlap"]
+    )
+    return np.clip(score, 0.0, 1.0)
+
+def similarity_block(features: WalletFeatures, rows: np.ndarray) -> np.ndarray:
+    """Scores de similitud de las wallets `rows` contra todas (len(rows) x n)"""
+    time = np.zeros((len(rows), len(features)))
+    for hour in range(24):
+        time += _ratio(features.hours[rows, hour][:, None], features.hours[None, :, hour])
+    time /= 24
+
+    contract = _jaccard(
+        (features.contracts[rows] @ features.contracts.T).toarray(),
+        features.contract_sizes[rows][:, None],
+        features.contract_sizes[None, :]
+    )
+    token = _jaccard(
+        (features.tokens[rows] @ features.tokens.T).toarray(),
+        features.token_sizes[rows][:, None],
+        features.token_sizes[None, :]
+    )
+    value = _ratio(features.values[rows][:, None], features.values[None, :])
+    return _combine(time, contract, value, token)
+
+def pair_similarity(features: WalletFeatures, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Scores de similitud de los pares (left[k], right[k])"""
+    time = _ratio(features.hours[left], features.hours[right]).sum(axis=1) / 24
+    contract = _jaccard(
+        np.asarray(features.contracts[left].multiply(features.contracts[right]).sum(axis=1)).ravel(),
+        features.contract_sizes[left],
+        features.contract_sizes[right]
+    )
+    token = _jaccard(
+        np.asarray(features.tokens[left].multiply(features.tokens[right]).sum(axis=1)).ravel(),
+        features.token_sizes[left],
+        features.token_sizes[right]
+    )
+    value = _ratio(features.values[left], features.values[right])
+    return _combine(time, contract, value, token)
+
+def mean_pairwise_similarity(
+    features: WalletFeatures,
+    exact_max: Optional[int] = None,
+    sample_pairs: Optional[int] = None,
+    seed: int = 0
+) -> float:
+    """
+    Similitud media entre todos los pares distintos de wallets.
+
+    Hasta `exact_max` wallets se calculan todos los pares por bloques de
+    filas. Por encima se estima con una muestra aleatoria (con semilla, para
+    que el resultado sea reproducible) de `sample_pairs` pares.
+    """
+    n = len(features)
+    if n < 2:
+        return 0.0
+
+    exact_max = settings.SIMILARITY_EXACT_MAX_WALLETS if exact_max is None else exact_max
+    sample_pairs = settings.SIMILARITY_SAMPLE_PAIRS if sample_pairs is None else sample_pairs
+
+    if n <= exact_max:
+        total = 0.0
+        for start in range(0, n, BLOCK_SIZE):
+            rows = np.arange(start, min(start + BLOCK_SIZE, n))
+            scores = similarity_block(features, rows)
+            # Solo el triángulo superior: cada par una vez, sin la diagonal
+            upper = np.arange(n)[None, :] > rows[:, None]
+            total += scores[upper].sum()
+        return float(total / (n * (n - 1) / 2))
+
+    rng = np.random.RandomState(seed)
+    left = rng.randint(0, n, size=sample_pairs)
+    # Desplazamiento no nulo para que nunca se compare una wallet consigo misma
+    right = (left + rng.randint(1, n, size=sample_pairs)) % n
+    return float(pair_similarity(features, left, right).mean())
+
+# MinHash: h(x) = (a * x + b) mod p con x de 32 bits, sin desbordar uint64
+MINHASH_PRIME = np.uint64((1 << 61) - 1)
+# Semilla fija: las firmas deben ser comparables entre procesos y ejecuciones
+MINHASH_SEED = 1744059119
+
+def stable_hash(item: str, digest_size: int = 4) -> int:
+    """Hash estable entre procesos (a diferencia de hash())"""
+    return int.from_bytes(hashlib.blake2b(item.encode(), digest_size=digest_size).digest(), "little")
+
+@lru_cache(maxsize=8)
+def _minhash_permutations(num_perm: int):
+    rng = np.random.RandomState(MINHASH_SEED)
+    a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    return a, b
+
+def minhash_signature(items: Iterable[str], num_perm: int) -> Optional[np.ndarray]:
+    """
+    Firma MinHash de un conjunto: la fracción de posiciones iguales entre
+    dos firmas estima la similitud de Jaccard de los conjuntos.
+
+    Returns:
+        Array uint64 de `num_perm` valores, o None si el conjunto está vacío
+    """
+    values = np.fromiter({stable_hash(item) for item in items}, dtype=np.uint64)
+    if len(values) == 0:
+        return None
+    a, b = _minhash_permutations(num_perm)
+    return ((a[:, None] * values[None, :] + b[:, None]) % MINHASH_PRIME).min(axis=1)
@@ -0,0 +1,224 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from ..config import settings
+from .similarity import WalletFeatures, minhash_signature, similarity_block, stable_hash
+
+logger = logging.getLogger(__name__)
+
+class SimilarityIndex:
+    """
+    Índice persistente de wallets analizadas para buscar las más parecidas
+    a una dada, entre todos los análisis.
+
+    Cada wallet se resume en un conjunto de rasgos (contratos, tokens, horas
+    de actividad dominantes y orden de magnitud del volumen) del que se
+    calcula una firma MinHash. La firma se divide en bandas (LSH): dos
+    wallets son candidatas si coinciden en alguna banda, lo que se resuelve
+    con búsquedas indexadas en SQLite sin recorrer el corpus. Los candidatos
+    se ordenan con el mismo score que calculate_similarity_score.
+
+    Las consultas se ejecutan en un hilo, serializadas con un lock sobre la
+    conexión compartida, para no bloquear el event loop.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = settings.SIMILARITY_INDEX_PATH if db_path is None else db_path
+        self.num_perm = settings.SIMILARITY_MINHASH_PERMUTATIONS
+        self.bands = settings.SIMILARITY_LSH_BANDS
+        self.rows_per_band = self.num_perm // self.bands
+        self._db = None
+        self._lock = threading.Lock()
+
+        if self.db_path:
+            self._initialize_db()
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    def _initialize_db(self):
+        """Abre (o crea) la base SQLite del índice"""
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS wallet_profiles (
+                    blockchain TEXT NOT NULL,
+                    address TEXT NOT NULL,
+                    profile TEXT NOT NULL,
+                    updated_at INTEGER NOT NULL,
+                    PRIMARY KEY (blockchain, address)
+                );
+                CREATE TABLE IF NOT EXISTS lsh_buckets (
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    blockchain TEXT NOT NULL,
+                    address TEXT NOT NULL,
+                    PRIMARY KEY (band, bucket, blockchain, address)
+                );
+                -- Búsqueda por dirección sin indicar la blockchain
+                CREATE INDEX IF NOT EXISTS idx_wallet_profiles_address
+                    ON wallet_profiles (address, updated_at);
+                CREATE INDEX IF NOT EXISTS idx_lsh_buckets_wallet
+                    ON lsh_buckets (blockchain, address);
+                """
+            )
+            self._db.commit()
+            logger.info(f"Índice de similitud en {self.db_path}")
+        except Exception as e:
+            logger.error(f"Error inicializando índice de similitud: {str(e)}")
+            self._db = None
+
+    async def _run(self, function: Callable, *args) -> Any:
+        """Ejecuta una operación síncrona sobre la base en un hilo"""
+        return await asyncio.to_thread(self._locked, function, *args)
+
+    def _locked(self, function: Callable, *args) -> Any:
+        with self._lock:
+            return function(*args)
+
+    @staticmethod
+    def _profile(stats: Dict) -> Dict:
+        """Solo los campos que intervienen en el score de similitud"""
+        return {
+            "interaction_hours": stats.get("interaction_hours") or {},
+            "most_frequent_contracts": stats.get("most_frequent_contracts") or [],
+            "total_sent_usd": stats.get("total_sent_usd") or 0.0,
+            "unique_tokens": [
+                {"address": token["address"]} for token in stats.get("unique_tokens") or []
+            ]
+        }
+
+    @staticmethod
+    def _shingles(profile: Dict) -> Set[str]:
+        """Conjunto de rasgos de la wallet sobre el que se calcula la firma"""
+        shingles = {f"c:{contract}" for contract in profile["most_frequent_contracts"]}
+        shingles.update(f"t:{token['address']}" for token in profile["unique_tokens"])
+
+        # Horas con actividad por encima de la media
+        hours = {int(hour): count for hour, count in profile["interaction_hours"].items()}
+        total = sum(hours.values())
+        if total:
+            shingles.update(f"h:{hour}" for hour, count in hours.items() if count * 24 > total)
+
+        if profile["total_sent_usd"] > 0:
+            shingles.add(f"v:{int(math.log10(profile['total_sent_usd'] + 1))}")
+        return shingles
+
+    def _buckets(self, signature: np.ndarray) -> List[Tuple[int, int]]:
+        """(banda, bucket) de cada banda de la firma"""
+        buckets = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows_per_band:(band + 1) * self.rows_per_band]
+            # Entero de 64 bits con signo, el rango de INTEGER en SQLite
+            bucket = stable_hash(chunk.tobytes().hex(), digest_size=8) - (1 << 63)
+            buckets.append((band, bucket))
+        return buckets
+
+    async def add_wallets(self, blockchain: str, wallets: Iterable[Dict]):
+        """Añade o actualiza en el índice las estadísticas de varias wallets"""
+        if not self.enabled:
+            return
+        await self._run(self._add_wallets, blockchain, list(wallets))
+
+    def _add_wallets(self, blockchain: str, wallets: List[Dict]):
+        now = int(time.time())
+        for stats in wallets:
+            address = stats["address"].lower()
+            profile = self._profile(stats)
+            signature = minhash_signature(self._shingles(profile), self.num_perm)
+
+            self._db.execute(
+                "DELETE FROM lsh_buckets WHERE blockchain = ? AND address = ?",
+                (blockchain, address)
+            )
+            self._db.execute(
+                """INSERT OR REPLACE INTO wallet_profiles (blockchain, address, profile, updated_at)
+                   VALUES (?, ?, ?, ?)""",
+                (blockchain, address, json.dumps(profile), now)
+            )
+            # Una wallet sin rasgos no tiene vecinos que buscar
+            if signature is not None:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO lsh_buckets (band, bucket, blockchain, address) VALUES (?, ?, ?, ?)",
+                    [(band, bucket, blockchain, address) for band, bucket in self._buckets(signature)]
+                )
+        self._db.commit()
+
+    async def find_similar(
+        self,
+        address: str,
+        blockchain: Optional[str] = None,
+        k: int = 10
+    ) -> Optional[List[Dict]]:
+        """
+        Busca las `k` wallets indexadas más parecidas a una dada.
+
+        Returns:
+            Lista de {address, blockchain, similarity_score} ordenada de mayor
+            a menor score, o None si la wallet no está en el índice
+        """
+        if not self.enabled:
+            return None
+        return await self._run(self._find_similar, address.lower(), blockchain, k)
+
+    def _find_similar(
+        self,
+        address: str,
+        blockchain: Optional[str],
+        k: int
+    ) -> Optional[List[Dict]]:
+        query = "SELECT blockchain, profile FROM wallet_profiles WHERE address = ?"
+        params: Tuple = (address,)
+        if blockchain:
+            query += " AND blockchain = ?"
+            params += (blockchain,)
+        row = self._db.execute(query + " ORDER BY updated_at DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        blockchain, profile = row[0], json.loads(row[1])
+
+        # Candidatos: wallets que comparten al menos un bucket
+        candidates = self._db.execute(
+            """SELECT p.blockchain, p.address, p.profile
+               FROM wallet_profiles p
+               WHERE (p.blockchain, p.address) IN (
+                   SELECT DISTINCT other.blockchain, other.address
+                   FROM lsh_buckets own
+                   JOIN lsh_buckets other
+                     ON other.band = own.band AND other.bucket = own.bucket
+                   WHERE own.blockchain = ? AND own.address = ?
+                     AND NOT (other.blockchain = own.blockchain AND other.address = own.address)
+                   LIMIT ?
+               )""",
+            (blockchain, address, settings.SIMILARITY_MAX_CANDIDATES)
+        ).fetchall()
+        if not candidates:
+            return []
+
+        # Ordenar los candidatos con el score exacto
+        features = WalletFeatures.from_profiles(
+            [profile] + [json.loads(candidate[2]) for candidate in candidates]
+        )
+        scores = similarity_block(features, np.array([0]))[0, 1:]
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [
+            {
+                "address": candidates[i][1],
+                "blockchain": candidates[i][0],
+                "similarity_score": float(scores[i])
+            }
+            for i in top
+        ]
@@ -0,0 +1,303 @@
+from typing import Any, AsyncIterator, Callable, List, Optional, Set, Tuple
+from datetime import datetime, timezone
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from ..config import settings
+from .compact_transaction import CompactTransaction
+
+logger = logging.getLogger(__name__)
+
+# Versión 2: montos exactos (value en unidades base como texto, USD en micro-dólares)
+# Versión 3: USD recortado a MAX_TRANSFER_USD por transferencia
+# Versión 4: hueco pendiente de las sincronizaciones truncadas (gap_until)
+SCHEMA_VERSION = 4
+
+class TransactionStore:
+    """
+    Historial normalizado de las wallets en SQLite. Las consultas se
+    ejecutan en un hilo, serializadas con un lock sobre la conexión
+    compartida, para no bloquear el event loop.
+    """
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = settings.TRANSACTION_STORE_PATH if db_path is None else db_path
+        self._db = None
+        self._lock = threading.Lock()
+        
+        if self.db_path:
+            self._initialize_db()
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    def _initialize_db(self):
+        """Abre (o crea) la base SQLite con las transacciones normalizadas"""
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            
+            # El almacén es una caché del historial remoto: si el esquema es de
+            # una versión anterior se descarta y se vuelve a sincronizar
+            version = self._db.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                self._db.executescript(
+                    """
+                    DROP TABLE IF EXISTS wallet_transactions;
+                    DROP TABLE IF EXISTS wallet_sync;
+                    """
+                )
+                self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS wallet_transactions (
+                    blockchain TEXT NOT NULL,
+                    wallet TEXT NOT NULL,
+                    tx_key TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    from_address TEXT NOT NULL,
+                    to_address TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    token_address TEXT,
+                    token_symbol TEXT,
+                    token_decimals INTEGER,
+                    usd_micros INTEGER NOT NULL,
+                    PRIMARY KEY (blockchain, wallet, tx_key)
+                );
+                CREATE INDEX IF NOT EXISTS idx_wallet_transactions_time
+                    ON wallet_transactions (blockchain, wallet, timestamp);
+                CREATE TABLE IF NOT EXISTS wallet_sync (
+                    blockchain TEXT NOT NULL,
+                    wallet TEXT NOT NULL,
+                    synced_from INTEGER NOT NULL,
+                    high_water_mark INTEGER NOT NULL,
+                    gap_until INTEGER,
+                    synced_at INTEGER NOT NULL,
+                    PRIMARY KEY (blockchain, wallet)
+                );
+                """
+            )
+            self._db.commit()
+            logger.info(f"Almacén de transacciones en {self.db_path}")
+        except Exception as e:
+            logger.error(f"Error inicializando almacén de transacciones: {str(e)}")
+            self._db = None
+
+    async def _run(self, function: Callable, *args) -> Any:
+        """Ejecuta una operación síncrona sobre la base en un hilo"""
+        return await asyncio.to_thread(self._locked, function, *args)
+
+    def _locked(self, function: Callable, *args) -> Any:
+        with self._lock:
+            return function(*args)
+
+    @staticmethod
+    def transaction_key(tx: CompactTransaction) -> str:
+        """Identifica una transferencia; un mismo hash puede contener varias"""
+        return tx.key
+
+    async def get_sync_state(
+        self,
+        blockchain: str,
+        wallet: str
+    ) -> Optional[Tuple[datetime, datetime, Optional[datetime]]]:
+        """
+        Retorna (synced_from, high_water_mark, gap_until) de una wallet, o None
+        si nunca se ha sincronizado.
+        
+        El historial almacenado está completo entre synced_from y
+        high_water_mark salvo, si gap_until no es None, el tramo de synced_from
+        a gap_until: una descarga truncada en MAX_TRANSACTIONS_PER_WALLET solo
+        trae las transacciones más recientes.
+        """
+        return await self._run(self._get_sync_state, blockchain, wallet)
+
+    def _get_sync_state(
+        self,
+        blockchain: str,
+        wallet: str
+    ) -> Optional[Tuple[datetime, datetime, Optional[datetime]]]:
+        row = self._db.execute(
+            "SELECT synced_from, high_water_mark, gap_until FROM wallet_sync WHERE blockchain = ? AND wallet = ?",
+            (blockchain, wallet.lower())
+        ).fetchone()
+        if row is None:
+            return None
+        return (
+            datetime.fromtimestamp(row[0], tz=timezone.utc),
+            datetime.fromtimestamp(row[1], tz=timezone.utc),
+            datetime.fromtimestamp(row[2], tz=timezone.utc) if row[2] is not None else None
+        )
+
+    async def set_sync_state(
+        self,
+        blockchain: str,
+        wallet: str,
+        synced_from: datetime,
+        high_water_mark: datetime,
+        gap_until: Optional[datetime] = None
+    ):
+        """
+        Registra hasta dónde está sincronizado el historial de una wallet y,
+        si la descarga quedó truncada, hasta dónde llega el hueco pendiente
+        """
+        await self._run(self._set_sync_state, blockchain, wallet, synced_from, high_water_mark, gap_until)
+
+    def _set_sync_state(
+        self,
+        blockchain: str,
+        wallet: str,
+        synced_from: datetime,
+        high_water_mark: datetime,
+        gap_until: Optional[datetime]
+    ):
+        self._db.execute(
+            """INSERT OR REPLACE INTO wallet_sync
+               (blockchain, wallet, synced_from, high_water_mark, gap_until, synced_at)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            (
+                blockchain,
+                wallet.lower(),
+                int(synced_from.timestamp()),
+                int(high_water_mark.timestamp()),
+                int(gap_until.timestamp()) if gap_until is not None else None,
+                int(time.time())
+            )
+        )
+        self._db.commit()
+
+    async def get_synced_at(self, blockchain: str, wallet: str) -> Optional[datetime]:
+        """Momento de la última sincronización de una wallet"""
+        return await self._run(self._get_synced_at, blockchain, wallet)
+
+    def _get_synced_at(self, blockchain: str, wallet: str) -> Optional[datetime]:
+        row = self._db.execute(
+            "SELECT synced_at FROM wallet_sync WHERE blockchain = ? AND wallet = ?",
+            (blockchain, wallet.lower())
+        ).fetchone()
+        if row is None:
+            return None
+        return datetime.fromtimestamp(row[0], tz=timezone.utc)
+
+    async def iter_transactions(
+        self,
+        blockchain: str,
+        wallet: str,
+        since: datetime,
+        limit: Optional[int] = None,
+        exclude: Optional[Set[str]] = None,
+        batch_size: int = 500
+    ) -> AsyncIterator[List[CompactTransaction]]:
+        """
+        Genera en lotes las transacciones almacenadas de una wallet desde una
+        fecha, de la más reciente a la más antigua.
+        
+        Args:
+            limit: Número máximo de transacciones a entregar
+            exclude: Claves de transacciones que no se entregan (p. ej. las
+                recién descargadas, que el llamador ya tiene)
+        """
+        remaining = limit
+        after: Optional[Tuple[int, str]] = None
+        while remaining is None or remaining > 0:
+            rows = await self._run(
+                self._fetch_page, blockchain, wallet.lower(), int(since.timestamp()), after, batch_size
+            )
+            if not rows:
+                break
+            after = (rows[-1][0], rows[-1][1])
+            batch = [
+                CompactTransaction(
+                    row[2], row[3], row[4], int(row[5]), row[0],
+                    row[6], row[7], row[8], row[9]
+                )
+                for row in rows
+                if not exclude or row[1] not in exclude
+            ]
+            if remaining is not None:
+                batch = batch[:remaining]
+                remaining -= len(batch)
+            if batch:
+                yield batch
+
+    def _fetch_page(
+        self,
+        blockchain: str,
+        wallet: str,
+        since: int,
+        after: Optional[Tuple[int, str]],
+        batch_size: int
+    ) -> List[tuple]:
+        # Paginación por clave (timestamp, tx_key) descendente
+        query = """SELECT timestamp, tx_key, hash, from_address, to_address, value,
+                          token_address, token_symbol, token_decimals, usd_micros
+                   FROM wallet_transactions
+                   WHERE blockchain = ? AND wallet = ? AND timestamp >= ?"""
+        params: List[Any] = [blockchain, wallet, since]
+        if after is not None:
+            query += " AND (timestamp < ? OR (timestamp = ? AND tx_key < ?))"
+            params.extend((after[0], after[0], after[1]))
+        query += " ORDER BY timestamp DESC, tx_key DESC LIMIT ?"
+        params.append(batch_size)
+        return self._db.execute(query, params).fetchall()
+
+    async def add_transactions(
+        self,
+        blockchain: str,
+        wallet: str,
+        transactions: List[CompactTransaction]
+    ) -> List[CompactTransaction]:
+        """
+        Guarda transacciones de una wallet.
+        
+        Una transacción ya almacenada sin valor en USD (su precio no se pudo
+        obtener) se actualiza si ahora llega con valor.
+        
+        Returns:
+            Las transacciones que no estaban almacenadas o cuyo valor se ha
+            completado
+        """
+        return await self._run(self._add_transactions, blockchain, wallet, transactions)
+
+    def _add_transactions(
+        self,
+        blockchain: str,
+        wallet: str,
+        transactions: List[CompactTransaction]
+    ) -> List[CompactTransaction]:
+        inserted = []
+        for tx in transactions:
+            cursor = self._db.execute(
+                """INSERT INTO wallet_transactions
+                   (blockchain, wallet, tx_key, hash, from_address, to_address, value,
+                    timestamp, token_address, token_symbol, token_decimals, usd_micros)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (blockchain, wallet, tx_key) DO UPDATE
+                   SET usd_micros = excluded.usd_micros
+                   WHERE wallet_transactions.usd_micros = 0 AND excluded.usd_micros > 0""",
+                (
+                    blockchain,
+                    wallet.lower(),
+                    self.transaction_key(tx),
+                    tx.hash,
+                    tx.from_address,
+                    tx.to_address,
+                    str(tx.value),
+                    tx.timestamp,
+                    tx.token_address,
+                    tx.token_symbol,
+                    tx.token_decimals,
+                    tx.usd_micros
+                )
+            )
+            if cursor.rowcount:
+                inserted.append(tx)
+        self._db.commit()
+        return inserted
@@ -0,0 +1,85 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+WalletWorker = Callable[[str, str], Awaitable[Any]]
+WalletCallback = Callable[[str, str, Any, Optional[Exception]], Awaitable[None]]
+
+class WalletScheduler:
+    def __init__(
+        self,
+        global_limit: Optional[int] = None,
+        per_chain_limit: Optional[int] = None
+    ):
+        self.global_limit = global_limit or settings.MAX_CONCURRENT_WALLETS
+        self.per_chain_limit = per_chain_limit or settings.MAX_CONCURRENT_WALLETS_PER_CHAIN
+
+    async def run(
+        self,
+        grouped_addresses: Dict[str, List[str]],
+        worker: WalletWorker,
+        on_complete: Optional[WalletCallback] = None,
+        check_cancelled: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> List[Tuple[str, str, Any]]:
+        """
+        Ejecuta `worker(address, blockchain)` para cada wallet en paralelo,
+        respetando un límite global y un límite por blockchain.
+        
+        Args:
+            grouped_addresses: Direcciones agrupadas por blockchain
+            worker: Corrutina que analiza una wallet
+            on_complete: Corrutina opcional invocada al terminar cada wallet
+            check_cancelled: Corrutina opcional que se consulta antes de empezar
+                cada wallet e interrumpe la ejecución lanzando una excepción
+            
+        Returns:
+            Lista de tuplas (address, blockchain, resultado) en el orden de entrada.
+            El resultado es None si el análisis de la wallet falló.
+            
+        Raises:
+            La excepción de `check_cancelled`; las wallets pendientes se cancelan
+        """
+        global_semaphore = asyncio.Semaphore(self.global_limit)
+        chain_semaphores = {
+            blockchain: asyncio.Semaphore(self.per_chain_limit)
+            for blockchain in grouped_addresses
+        }
+
+        async def run_wallet(address: str, blockchain: str) -> Tuple[str, str, Any]:
+            result = None
+            error = None
+            # Se adquiere primero el límite de la blockchain para no ocupar
+            # un hueco global mientras se espera por una cadena saturada
+            async with chain_semaphores[blockchain]:
+                async with global_semaphore:
+                    # Fuera del try: la cancelación no es un fallo de la wallet
+                    if check_cancelled:
+                        await check_cancelled()
+                    try:
+                        result = await worker(address, blockchain)
+                    except Exception as e:
+                        logger.error(f"Error analizando wallet {address}: {str(e)}")
+                        error = e
+
+            if on_complete:
+                try:
+                    await on_complete(address, blockchain, result, error)
+                except Exception as e:
+                    logger.error(f"Error notificando progreso de {address}: {str(e)}")
+
+            return address, blockchain, result
+
+        tasks = [
+            asyncio.create_task(run_wallet(address, blockchain))
+            for blockchain, addresses in grouped_addresses.items()
+            for address in addresses
+        ]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
@@ -0,0 +1,164 @@
+from typing import Dict, Iterable, Optional
+import logging
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from ..utils import MAX_TRANSFER_USD_MICROS, usd_from_micros
+from .compact_transaction import CompactTransaction
+
+logger = logging.getLogger(__name__)
+
+# Columnas del frame de transacciones sobre el que se calculan las estadísticas
+FRAME_COLUMNS = [
+    "wallet",
+    "from_address",
+    "to_address",
+    "token_address",
+    "usd_micros",
+    "timestamp"
+]
+
+# Número de contratos más frecuentes que se reportan por wallet
+TOP_CONTRACTS = 10
+
+def empty_transactions_frame() -> pd.DataFrame:
+    """Frame de transacciones vacío con los tipos esperados"""
+    return pd.DataFrame({
+        "wallet": pd.Series([], dtype=object),
+        "from_address": pd.Series([], dtype=object),
+        "to_address": pd.Series([], dtype=object),
+        "token_address": pd.Series([], dtype=object),
+        "usd_micros": pd.Series([], dtype=np.int64),
+        "timestamp": pd.Series([], dtype=np.int64)
+    })
+
+def transactions_to_frame(transactions: Iterable[CompactTransaction], wallet: str) -> pd.DataFrame:
+    """
+    Convierte un lote de transacciones de una wallet a formato columnar.
+
+    Las direcciones ya vienen normalizadas a minúsculas; los valores
+    ausentes se convierten a "" o 0. Los valores en USD se recortan a
+    MAX_TRANSFER_USD para que quepan en int64 (también los almacenados
+    antes de existir el tope).
+    """
+    transactions = list(transactions)
+    if not transactions:
+        return empty_transactions_frame()
+
+    count = len(transactions)
+    return pd.DataFrame({
+        "wallet": np.full(count, wallet.lower(), dtype=object),
+        "from_address": [tx.from_address for tx in transactions],
+        "to_address": [tx.to_address for tx in transactions],
+        "token_address": [tx.token_address or "" for tx in transactions],
+        "usd_micros": np.fromiter(
+            (min(tx.usd_micros, MAX_TRANSFER_USD_MICROS) for tx in transactions),
+            dtype=np.int64,
+            count=count
+        ),
+        "timestamp": np.fromiter(
+            (tx.timestamp for tx in transactions),
+            dtype=np.int64,
+            count=count
+        )
+    })
+
+def compute_wallet_stats(frame: pd.DataFrame) -> Dict[str, Dict]:
+    """
+    Calcula las estadísticas de todas las wallets presentes en el frame en
+    una sola pasada, con agregaciones agrupadas en lugar de recorrer las
+    transacciones una a una.
+
+    Args:
+        frame: Transacciones en formato columnar (ver FRAME_COLUMNS). Una
+            misma transacción puede aparecer para varias wallets.
+
+    Returns:
+        Dict de wallet (en minúsculas) a sus estadísticas: totales enviados y
+        recibidos, número de transacciones, volumen por token, contratos más
+        frecuentes, actividad por hora (UTC) y fechas de la primera y la
+        última transacción
+    """
+    if frame.empty:
+        return {}
+
+    # Las sumas se hacen en micro-dólares enteros: exactas e independientes
+    # del orden en que lleguen las transacciones
+    usd_micros = frame["usd_micros"].to_numpy()
+    is_sent = frame["from_address"].to_numpy() == frame["wallet"].to_numpy()
+    frame = frame.assign(
+        sent_micros=np.where(is_sent, usd_micros, 0),
+        received_micros=np.where(is_sent, 0, usd_micros),
+        hour=(frame["timestamp"].to_numpy() // 3600) % 24
+    )
+
+    totals = frame.groupby("wallet", sort=False).agg(
+        sent_micros=("sent_micros", "sum"),
+        received_micros=("received_micros", "sum"),
+        transaction_count=("timestamp", "size"),
+        first_timestamp=("timestamp", "min"),
+        last_timestamp=("timestamp", "max")
+    )
+
+    hours = (
+        frame.groupby(["wallet", "hour"]).size()
+        .unstack(fill_value=0)
+        .reindex(columns=range(24), fill_value=0)
+    )
+
+    contracts = frame[frame["to_address"] != ""].groupby(["wallet", "to_address"]).size()
+    top_contracts = {
+        wallet: counts.droplevel(0).nlargest(TOP_CONTRACTS).index.tolist()
+        for wallet, counts in contracts.groupby(level=0)
+    }
+
+    tokens = frame[frame["token_address"] != ""].groupby(["wallet", "token_address"]).agg(
+        total_micros=("usd_micros", "sum"),
+        transaction_count=("usd_micros", "size")
+    )
+    token_totals = {
+        wallet: {
+            token: {
+                "total_value_usd": usd_from_micros(int(row.total_micros)),
+                "transaction_count": int(row.transaction_count)
+            }
+            for token, row in group.droplevel(0).iterrows()
+        }
+        for wallet, group in tokens.groupby(level=0)
+    }
+
+    # Solo se itera por wallet, no por transacción
+    stats = {}
+    for wallet, row in totals.iterrows():
+        stats[wallet] = {
+            "total_sent_usd": usd_from_micros(int(row.sent_micros)),
+            "total_received_usd": usd_from_micros(int(row.received_micros)),
+            "transaction_count": int(row.transaction_count),
+            "token_totals": token_totals.get(wallet, {}),
+            "most_frequent_contracts": top_contracts.get(wallet, []),
+            "interaction_hours": {
+                int(hour): int(count) for hour, count in hours.loc[wallet].items()
+            },
+            "first_transaction_date": _to_datetime(row.first_timestamp),
+            "last_transaction_date": _to_datetime(row.last_timestamp)
+        }
+
+    return stats
+
+def empty_wallet_stats() -> Dict:
+    """Estadísticas de una wallet sin transacciones en el período"""
+    return {
+        "total_sent_usd": 0.0,
+        "total_received_usd": 0.0,
+        "transaction_count": 0,
+        "token_totals": {},
+        "most_frequent_contracts": [],
+        "interaction_hours": {hour: 0 for hour in range(24)},
+        "first_transaction_date": None,
+        "last_transaction_date": None
+    }
+
+def _to_datetime(timestamp: Optional[int]) -> Optional[datetime]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
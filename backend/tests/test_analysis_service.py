@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timezone
+import pytest
+
+for module in ("dotenv", "pydantic", "pandas", "numpy", "scipy", "networkx", "web3", "aiohttp", "openai"):
+    pytest.importorskip(module)
+
+from backend.services.analysis_service import AnalysisService
+from backend.services.graph_service import GraphRegistry
+from backend.services.job_store import InMemoryJobStore
+from backend.services.wallet_scheduler import WalletScheduler
+
+class CancellingBlockchainService:
+    """Analiza la primera wallet y, mientras tanto, el usuario cancela el trabajo"""
+
+    def __init__(self, job_store, analysis_id):
+        self.job_store = job_store
+        self.analysis_id = analysis_id
+        self.calls = []
+
+    async def analyze_wallet_interactions(self, address, blockchain, transaction_set=None):
+        self.calls.append(address)
+        await self.job_store.update(self.analysis_id, {"cancel_requested": True})
+        now = datetime.now(timezone.utc)
+        return {
+            "address": address,
+            "blockchain": blockchain,
+            "total_sent_usd": 0.0,
+            "total_received_usd": 0.0,
+            "transaction_count": 0,
+            "unique_tokens": [],
+            "first_transaction_date": now,
+            "last_transaction_date": now,
+            "most_frequent_contracts": [],
+            "interaction_hours": {},
+            "source_status": {"native": "ok"}
+        }
+
+def test_cancel_mid_run_does_not_degrade_wallets():
+    job_store = InMemoryJobStore()
+    blockchain_service = CancellingBlockchainService(job_store, "job")
+    service = AnalysisService(
+        job_store,
+        blockchain_service=blockchain_service,
+        openai_service=object(),
+        graph_registry=GraphRegistry(),
+        wallet_scheduler=WalletScheduler(global_limit=1, per_chain_limit=1),
+        similarity_index=object(),
+        crawl_service=object()
+    )
+
+    async def scenario():
+        await job_store.create("job", {"status": "queued"})
+        await service.analyze_wallets({"ethereum": ["0xa", "0xb", "0xc"]}, "job")
+        return await job_store.get("job"), await job_store.get_events("job")
+
+    job, events = asyncio.run(scenario())
+
+    assert job["status"] == "cancelled"
+    assert job.get("degraded_wallets", 0) == 0
+    assert blockchain_service.calls == ["0xa"]
+    assert all(event["data"].get("error") is None for event in events if event["type"] == "wallet")
@@ -0,0 +1,195 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+import pytest
+
+for module in ("dotenv", "pydantic", "pandas", "numpy", "web3", "aiohttp", "requests"):
+    pytest.importorskip(module)
+
+from backend.config import settings
+from backend.services import blockchain_service as blockchain_service_module
+from backend.services.blockchain_service import BlockchainService
+
+WALLET = "0xAaAaaAAaAaaAaAaaaaAaAAaaaaAaaAAAAaAAaAaA"
+TOKEN = "0x1111111111111111111111111111111111111111"
+WETH = settings.SUPPORTED_CHAINS["ethereum"]["wrapped_native_token"]
+
+NATIVE_PAGES = {
+    None: {
+        "result": [{
+            "hash": "0x01",
+            "from_address": WALLET,
+            "to_address": "0xBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBB",
+            "value": "1500000000000000000",
+            "block_timestamp": "2024-05-07T11:08:35.000Z"
+        }],
+        "cursor": "page-2"
+    },
+    "page-2": {
+        "result": [{
+            "hash": "0x02",
+            "from_address": "0xCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCCC",
+            "to_address": WALLET,
+            "value": "250000000000000000",
+            "block_timestamp": "2024-05-07T11:30:00.000Z"
+        }],
+        "cursor": None
+    }
+}
+
+TOKEN_TRANSFERS = {
+    "result": [{
+        "transaction_hash": "0x03",
+        "address": TOKEN,
+        "from_address": WALLET,
+        "to_address": "0xDDDDDDDDDDDDDDDDDDDDDDDDDDDDDDDDDDDDDDDD",
+        "value": "12500000",
+        "token_symbol": "USDC",
+        "token_decimals": "6",
+        "block_timestamp": "2024-05-07T11:45:00.000Z"
+    }],
+    "cursor": None
+}
+
+USD_PRICES = {WETH: 2000.0, TOKEN: 1.0}
+
+def moralis_response(method, url, params=None, json_body=None, headers=None):
+    """Respuestas de Moralis según la ruta de la petición"""
+    path = url[len(settings.MORALIS_API_URL):]
+    assert headers["X-API-Key"] == settings.MORALIS_API_KEY
+    if path == f"/{WALLET}":
+        return NATIVE_PAGES[params.get("cursor")]
+    if path == f"/{WALLET}/erc20/transfers":
+        return TOKEN_TRANSFERS
+    if path == "/dateToBlock":
+        return {"block": "19800000"}
+    if path == "/erc20/prices":
+        return [{"usdPrice": USD_PRICES[token["token_address"]]} for token in json_body["tokens"]]
+    raise AssertionError(f"Petición inesperada: {method} {path}")
+
+@pytest.fixture
+def service(monkeypatch):
+    # Sin almacén de transacciones ni caché de precios en disco
+    monkeypatch.setattr(settings, "TRANSACTION_STORE_PATH", "")
+    monkeypatch.setattr(settings, "PRICE_CACHE_DB_PATH", "")
+    # Buckets nuevos: sus locks no deben venir del event loop de otro test
+    monkeypatch.setattr(blockchain_service_module.rate_limiter, "buckets", {})
+    return BlockchainService()
+
+def fetch(service: BlockchainService, source_status: dict):
+    async def scenario():
+        transactions = []
+        async for batch in service.iter_wallet_transactions(WALLET, "ethereum", 30, source_status):
+            transactions.extend(batch)
+        return {tx.hash: tx for tx in transactions}
+    return asyncio.run(scenario())
+
+def test_moralis_pages_are_mapped_to_transactions(monkeypatch, service):
+    request_json = AsyncMock(side_effect=moralis_response)
+    monkeypatch.setattr(blockchain_service_module.http_client, "request_json", request_json)
+    source_status = {}
+
+    transactions = fetch(service, source_status)
+
+    assert source_status == {"native": "ok", "erc20": "ok", "prices": "ok"}
+    assert sorted(transactions) == ["0x01", "0x02", "0x03"]
+
+    native = transactions["0x01"]
+    assert native.from_address == WALLET.lower()
+    assert native.value == 1_500_000_000_000_000_000
+    assert native.token_address is None
+    assert native.usd_micros == 3000 * 10 ** 6
+
+    transfer = transactions["0x03"]
+    assert transfer.token_address == TOKEN
+    assert transfer.token_symbol == "USDC"
+    assert transfer.token_decimals == 6
+    assert transfer.usd_micros == 12_500_000
+
+    # La segunda página de transacciones nativas se pide con el cursor de la primera
+    cursors = [
+        call.kwargs["params"].get("cursor")
+        for call in request_json.await_args_list
+        if call.args[1].endswith(f"/{WALLET}")
+    ]
+    assert cursors == [None, "page-2"]
+
+def test_unresolved_prices_mark_prices_source(monkeypatch, service):
+    def without_prices(method, url, params=None, json_body=None, headers=None):
+        if url.endswith("/erc20/prices"):
+            raise RuntimeError("precios no disponibles")
+        return moralis_response(method, url, params, json_body, headers)
+
+    monkeypatch.setattr(
+        blockchain_service_module.http_client,
+        "request_json",
+        AsyncMock(side_effect=without_prices)
+    )
+    source_status = {}
+
+    transactions = fetch(service, source_status)
+
+    assert source_status["prices"] == "error"
+    assert sorted(transactions) == ["0x01", "0x02", "0x03"]
+    assert all(tx.usd_micros == 0 for tx in transactions.values())
+
+def test_truncated_sync_resumes_and_fills_gap(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "TRANSACTION_STORE_PATH", str(tmp_path / "transactions.db"))
+    monkeypatch.setattr(settings, "PRICE_CACHE_DB_PATH", "")
+    monkeypatch.setattr(blockchain_service_module.rate_limiter, "buckets", {})
+    service = BlockchainService()
+    service.transaction_sources = {"native": service._iter_moralis_transactions}
+
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    history = [
+        {
+            "hash": f"0x0{i}",
+            "from_address": WALLET,
+            "to_address": "0xBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBBB",
+            "value": "1000000000000000000",
+            "block_timestamp": (now - timedelta(days=i)).isoformat().replace("+00:00", "Z")
+        }
+        for i in (1, 2, 3)
+    ]
+    native_requests = []
+
+    def windowed_history(method, url, params=None, json_body=None, headers=None):
+        if url.endswith(f"/{WALLET}"):
+            native_requests.append(dict(params))
+            from_date = datetime.fromisoformat(params["from_date"])
+            to_date = datetime.fromisoformat(params["to_date"]) if "to_date" in params else now
+            rows = [
+                tx for tx in history
+                if from_date <= datetime.fromisoformat(tx["block_timestamp"].replace("Z", "+00:00")) <= to_date
+            ]
+            return {"result": rows, "cursor": None}
+        return moralis_response(method, url, params, json_body, headers)
+
+    monkeypatch.setattr(
+        blockchain_service_module.http_client,
+        "request_json",
+        AsyncMock(side_effect=windowed_history)
+    )
+
+    # Primera sincronización truncada en el límite: solo las dos más recientes
+    monkeypatch.setattr(settings, "MAX_TRANSACTIONS_PER_WALLET", 2)
+    source_status = {}
+    assert sorted(fetch(service, source_status)) == ["0x01", "0x02"]
+    assert source_status["native"] == "truncated"
+    synced_from, high_water_mark, gap_until = asyncio.run(
+        service.transaction_store.get_sync_state("ethereum", WALLET)
+    )
+    assert high_water_mark == now - timedelta(days=1)
+    assert gap_until == now - timedelta(days=2)
+
+    # Sin datos nuevos: se pide solo lo posterior a la marca y el resto sale del almacén
+    native_requests.clear()
+    assert sorted(fetch(service, {})) == ["0x01", "0x02"]
+    assert [request["from_date"] for request in native_requests] == [high_water_mark.isoformat()]
+
+    # Con un límite mayor se descarga solo el hueco pendiente
+    monkeypatch.setattr(settings, "MAX_TRANSACTIONS_PER_WALLET", 3)
+    native_requests.clear()
+    assert sorted(fetch(service, {})) == ["0x01", "0x02", "0x03"]
+    assert native_requests[-1]["to_date"] == gap_until.isoformat()
+    assert asyncio.run(service.transaction_store.get_sync_state("ethereum", WALLET))[2] is None
@@ -0,0 +1,90 @@
+import pytest
+
+for module in ("dotenv", "pydantic", "pandas", "numpy", "scipy", "networkx", "web3"):
+    pytest.importorskip(module)
+
+from backend.services.compact_transaction import CompactTransaction
+from backend.services.graph_backends import GRAPH_BACKENDS
+from backend.services.graph_service import GraphRegistry, GraphService
+
+def make_tx(index: int, from_address: str, to_address: str, usd_micros: int = 1_000_000) -> CompactTransaction:
+    return CompactTransaction(
+        f"0x{index:064x}", from_address, to_address, index, 1_700_000_000 + index,
+        token_symbol="TKN", usd_micros=usd_micros
+    )
+
+def nodes_by_id(graph_service: GraphService):
+    return {node.id: node.properties for node in graph_service.get_graph_data().nodes}
+
+@pytest.mark.parametrize("backend", ["networkx", "sparse"])
+def test_sync_transactions_evicts_old_transactions(monkeypatch, backend):
+    monkeypatch.setattr("backend.config.settings.GRAPH_BACKEND", backend)
+    graph_service = GraphService()
+    day_one = [make_tx(1, "0xa", "0xb"), make_tx(2, "0xa", "0xb", 3_000_000), make_tx(3, "0xb", "0xc")]
+    assert graph_service.sync_transactions(day_one) == (3, 0)
+
+    # Al día siguiente la transacción 1 sale de la ventana y la 3 deja la arista b->c vacía
+    day_two = [day_one[1], make_tx(4, "0xa", "0xd")]
+    assert graph_service.sync_transactions(day_two) == (1, 2)
+
+    nodes = nodes_by_id(graph_service)
+    assert set(nodes) == {"0xa", "0xb", "0xd"}
+    assert nodes["0xa"]["total_sent"] == 4.0
+    assert nodes["0xb"]["total_received"] == 3.0
+    assert nodes["0xa"]["transaction_count"] == 2
+
+    edges = {(edge.source, edge.target): edge.properties for edge in graph_service.get_graph_data().edges}
+    assert set(edges) == {("0xa", "0xb"), ("0xa", "0xd")}
+    assert edges[("0xa", "0xb")]["transaction_count"] == 1
+    assert edges[("0xa", "0xb")]["total_value"] == 3.0
+
+def test_backends_agree_on_totals_beyond_int64():
+    big = 2 ** 62
+    totals = []
+    for backend_class in GRAPH_BACKENDS.values():
+        backend = backend_class()
+        backend.build(["0xa", "0xb", "0xc"], {("0xa", "0xb"): big, ("0xc", "0xb"): big, ("0xa", "0xc"): big})
+        backend.add_edges(["0xd"], {("0xa", "0xb"): big, ("0xd", "0xb"): 1})
+        totals.append(backend.node_totals())
+
+    sent, received = totals[0]
+    assert sent["0xa"] == 3 * big
+    assert received["0xb"] == 3 * big + 1
+    assert all(other == totals[0] for other in totals[1:])
+
+def test_sync_transactions_matches_fresh_graph():
+    incremental = GraphService()
+    incremental.sync_transactions([make_tx(1, "0xa", "0xb"), make_tx(2, "0xb", "0xc")])
+    current = [make_tx(2, "0xb", "0xc"), make_tx(3, "0xc", "0xa")]
+    incremental.sync_transactions(current)
+
+    fresh = GraphService()
+    fresh.sync_transactions(current)
+    assert incremental.graph_hash == fresh.graph_hash
+    assert nodes_by_id(incremental) == nodes_by_id(fresh)
+
+def test_registry_reuses_graph_per_key():
+    registry = GraphRegistry(max_graphs=1)
+    with registry.checkout("watchlist") as graph_service:
+        graph_service.sync_transactions([make_tx(1, "0xa", "0xb")])
+    with registry.checkout("watchlist") as reused:
+        assert reused is graph_service
+
+    with registry.checkout("other"):
+        pass
+    with registry.checkout("watchlist") as evicted:
+        assert evicted is not graph_service
+
+def test_registry_concurrent_checkouts_get_separate_graphs():
+    registry = GraphRegistry()
+    with registry.checkout("watchlist") as first:
+        with registry.checkout("watchlist") as second:
+            assert second is not first
+
+def test_registry_discards_graph_on_error():
+    registry = GraphRegistry()
+    with pytest.raises(RuntimeError):
+        with registry.checkout("watchlist") as graph_service:
+            raise RuntimeError("fallo")
+    with registry.checkout("watchlist") as fresh:
+        assert fresh is not graph_service
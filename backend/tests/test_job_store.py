@@ -0,0 +1,154 @@
+import asyncio
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("pydantic")
+
+from backend.services import job_store as job_store_module
+from backend.services.job_store import InMemoryJobStore, SQLiteJobStore
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = InMemoryJobStore()
+    else:
+        store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    store.lease_seconds = 10
+    store.max_attempts = 2
+    return store
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(job_store_module.time, "time", lambda: now[0])
+    return now
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_dequeue_follows_priority(store, clock):
+    async def scenario():
+        for job_id, priority in (("low", 0), ("high", 5)):
+            await store.create(job_id, {"status": "queued"})
+            await store.enqueue(job_id, priority)
+        return [await store.dequeue(), await store.dequeue(), await store.dequeue()]
+
+    assert run(scenario()) == ["high", "low", None]
+
+def test_expired_lease_is_requeued(store, clock):
+    async def scenario():
+        await store.create("job", {"status": "queued"})
+        await store.enqueue("job")
+        first = await store.dequeue()
+        # Mientras la concesión está vigente nadie más lo toma
+        clock[0] += 5
+        during_lease = await store.dequeue()
+        clock[0] += 10
+        after_expiry = await store.dequeue()
+        return first, during_lease, after_expiry
+
+    assert run(scenario()) == ("job", None, "job")
+
+def test_renewed_lease_keeps_job(store, clock):
+    async def scenario():
+        await store.create("job", {"status": "queued"})
+        await store.enqueue("job")
+        await store.dequeue()
+        clock[0] += 8
+        renewed = await store.renew_lease("job")
+        clock[0] += 8
+        return renewed, await store.dequeue()
+
+    assert run(scenario()) == (True, None)
+
+def test_released_job_is_not_requeued(store, clock):
+    async def scenario():
+        await store.create("job", {"status": "queued"})
+        await store.enqueue("job")
+        await store.dequeue()
+        await store.release("job")
+        clock[0] += 60
+        return await store.dequeue(), await store.renew_lease("job")
+
+    assert run(scenario()) == (None, False)
+
+def test_job_fails_after_max_attempts(store, clock):
+    async def scenario():
+        await store.create("job", {"status": "queued"})
+        await store.enqueue("job")
+        taken = [await store.dequeue()]
+        clock[0] += 11
+        taken.append(await store.dequeue())
+        clock[0] += 11
+        taken.append(await store.dequeue())
+        return taken, await store.get("job")
+
+    taken, job = run(scenario())
+    assert taken == ["job", "job", None]
+    assert job["status"] == "error"
+
+def test_fingerprint_claimed_once(store, clock):
+    async def scenario():
+        first = await store.claim_fingerprint("fp", "a", 60)
+        second = await store.claim_fingerprint("fp", "b", 60)
+        return first, second, await store.get_fingerprint("fp")
+
+    assert run(scenario()) == ("a", "a", "a")
+
+def test_fingerprint_replaced_only_from_expected_owner(store, clock):
+    async def scenario():
+        await store.claim_fingerprint("fp", "a", 60)
+        stale = await store.claim_fingerprint("fp", "c", 60, replace="b")
+        replaced = await store.claim_fingerprint("fp", "c", 60, replace="a")
+        clock[0] += 61
+        expired = await store.claim_fingerprint("fp", "d", 60)
+        return stale, replaced, expired
+
+    assert run(scenario()) == ("a", "c", "d")
+
+def test_artifacts_listed_by_version(store, clock):
+    async def scenario():
+        await store.create("job", {"status": "processing"})
+        await store.put_artifacts("job", "wallets", {"2": {"address": "b"}}, 2)
+        await store.put_artifacts("job", "wallets", {"1": {"address": "a"}}, 1)
+        await store.put_artifacts("job", "edges", {"a->b": [{"hash": "0x1"}]}, 3)
+        return (
+            await store.list_artifacts("job", "wallets"),
+            await store.list_artifacts("job", "wallets", since_version=1),
+            await store.get_artifact("job", "edges", "a->b"),
+            await store.get_artifact("job", "edges", "b->a")
+        )
+
+    assert run(scenario()) == (
+        [{"address": "a"}, {"address": "b"}],
+        [{"address": "b"}],
+        [{"hash": "0x1"}],
+        None
+    )
+
+def test_artifacts_deleted_with_job(store, clock):
+    async def scenario():
+        await store.create("job", {"status": "completed"})
+        await store.put_artifacts("job", "results", {"report": {"summary": "ok"}}, 1)
+        await store.delete("job")
+        return await store.get_artifact("job", "results", "report")
+
+    assert run(scenario()) is None
+
+def test_expired_job_releases_events_and_artifacts(clock):
+    store = InMemoryJobStore(ttl_seconds=60)
+
+    async def scenario():
+        await store.create("job", {"status": "completed"})
+        await store.publish_event("job", "progress", {"progress": 100})
+        await store.put_artifacts("job", "results", {"report": {"summary": "ok"}}, 1)
+        clock[0] += 61
+        return (
+            await store.get("job"),
+            await store.get_events("job"),
+            await store.get_artifact("job", "results", "report")
+        )
+
+    assert run(scenario()) == (None, [], None)
+    assert "job" not in store._events
+    assert "job" not in store._artifacts
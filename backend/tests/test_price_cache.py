@@ -0,0 +1,38 @@
+import asyncio
+import pytest
+
+pytest.importorskip("dotenv")
+
+from backend.services.price_cache import PriceCache
+
+def test_prices_persist_across_instances(tmp_path):
+    path = str(tmp_path / "prices.db")
+    prices = {
+        ("ethereum", "native", 3600): 2000.0,
+        ("ethereum", "0xabc", 3600): 1.0
+    }
+
+    async def scenario():
+        await PriceCache(db_path=path).set_many(prices)
+        reopened = PriceCache(db_path=path)
+        return (
+            await reopened.get_many(list(prices) + [("ethereum", "0xdef", 3600)]),
+            len(reopened)
+        )
+
+    assert asyncio.run(scenario()) == (prices, 2)
+
+def test_disk_tier_uses_wal(tmp_path):
+    cache = PriceCache(db_path=str(tmp_path / "prices.db"))
+    assert cache._db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+def test_memory_only_cache_evicts_least_recently_used():
+    cache = PriceCache(max_entries=2, db_path="")
+
+    async def scenario():
+        await cache.set_many({("ethereum", "a", 0): 1.0, ("ethereum", "b", 0): 2.0})
+        await cache.get(("ethereum", "a", 0))
+        await cache.set(("ethereum", "c", 0), 3.0)
+        return await cache.get_many([("ethereum", token, 0) for token in "abc"])
+
+    assert asyncio.run(scenario()) == {("ethereum", "a", 0): 1.0, ("ethereum", "c", 0): 3.0}
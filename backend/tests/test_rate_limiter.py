@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import pytest
+
+pytest.importorskip("dotenv")
+
+from backend.services.rate_limiter import parse_retry_after
+
+def test_retry_after_seconds():
+    assert parse_retry_after("2.5") == 2.5
+
+def test_retry_after_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    seconds = parse_retry_after(format_datetime(retry_at, usegmt=True))
+    assert 28 <= seconds <= 30
+
+def test_retry_after_past_date_and_invalid():
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
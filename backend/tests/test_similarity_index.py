@@ -0,0 +1,42 @@
+import asyncio
+import pytest
+
+for module in ("dotenv", "pydantic", "numpy", "scipy"):
+    pytest.importorskip(module)
+
+from backend.services.similarity_index import SimilarityIndex
+
+@pytest.fixture
+def index(tmp_path):
+    return SimilarityIndex(str(tmp_path / "similarity.db"))
+
+def test_lookup_without_blockchain_uses_index(index):
+    plan = index._db.execute(
+        "EXPLAIN QUERY PLAN SELECT blockchain, profile FROM wallet_profiles "
+        "WHERE address = ? ORDER BY updated_at DESC LIMIT 1",
+        ("0xabc",)
+    ).fetchall()
+    assert "idx_wallet_profiles_address" in plan[0][-1]
+
+def test_find_similar_ranks_indexed_wallets(index):
+    def wallet(address, contracts):
+        return {
+            "address": address,
+            "interaction_hours": {"9": 10, "10": 8},
+            "most_frequent_contracts": contracts,
+            "total_sent_usd": 1500.0,
+            "unique_tokens": [{"address": contract} for contract in contracts]
+        }
+
+    async def scenario():
+        await index.add_wallets("ethereum", [
+            wallet("0xAAA", ["0x1", "0x2", "0x3"]),
+            wallet("0xbbb", ["0x1", "0x2", "0x3"]),
+            wallet("0xccc", ["0x7", "0x8", "0x9"])
+        ])
+        return await index.find_similar("0xaaa"), await index.find_similar("0xddd")
+
+    similar, missing = asyncio.run(scenario())
+    assert similar[0]["address"] == "0xbbb"
+    assert similar[0]["blockchain"] == "ethereum"
+    assert missing is None
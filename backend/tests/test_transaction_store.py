@@ -0,0 +1,40 @@
+import asyncio
+from datetime import datetime, timezone
+import pytest
+
+for module in ("dotenv", "pydantic", "pandas", "numpy", "web3"):
+    pytest.importorskip(module)
+
+from backend.services.compact_transaction import CompactTransaction
+from backend.services.transaction_store import TransactionStore
+
+def make_tx(index: int) -> CompactTransaction:
+    return CompactTransaction(f"0x{index:064x}", "0xaaa", "0xbbb", index, 1_700_000_000 + index)
+
+def collect(store: TransactionStore, **kwargs):
+    async def scenario():
+        transactions = []
+        async for batch in store.iter_transactions(
+            "ethereum", "0xAAA", datetime.fromtimestamp(1_700_000_000, tz=timezone.utc), batch_size=3, **kwargs
+        ):
+            transactions.extend(batch)
+        return [tx.value for tx in transactions]
+    return asyncio.run(scenario())
+
+@pytest.fixture
+def store(tmp_path):
+    store = TransactionStore(str(tmp_path / "transactions.db"))
+    inserted = asyncio.run(store.add_transactions("ethereum", "0xaaa", [make_tx(i) for i in range(10)]))
+    assert len(inserted) == 10
+    return store
+
+def test_add_transactions_skips_stored(store):
+    inserted = asyncio.run(store.add_transactions("ethereum", "0xaaa", [make_tx(9), make_tx(10)]))
+    assert [tx.value for tx in inserted] == [10]
+
+def test_iter_transactions_newest_first(store):
+    assert collect(store) == list(range(9, -1, -1))
+
+def test_iter_transactions_limit_and_exclude(store):
+    excluded = {make_tx(9).key, make_tx(7).key}
+    assert collect(store, limit=4, exclude=excluded) == [8, 6, 5, 4]
@@ -0,0 +1,29 @@
+import pytest
+
+for module in ("dotenv", "pydantic", "pandas", "numpy", "web3"):
+    pytest.importorskip(module)
+
+from backend.utils import calculate_usd_micros, calculate_usd_micros_array, scale_price
+
+def test_usd_micros_array_matches_scalar():
+    amounts = [0, 1, 10 ** 18, 123456789 * 10 ** 6, 2 ** 256 - 1]
+    prices = [scale_price(price) for price in (1.0, 3500.25, 0.000001, 1.0, 0.5)]
+    decimals = [18, 0, 18, 6, 18]
+
+    expected = [
+        calculate_usd_micros(amount, price, decimal)
+        for amount, price, decimal in zip(amounts, prices, decimals)
+    ]
+    assert list(calculate_usd_micros_array(amounts, prices, decimals)) == expected
+
+def test_usd_micros_array_empty():
+    assert len(calculate_usd_micros_array([], [], [])) == 0
+
+def test_usd_micros_clamped_to_int64_range():
+    from backend.utils import MAX_TRANSFER_USD_MICROS
+
+    # Token basura: cantidad enorme con un precio no despreciable
+    amount, price = 10 ** 40, scale_price(1000.0)
+    assert calculate_usd_micros(amount, price, 18) == MAX_TRANSFER_USD_MICROS
+    assert list(calculate_usd_micros_array([amount], [price], [18])) == [MAX_TRANSFER_USD_MICROS]
+    assert MAX_TRANSFER_USD_MICROS < 2 ** 63
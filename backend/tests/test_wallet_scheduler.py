@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+
+pytest.importorskip("dotenv")
+
+from backend.services.wallet_scheduler import WalletScheduler
+
+class Cancelled(Exception):
+    pass
+
+def test_cancellation_stops_launching_wallets():
+    started = []
+    completed = []
+    cancelled = [False]
+
+    async def worker(address, blockchain):
+        started.append(address)
+        cancelled[0] = True
+        return address
+
+    async def on_complete(address, blockchain, result, error):
+        completed.append((address, error))
+
+    async def check_cancelled():
+        if cancelled[0]:
+            raise Cancelled()
+
+    scheduler = WalletScheduler(global_limit=1, per_chain_limit=1)
+    with pytest.raises(Cancelled):
+        asyncio.run(scheduler.run(
+            {"ethereum": ["0xa", "0xb", "0xc"]},
+            worker,
+            on_complete,
+            check_cancelled=check_cancelled
+        ))
+
+    assert started == ["0xa"]
+    assert completed == [("0xa", None)]
+
+def test_worker_errors_are_reported_per_wallet():
+    async def worker(address, blockchain):
+        if address == "0xb":
+            raise RuntimeError("fallo")
+        return address
+
+    results = asyncio.run(WalletScheduler(global_limit=2, per_chain_limit=2).run(
+        {"ethereum": ["0xa", "0xb"]},
+        worker
+    ))
+    assert results == [("0xa", "ethereum", "0xa"), ("0xb", "ethereum", None)]
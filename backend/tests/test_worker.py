@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+import pytest
+
+# El worker arrastra todas las dependencias del análisis
+for module in ("dotenv", "pydantic", "aiohttp", "web3", "openai", "pandas", "networkx", "scipy"):
+    pytest.importorskip(module)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_worker_module_imports():
+    from backend import worker
+
+    assert callable(worker.main)
+    assert callable(worker.worker_loop)
+
+def test_worker_entry_point_runs_as_module():
+    result = subprocess.run(
+        [sys.executable, "-m", "backend.worker", "--help"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    assert "--processes" in result.stdout
@@ -1,12 +1,14 @@
 import pandas as pd
-from typing import List, Dict, Tuple
+from typing import List, Dict, Sequence, Tuple, Union
 import csv
 import io
+from decimal import Decimal
+import numpy as np
 from web3 import Web3
 from datetime import datetime
 import logging
-from models import WalletAddress
-from config import settings
+from .models import WalletAddress
+from .config import settings
 
 # Configurar logging
 logging.basicConfig(
@@ -77,12 +79,95 @@ def format_wallet_address(address: str, max_length: int = 12) -> str:
         return address
     return f"{address[:6]}...{address[-4:]}"
 
-def calculate_usd_value(amount: float, token_price: float, decimals: int = 18) -> float:
+def parse_block_timestamp(value: str) -> datetime:
+    """
+    Convierte un timestamp ISO 8601 de la API (p.ej. '2021-05-07T11:08:35.000Z') a datetime.
+    """
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
+
+# Los montos en USD se manejan como enteros de micro-dólares para que los
+# totales sean exactos y reproducibles al centavo
+USD_MICROS = 10 ** 6
+
+# Tope por transferencia: los valores de tokens basura no desbordan int64
+MAX_TRANSFER_USD_MICROS = settings.MAX_TRANSFER_USD * USD_MICROS
+
+# Los precios se escalan a enteros con 18 decimales antes de multiplicar
+PRICE_SCALE = 10 ** 18
+
+# Potencias de 10 precalculadas para los decimales de los tokens (uint256 < 10**78)
+POW10 = tuple(10 ** i for i in range(78))
+# Divisor de calculate_usd_micros por número de decimales, como array de enteros de Python
+USD_MICROS_DIVISORS = np.array([pow10 * (PRICE_SCALE // USD_MICROS) for pow10 in POW10], dtype=object)
+
+def parse_base_units(value: Union[str, int, float]) -> int:
+    """
+    Convierte el `value` de la API (entero en unidades base del token, como
+    string) a int sin pasar por float.
+    """
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        # Notación decimal o científica
+        return int(Decimal(str(value)))
+
+def scale_price(token_price: float) -> int:
+    """Convierte un precio en USD a entero escalado por PRICE_SCALE"""
+    if not token_price:
+        return 0
+    return int(Decimal(repr(float(token_price))).scaleb(18))
+
+def calculate_usd_micros(amount: int, scaled_price: int, decimals: int = 18) -> int:
+    """
+    Valor exacto en micro-dólares de una cantidad en unidades base, dado un
+    precio escalado con `scale_price`, recortado a MAX_TRANSFER_USD.
+    """
+    return min(
+        amount * scaled_price // (POW10[decimals] * (PRICE_SCALE // USD_MICROS)),
+        MAX_TRANSFER_USD_MICROS
+    )
+
+def calculate_usd_micros_array(
+    amounts: Sequence[int],
+    scaled_prices: Sequence[int],
+    decimals: Sequence[int]
+) -> np.ndarray:
+    """
+    Versión por lotes de `calculate_usd_micros`: valor exacto en
+    micro-dólares de cada cantidad, con el mismo redondeo y el mismo tope.
+
+    Los arrays son de dtype object (enteros de Python): una cantidad uint256
+    multiplicada por un precio escalado por 10**18 no cabe en int64 y en
+    float64 perdería exactitud, así que ningún dtype nativo sirve. Se ahorra
+    el bucle en Python y la indexación por transacción; las estadísticas
+    (wallet_stats) trabajan ya sobre los micro-dólares resultantes, que sí
+    caben en int64.
+    """
+    return np.minimum(
+        np.array(amounts, dtype=object)
+        * np.array(scaled_prices, dtype=object)
+        // USD_MICROS_DIVISORS[np.asarray(decimals, dtype=np.intp)],
+        MAX_TRANSFER_USD_MICROS
+    )
+
+def usd_from_micros(micros: Union[int, np.ndarray]) -> Union[float, np.ndarray]:
+    """Convierte micro-dólares (escalar o array) a dólares"""
+    return micros / USD_MICROS
+
+def calculate_usd_value(amount: Union[str, int, float], token_price: float, decimals: int = 18) -> float:
     """
     Calcula el valor en USD de una cantidad de tokens.
     """
     try:
-        return (amount / (10 ** decimals)) * token_price
+        return usd_from_micros(calculate_usd_micros(
+            parse_base_units(amount),
+            scale_price(token_price),
+            decimals
+        ))
     except Exception as e:
         logger.error(f"Error calculando valor USD: {str(e)}")
         return 0.0
@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import signal
+from .config import settings
+from .services.analysis_service import AnalysisService
+from .services.community_detection import shutdown_executor
+from .services.job_store import JobStore, create_job_store
+from .services.http_client import http_client
+
+logger = logging.getLogger(__name__)
+
+async def renew_lease_periodically(job_store: JobStore, analysis_id: str):
+    """Renueva la concesión del trabajo mientras se procesa"""
+    interval = max(settings.JOB_LEASE_SECONDS / 3, 1)
+    while True:
+        await asyncio.sleep(interval)
+        if not await job_store.renew_lease(analysis_id):
+            logger.error(f"Concesión perdida para el análisis {analysis_id}")
+            return
+
+async def worker_loop(worker_id: int):
+    """
+    Consume trabajos de la cola compartida y ejecuta su análisis.
+    El progreso se escribe en el almacén de trabajos, de donde lo lee la API.
+    """
+    job_store = create_job_store()
+    analysis_service = AnalysisService(job_store)
+    stop_event = asyncio.Event()
+    
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+    
+    await http_client.startup()
+    logger.info(f"Worker {worker_id} iniciado")
+    
+    try:
+        while not stop_event.is_set():
+            analysis_id = await job_store.dequeue()
+            if analysis_id is None:
+                try:
+                    await asyncio.wait_for(
+                        stop_event.wait(),
+                        settings.WORKER_POLL_INTERVAL_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            heartbeat = asyncio.create_task(renew_lease_periodically(job_store, analysis_id))
+            try:
+                job = await job_store.get(analysis_id)
+                if job is None:
+                    continue
+                if job.get("cancel_requested"):
+                    # Cancelado mientras volvía a la cola tras perder su worker
+                    fields = {"status": "cancelled", "message": "Análisis cancelado"}
+                    await job_store.update(analysis_id, fields)
+                    await job_store.publish_event(analysis_id, "cancelled", fields)
+                    continue
+                
+                logger.info(f"Worker {worker_id} procesando análisis {analysis_id}")
+                await analysis_service.analyze_wallets(
+                    job["grouped_addresses"],
+                    analysis_id,
+                    job.get("hops", 0)
+                )
+            finally:
+                heartbeat.cancel()
+                await job_store.release(analysis_id)
+    finally:
+        await http_client.shutdown()
+        analysis_service.blockchain_service.close_web3_connections()
+        shutdown_executor()
+        logger.info(f"Worker {worker_id} detenido")
+
+def run_worker(worker_id: int):
+    asyncio.run(worker_loop(worker_id))
+
+def main():
+    parser = argparse.ArgumentParser(description="Workers de análisis de wallets")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=settings.WORKER_PROCESSES,
+        help="Número de procesos worker"
+    )
+    args = parser.parse_args()
+    
+    if settings.JOB_STORE_BACKEND == "memory":
+        parser.error("Los workers requieren JOB_STORE_BACKEND=sqlite o redis")
+    
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(worker_id,), daemon=False)
+        for worker_id in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Cada worker recibe la señal y termina su trabajo actual de forma ordenada
+        for process in processes:
+            process.join()
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ import { useParams, useNavigate } from 'react-router-dom';
 import LoadingSpinner from '../components/LoadingSpinner';
 import Notification from '../components/Notification';
 import GraphViewer from '../components/GraphViewer';
-import { walletApi, useAnalysisPolling } from '../services/api';
+import { walletApi, useAnalysisEvents } from '../services/api';
 import type { AnalysisReport, GraphData } from '../types';
 
 const Analysis: React.FC = () => {
@@ -12,8 +12,8 @@ const Analysis: React.FC = () => {
   const [report, setReport] = useState<AnalysisReport | null>(null);
   const [error, setError] = useState<string | null>(null);
 
-  // Usar el hook de polling para obtener actualizaciones del estado
-  const { status, error: pollingError, stopPolling } = useAnalysisPolling(
+  // Recibir actualizaciones del estado por SSE (con polling como respaldo)
+  const { status, error: pollingError, stopPolling } = useAnalysisEvents(
     id || '',
     5000
   );
@@ -24,6 +24,9 @@ const Analysis: React.FC = () => {
     } else if (status?.status === 'error') {
       setError(status.error || 'Error en el análisis');
       stopPolling();
+    } else if (status?.status === 'cancelled') {
+      setError('El análisis fue cancelado');
+      stopPolling();
     }
   }, [status]);
 
@@ -70,7 +73,7 @@ const Analysis: React.FC = () => {
     );
   }
 
-  if (!status || status.status === 'processing') {
+  if (!status || status.status === 'queued' || status.status === 'processing') {
     return (
       <div className="container mx-auto px-4 py-8">
         <div className="text-center">
@@ -97,7 +97,7 @@ export const useAnalysisPolling = (
         setStatus(response.data);
         
         // Detener polling si el análisis está completo o hay un error
-        if (response.data.status === 'completed' || response.data.status === 'error') {
+        if (['completed', 'error', 'cancelled'].includes(response.data.status)) {
           stopPolling();
         }
       } catch (err: any) {
@@ -119,4 +119,86 @@ export const useAnalysisPolling = (
   return { status, error, stopPolling };
 };
 
+// Hook personalizado que recibe el progreso del análisis por Server-Sent Events.
+// Si el navegador no soporta EventSource o el stream falla, recurre al polling.
+export const useAnalysisEvents = (
+  analysisId: string,
+  fallbackInterval: number = 5000
+): {
+  status: AnalysisStatus | null;
+  error: string | null;
+  stopPolling: () => void;
+} => {
+  const [status, setStatus] = useState<AnalysisStatus | null>(null);
+  const [error, setError] = useState<string | null>(null);
+  const eventSource = useRef<EventSource | null>(null);
+  const pollInterval = useRef<number>();
+
+  const stopPolling = () => {
+    eventSource.current?.close();
+    eventSource.current = null;
+    if (pollInterval.current) {
+      clearInterval(pollInterval.current);
+    }
+  };
+
+  useEffect(() => {
+    const isFinished = (current: AnalysisStatus) =>
+      ['completed', 'error', 'cancelled'].includes(current.status);
+
+    const pollStatus = async () => {
+      try {
+        const response = await walletApi.getAnalysisStatus(analysisId);
+        setStatus(response.data);
+        if (isFinished(response.data)) {
+          stopPolling();
+        }
+      } catch (err: any) {
+        setError(err.message);
+        stopPolling();
+      }
+    };
+
+    const startPolling = () => {
+      pollStatus();
+      pollInterval.current = window.setInterval(pollStatus, fallbackInterval);
+    };
+
+    if (typeof EventSource === 'undefined') {
+      startPolling();
+      return () => stopPolling();
+    }
+
+    const source = new EventSource(`/api/v1/analysis/${analysisId}/events`);
+    eventSource.current = source;
+
+    const handleEvent = (event: MessageEvent) => {
+      const data = JSON.parse(event.data);
+      setStatus((previous) => ({ ...(previous || {}), ...data } as AnalysisStatus));
+      if (data.status && isFinished(data)) {
+        stopPolling();
+      }
+    };
+
+    ['status', 'stage', 'wallet', 'completed', 'error', 'cancelled'].forEach((type) =>
+      source.addEventListener(type, handleEvent as EventListener)
+    );
+
+    source.onerror = () => {
+      // El navegador reintenta solo; si la conexión quedó cerrada se pasa a polling
+      if (source.readyState === EventSource.CLOSED) {
+        eventSource.current = null;
+        startPolling();
+      }
+    };
+
+    // Cleanup
+    return () => {
+      stopPolling();
+    };
+  }, [analysisId, fallbackInterval]);
+
+  return { status, error, stopPolling };
+};
+
 export default walletApi;
\ No newline at end of file
@@ -12,7 +12,8 @@ export interface UploadResponse {
 }
 
 export interface AnalysisStatus {
-  status: 'processing' | 'completed' | 'error';
+  status: 'queued' | 'processing' | 'completed' | 'error' | 'cancelled';
+  stage?: 'ingestion' | 'graph' | 'ai' | 'completed';
   progress: number;
   message?: string;
   error?: string;